@@ -2,6 +2,8 @@
 
 # Debug Checkpoint Script
 # This script examines what's actually stored in the checkpoint collections
+# and checks (explain) that checkpoint lookups use an index; exits 1 on a COLLSCAN.
+# Usage: python debug-checkpoint.py [--indexes]   (--indexes: only the index check)
 
 import asyncio
 import sys
@@ -141,15 +143,62 @@ async def test_checkpointer_directly():
         print_error(f"Direct checkpointer test failed: {e}")
         return False
 
+def check_checkpoint_indexes():
+    """Explain the per-turn checkpoint lookups; returns False if any of them is a COLLSCAN"""
+    print_status("Checking checkpoint lookup indexes...")
+
+    try:
+        from src.Agents.checkpoint_indexes import lookup_queries, evaluate
+
+        mongo_uri = os.getenv('MONGODB_URI', 'mongodb://mongo:27017')
+        db_name = os.getenv('MONGODB_DB_NAME', 'seq_sonic')
+        checkpoint_collection = os.getenv('MONGODB_CHECKPOINT_COLLECTION', 'checkpoints')
+        writes_collection = os.getenv('MONGODB_WRITES_COLLECTION', 'checkpoint_writes')
+
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        db = client[db_name]
+
+        for name in (checkpoint_collection, writes_collection):
+            keys = [list(index['key'].items()) for index in db[name].list_indexes()]
+            print_status(f"Indexes on {name}: {keys}")
+
+        sample = db[checkpoint_collection].find_one({}, {'thread_id': 1, 'checkpoint_ns': 1, 'checkpoint_id': 1})
+        healthy = True
+        for name, collection, query, sort, limit in lookup_queries(checkpoint_collection, writes_collection, sample):
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            result = evaluate(name, collection, cursor.explain())
+            plan = " > ".join(result['stages'])
+            if result['collscan']:
+                print_error(f"{name} lookup on {collection} is a COLLSCAN: {plan}")
+                healthy = False
+            else:
+                print_success(f"{name} lookup on {collection}: {plan}")
+
+        client.close()
+        return healthy
+
+    except Exception as e:
+        print_error(f"Index check failed: {e}")
+        return False
+
 async def main():
     """Main execution function"""
     print("🔍 Debugging Checkpoint Collections")
     print("=" * 60)
     print()
 
-    await debug_checkpoint_collections()
-    print()
-    await test_checkpointer_directly()
+    if '--indexes' not in sys.argv:
+        await debug_checkpoint_collections()
+        print()
+        await test_checkpointer_directly()
+        print()
+    if not check_checkpoint_indexes():
+        print_error("Checkpoint lookups are not index-backed; start the backend once or create the indexes")
+        sys.exit(1)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Import-Time Profiler
+# Imports the backend (`main`) in a fresh interpreter with `-X importtime`, prints the
+# slowest imports and fails when the total exceeds the budget, so a module that starts
+# building clients, reading files or compiling graphs at import is caught early.
+#
+# Usage:  python Docker/profile-imports.py [--module main] [--budget-ms 1000] [--top 25]
+#         (IMPORT_BUDGET_MS overrides the default budget)
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Colors for output
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+BLUE = '\033[0;34m'
+NC = '\033[0m'  # No Color
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:      1234 |       5678 |   package.module"
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def print_status(message):
+    print(f"{BLUE}[INFO]{NC} {message}")
+
+def print_success(message):
+    print(f"{GREEN}[SUCCESS]{NC} {message}")
+
+def print_warning(message):
+    print(f"{YELLOW}[WARNING]{NC} {message}")
+
+def print_error(message):
+    print(f"{RED}[ERROR]{NC} {message}")
+
+def profile(module: str):
+    """Return [(self_us, cumulative_us, depth, name)] for `import module` in a clean interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print_error(f"'import {module}' failed:\n{result.stderr[-2000:]}")
+        sys.exit(2)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and enforce the backend import-time budget")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1000")))
+    parser.add_argument("--top", type=int, default=25, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    print("⏱️  Import-Time Profile")
+    print("=" * 60)
+    rows = profile(args.module)
+    total_ms = sum(self_us for self_us, _, _, _ in rows) / 1000
+
+    print_status(f"Slowest imports of '{args.module}' (cumulative, includes children):")
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}")
+
+    # Project modules are the ones we can fix; list their own cost separately
+    own = [r for r in rows if r[3] == args.module or r[3].split(".")[0] == "src"]
+    if own:
+        print_status("Project modules (self time):")
+        for self_us, _, _, name in sorted(own, key=lambda r: r[0], reverse=True)[:10]:
+            print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+    print()
+    if total_ms > args.budget_ms:
+        print_error(f"Import of '{args.module}' took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print_success(f"Import of '{args.module}' took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
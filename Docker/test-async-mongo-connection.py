@@ -8,8 +8,7 @@ import sys
 import os
 sys.path.append('/app')
 
-from pymongo import AsyncMongoClient, MongoClient
-from langgraph.checkpoint.mongodb import MongoDBSaver
+from pymongo import AsyncMongoClient
 
 # Colors for output
 RED = '\033[0;31m'
@@ -100,15 +99,12 @@ async def test_async_langgraph_checkpoint():
         mongo_uri = os.getenv('MONGODB_URI', 'mongodb://mongo:27017')
         db_name = os.getenv('MONGODB_DB_NAME', 'seq_sonic')
 
-        print(f'Testing Async LangGraph MongoDBSaver with: {mongo_uri}')
+        print(f'Testing the runtime AsyncMongoDBSaver with: {mongo_uri}')
 
-        # MongoDBSaver works with both sync and async clients
-        # But for async operations, we need to use a sync client
-        sync_client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-
-        # Test creating a checkpoint saver with sync client for async operations
-        checkpointer = MongoDBSaver(sync_client, db_name=db_name)
-        print('✅ MongoDBSaver created successfully with MongoClient')
+        # Same saver the backend uses: AsyncMongoDBSaver on a pooled AsyncMongoClient
+        from src.Agents.runtime import open_checkpointer, close_checkpointer
+        checkpointer = await open_checkpointer()
+        print('✅ AsyncMongoDBSaver created successfully with AsyncMongoClient')
 
         # Test basic checkpoint operations using async methods
         config = {'configurable': {'thread_id': 'test_thread', 'checkpoint_ns': 'test_namespace'}}
@@ -121,7 +117,7 @@ async def test_async_langgraph_checkpoint():
         checkpoints = [cp async for cp in checkpointer.alist(config, limit=1)]
         print(f'✅ Checkpoint alist operation successful (found {len(checkpoints)} checkpoints)')
 
-        sync_client.close()
+        await close_checkpointer()
         print('✅ Async LangGraph checkpoint test completed successfully')
         return True
 
@@ -1,6 +1,8 @@
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
 import traceback
@@ -14,18 +16,32 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up SEQ_SONIC application...")
 
-    try:
-        # Import the agent router
-        from src.Backend.routes.agent import agent_router
-        logger.info("Successfully imported agent router")
-    except Exception as e:
-        logger.error(f"Failed to import agent router: {e}")
-        logger.error(traceback.format_exc())
-        sys.exit(1)
+    # Debug mode: flag synchronous calls that block the event loop (LOOP_BLOCK_DETECTOR=1)
+    from src.Agents.loop_monitor import start_loop_monitor, stop_loop_monitor
+    await start_loop_monitor()
+
+    # Warm up this worker in the background so the server accepts connections at once:
+    # open the async Mongo checkpointer on this event loop, import and compile every graph,
+    # load the prompt files and open a warm connection to the LLM provider.
+    # /health reports ready once this succeeded (failed steps are retried).
+    from src.Agents.runtime import start_warm_up, stop_warm_up, close_checkpointer
+    from src.Agents.LLM import warm_up_llms, aclose_llm_clients
+    start_warm_up()
+    llm_warm_up = asyncio.create_task(warm_up_llms())
 
     yield
     # Shutdown
     logger.info("Shutting down SEQ_SONIC application...")
+    # Let the warm-up request unwind before its connection pool is closed below
+    llm_warm_up.cancel()
+    try:
+        await llm_warm_up
+    except (asyncio.CancelledError, Exception):
+        pass  # shutting down: a failed warm-up no longer matters
+    await stop_warm_up()
+    await close_checkpointer()
+    await aclose_llm_clients()
+    await stop_loop_monitor()
 
 app = FastAPI(
     title="SEQ_SONIC - Sequence Analysis and Sonic Agent Platform",
@@ -66,7 +82,17 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "SEQ_SONIC"}
+    """Readiness probe: 200 once this worker finished warm-up, 503 before that."""
+    from src.Agents.runtime import readiness
+    state = readiness()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "service": "SEQ_SONIC", **state})
+    return {"status": "healthy", "service": "SEQ_SONIC", **state}
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving (may still be warming up)."""
+    return {"status": "alive", "service": "SEQ_SONIC"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,13 +1,120 @@
-
-try:
-    from langchain_openai import ChatOpenAI
-except Exception:
-    ChatOpenAI = None
 import sys
 import os
+import threading
+import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 import os
 
+import httpx
+
+from src.Agents.admission import admitted_class
+
+logger = logging.getLogger(__name__)
+
+# ---- Shared HTTP pool -------------------------------------------------------
+# Every chat model shares one keep-alive pool, so a multi-tool turn reuses warm
+# TLS connections instead of building a client (and handshaking) per call.
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+LLM_WARMUP_CONNECT = os.getenv("LLM_WARMUP_CONNECT", "1") == "1"
+
+_http_clients = {}
+_models = {}
+_lock = threading.Lock()
+
+_UNSET = object()
+_chat_openai = _UNSET
+
+
+def _chat_openai_class():
+    """Import langchain_openai on first use (it is the heaviest import of the backend)."""
+    global _chat_openai
+    if _chat_openai is _UNSET:
+        try:
+            from langchain_openai import ChatOpenAI
+        except Exception:
+            ChatOpenAI = None
+        _chat_openai = ChatOpenAI
+    return _chat_openai
+
+
+def _http2_available() -> bool:
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401  (optional: httpx needs it for HTTP/2)
+        return True
+    except ImportError:
+        return False
+
+
+def _shared_http_clients():
+    """Return the process-wide (sync, async) httpx clients, creating them once."""
+    if not _http_clients:
+        limits = httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        http2 = _http2_available()
+        timeout = httpx.Timeout(LLM_HTTP_TIMEOUT, connect=10.0)
+        _http_clients["sync"] = httpx.Client(limits=limits, http2=http2, timeout=timeout)
+        _http_clients["async"] = httpx.AsyncClient(limits=limits, http2=http2, timeout=timeout)
+    return _http_clients["sync"], _http_clients["async"]
+
+
+def _build_openai(model: str, **params):
+    ChatOpenAI = _chat_openai_class()
+    if ChatOpenAI is None:
+        raise ImportError("langchain_openai.ChatOpenAI not available")
+    sync_client, async_client = _shared_http_clients()
+    params.setdefault("api_key", os.getenv("OPENAI_API_KEY"))
+    # Report token usage (incl. cached input tokens) on streamed responses too
+    params.setdefault("stream_usage", True)
+    # Retries happen in the admission layer (src/Agents/admission.py), not in the SDK
+    params.setdefault("max_retries", 0)
+    return admitted_class(ChatOpenAI)(model=model, http_client=sync_client, http_async_client=async_client, **params)
+
+
+def _build_groq(model: str, **params):
+    from langchain_groq import ChatGroq
+    sync_client, async_client = _shared_http_clients()
+    params.setdefault("api_key", os.getenv("GROQ_API_KEY"))
+    params.setdefault("max_retries", 0)
+    return admitted_class(ChatGroq)(model=model, http_client=sync_client, http_async_client=async_client, **params)
+
+
+_PROVIDERS = {
+    "openai": _build_openai,
+    "groq": _build_groq,
+}
+
+
+def _registry_key(provider: str, model: str, params: dict):
+    return provider, model, tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+def get_chat_model(model: str, provider: str = "openai", **params):
+    """
+    Return the long-lived chat model for (provider, model, params).
+
+    Instances are created once per process and share the keep-alive HTTP pool.
+    `bind_tools` / `bind` return lightweight wrappers, so callers may bind freely.
+    """
+    key = _registry_key(provider, model, params)
+    llm = _models.get(key)
+    if llm is not None:
+        return llm
+    with _lock:
+        llm = _models.get(key)
+        if llm is None:
+            llm = _PROVIDERS[provider](model, **params)
+            _models[key] = llm
+    return llm
+
 
 def get_llm():
     """Get LLM instance with lazy initialization and safe fallbacks."""
@@ -18,16 +125,11 @@ def get_llm():
         if not api_key or api_key.strip() == "" or "your_openai_api_key" in api_key.lower():
             raise ValueError("OPENAI_API_KEY missing or not set in environment")
 
-        if ChatOpenAI is None:
+        if _chat_openai_class() is None:
             raise ImportError("langchain_openai.ChatOpenAI not available")
 
-        # Initialize real LLM client
-        llm = ChatOpenAI(
-            model=model,
-            api_key=api_key,
-            temperature=0.0,
-        )
-        return llm
+        # Pooled real LLM client
+        return get_chat_model(model, api_key=api_key, temperature=0.0)
     except Exception as e:
         # Clear, actionable warning for operators
         print(f"Warning: Failed to initialize real LLM, using MockLLM fallback. Reason: {e}")
@@ -38,11 +140,43 @@ def get_llm():
                 from langchain_core.messages import AIMessage
                 return AIMessage(content="I'm a mock LLM. Please check your OPENAI_API_KEY and network connectivity.")
 
+            async def ainvoke(self, messages, *args, **kwargs):
+                return self.invoke(messages)
+
             def bind_tools(self, tools):
                 return self
 
         return MockLLM()
 
+
+async def warm_up_llms():
+    """
+    Build the default client at startup and, unless LLM_WARMUP_CONNECT=0, open one
+    pooled connection to the provider so the first user turn skips DNS + TLS.
+    """
+    llm = get_llm()
+    root_client = getattr(llm, "root_async_client", None)
+    if not LLM_WARMUP_CONNECT or root_client is None:
+        return
+    try:
+        await root_client.with_options(timeout=5.0, max_retries=0).models.list()
+        logger.info("LLM connection pool warmed up")
+    except Exception as e:
+        logger.warning(f"LLM warm-up request failed (continuing): {e}")
+
+
+async def aclose_llm_clients():
+    """Close the shared HTTP pool (app shutdown)."""
+    with _lock:
+        clients = dict(_http_clients)
+        _http_clients.clear()
+        _models.clear()
+    if "async" in clients:
+        await clients["async"].aclose()
+    if "sync" in clients:
+        clients["sync"].close()
+
+
 if __name__ == "__main__":
     llm = get_llm()
-    print(llm)
\ No newline at end of file
+    print(llm)
@@ -3,8 +3,12 @@ Agents package for SEQ_SONIC project.
 Contains LLM configuration and agent implementations.
 """
 
-from .LLM import get_llm
+from src.lazy_imports import lazy_exports
 
 __all__ = [
     "get_llm"
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "get_llm": (".LLM", "get_llm"),
+})
@@ -0,0 +1,367 @@
+# src/Agents/admission.py
+# Admission control for every chat model call of the process.
+#
+# The pooled chat models (LLM.get_chat_model) are built from Admitted* subclasses
+# whose _agenerate / _astream go through `admission`, so sonic, both assistants,
+# their tools and the memory summarizer share one set of limits per model:
+#   - a concurrency semaphore (LLM_MAX_CONCURRENCY calls in flight) that hands free
+#     slots to the highest priority waiter first: the answer of a turn ("interactive")
+#     before tool-internal layers ("tool") before summaries ("background");
+#   - a tokens-per-minute bucket (LLM_TPM, 0 = unlimited). A call reserves an estimate
+#     (prompt chars / 4 + LLM_TPM_OUTPUT_ESTIMATE) and is reconciled with the reported
+#     usage afterwards;
+#   - retries of 429 / 5xx / connection errors (LLM_MAX_RETRIES) with full-jitter
+#     exponential backoff, honouring Retry-After. A 429 also pauses the model's bucket,
+#     so the other callers back off instead of piling onto the provider. The provider
+#     SDK's own retries are disabled (max_retries=0) so a request is not retried twice.
+# Limits are per worker process: divide the provider ceiling by WEB_CONCURRENCY.
+# Per-model overrides: LLM_MODEL_LIMITS='{"gpt-4.1": {"concurrency": 16, "tpm": 450000}}'.
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+LLM_ADMISSION            = os.getenv("LLM_ADMISSION", "1") == "1"
+LLM_MAX_CONCURRENCY      = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TPM                  = int(os.getenv("LLM_TPM", "0"))
+LLM_TPM_OUTPUT_ESTIMATE  = int(os.getenv("LLM_TPM_OUTPUT_ESTIMATE", "500"))
+LLM_MAX_RETRIES          = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS   = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS    = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+
+try:
+    LLM_MODEL_LIMITS: Dict[str, Dict[str, int]] = json.loads(os.getenv("LLM_MODEL_LIMITS", "{}"))
+except json.JSONDecodeError:
+    logger.warning("LLM_MODEL_LIMITS is not valid JSON, ignoring it")
+    LLM_MODEL_LIMITS = {}
+
+PRIORITIES = {"interactive": 0, "tool": 1, "background": 2}
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="interactive")
+# Set while a non-streaming call holds its admission, so its nested _agenerate -> _astream is admitted once
+_admitted: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_admitted", default=False)
+
+
+@contextmanager
+def llm_priority(name: str):
+    """Run the model calls made in this block (and the tasks it starts) with priority `name`."""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# ================================================================================
+# PRIMITIVES
+# ================================================================================
+
+class PrioritySemaphore:
+    """Semaphore whose free slots go to the waiter with the lowest priority number (FIFO within one)."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just before the cancellation
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # hand the slot over; `active` is unchanged
+                return
+        self.active -= 1
+
+
+class TokenBucket:
+    """Tokens-per-minute bucket (burst up to one minute of tokens); may go negative after reconciliation."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def take(self, tokens: int) -> None:
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            self._refill()
+            wait = self.paused_until - time.monotonic()
+            if wait <= 0:
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def adjust(self, tokens: int) -> None:
+        """Charge (positive) or refund (negative) the difference to the estimate."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - tokens)
+
+
+# ================================================================================
+# CONTROLLER
+# ================================================================================
+
+def _status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retryable(error: BaseException) -> bool:
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    # openai / groq connection and timeout errors, raw httpx transport errors
+    return type(error).__name__ in {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"}
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: use the backoff
+    return None
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Cheap prompt size estimate (chars / 4) plus the expected completion."""
+    if isinstance(messages, str):
+        chars = len(messages)
+    else:
+        chars = sum(len(str(getattr(m, "content", m))) for m in messages or [])
+    return chars // 4 + LLM_TPM_OUTPUT_ESTIMATE
+
+
+def reported_tokens(message: Any) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    total = usage.get("total_tokens")
+    return int(total) if total else None
+
+
+class _ModelLimits:
+    def __init__(self, model: str):
+        limits = LLM_MODEL_LIMITS.get(model, {})
+        self.semaphore = PrioritySemaphore(int(limits.get("concurrency", LLM_MAX_CONCURRENCY)))
+        tpm = int(limits.get("tpm", LLM_TPM))
+        self.bucket = TokenBucket(tpm) if tpm > 0 else None
+
+
+class AdmissionController:
+    """Per-model concurrency, TPM bucket and retry policy shared by all chat model calls."""
+
+    def __init__(self, enabled: bool = LLM_ADMISSION, max_retries: int = LLM_MAX_RETRIES):
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self._models: Dict[str, _ModelLimits] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _limits(self, model: str) -> _ModelLimits:
+        limits = self._models.get(model)
+        if limits is None:
+            limits = self._models[model] = _ModelLimits(model)
+            self._stats[model] = {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0, "queued_seconds": 0.0}
+        return limits
+
+    @asynccontextmanager
+    async def _slot(self, model: str, tokens: int, nested_admitted: bool) -> AsyncIterator[_ModelLimits]:
+        limits = self._limits(model)
+        priority = PRIORITIES.get(_priority.get(), PRIORITIES["interactive"])
+        started = time.monotonic()
+        await limits.semaphore.acquire(priority)
+        try:
+            if limits.bucket is not None:
+                await limits.bucket.take(tokens)
+            self._stats[model]["queued_seconds"] += time.monotonic() - started
+            self._stats[model]["calls"] += 1
+            if not nested_admitted:
+                yield limits
+                return
+            token = _admitted.set(True)
+            try:
+                yield limits
+            finally:
+                _admitted.reset(token)
+        finally:
+            limits.semaphore.release()
+
+    def _retry(self, model: str, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retry `attempt + 1` (Retry-After or full-jitter backoff)."""
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        else:
+            delay = min(LLM_RETRY_MAX_SECONDS, delay) + random.uniform(0, LLM_RETRY_BASE_SECONDS)
+        if _status(error) == 429:
+            self._stats[model]["rate_limited"] += 1
+            bucket = self._limits(model).bucket
+            if bucket is not None:
+                bucket.pause(delay)
+        self._stats[model]["retries"] += 1
+        logger.warning(f"[admission] {model}: {type(error).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def _reconcile(self, limits: _ModelLimits, estimate: int, used: Optional[int]) -> None:
+        if limits.bucket is not None and used is not None:
+            limits.bucket.adjust(used - estimate)
+
+    async def call(self, model: str, tokens: int, run: Callable[[], Awaitable[T]],
+                   used: Callable[[T], Optional[int]] = lambda result: None) -> T:
+        """Run `run()` under the model's limits, retrying transient provider errors."""
+        if not self.enabled or _admitted.get():
+            return await run()
+        attempt = 0
+        while True:
+            # ChatOpenAI._agenerate delegates to _astream when streaming: admit that once
+            async with self._slot(model, tokens, nested_admitted=True) as limits:
+                try:
+                    result = await run()
+                    self._reconcile(limits, tokens, used(result))
+                    return result
+                except Exception as e:
+                    if attempt >= self.max_retries or not _retryable(e):
+                        self._stats[model]["failed"] += 1
+                        raise
+                    delay = self._retry(model, attempt, e)
+            # Sleep without holding the slot
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def stream(self, model: str, tokens: int, open_stream: Callable[[], AsyncIterator[T]],
+                     used: Callable[[T], Optional[int]] = lambda chunk: None) -> AsyncIterator[T]:
+        """Yield from `open_stream()` under the model's limits; retried only before the first chunk."""
+        if not self.enabled or _admitted.get():
+            async for chunk in open_stream():
+                yield chunk
+            return
+        attempt = 0
+        while True:
+            started = False
+            # No context flag here: it would leak into the consumer between chunks
+            async with self._slot(model, tokens, nested_admitted=False) as limits:
+                reported = None
+                try:
+                    async for chunk in open_stream():
+                        started = True
+                        reported = used(chunk) or reported
+                        yield chunk
+                    self._reconcile(limits, tokens, reported)
+                    return
+                except Exception as e:
+                    if started or attempt >= self.max_retries or not _retryable(e):
+                        self._stats[model]["failed"] += 1
+                        raise
+                    delay = self._retry(model, attempt, e)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for model, limits in self._models.items():
+            report[model] = {
+                **self._stats[model],
+                "in_flight": limits.semaphore.active,
+                "waiting": limits.semaphore.waiting,
+                "limit": limits.semaphore.limit,
+                "tpm_available": None if limits.bucket is None else int(limits.bucket.tokens),
+            }
+        return report
+
+
+admission = AdmissionController()
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return admission.stats()
+
+
+# ================================================================================
+# CHAT MODEL MIXIN
+# ================================================================================
+
+class AdmissionMixin:
+    """Routes a LangChain chat model's low-level calls through `admission` (mix in before the model class)."""
+
+    def _admission_model(self) -> str:
+        return getattr(self, "model_name", None) or getattr(self, "model", None) or "default"
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        parent = super()
+
+        def used(result) -> Optional[int]:
+            generations = getattr(result, "generations", None) or []
+            return reported_tokens(generations[0].message) if generations else None
+
+        return await admission.call(
+            self._admission_model(), estimate_tokens(messages),
+            lambda: parent._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            used,
+        )
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        parent = super()
+        stream = admission.stream(
+            self._admission_model(), estimate_tokens(messages),
+            lambda: parent._astream(messages, stop=stop, run_manager=run_manager, **kwargs),
+            lambda chunk: reported_tokens(getattr(chunk, "message", None)),
+        )
+        async for chunk in stream:
+            yield chunk
+
+
+_admitted_classes: Dict[type, type] = {}
+
+
+def admitted_class(model_class: type) -> type:
+    """`model_class` with AdmissionMixin in front (created once per class)."""
+    cls = _admitted_classes.get(model_class)
+    if cls is None:
+        cls = type(f"Admitted{model_class.__name__}", (AdmissionMixin, model_class), {})
+        _admitted_classes[model_class] = cls
+    return cls
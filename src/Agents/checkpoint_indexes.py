@@ -0,0 +1,113 @@
+# src/Agents/checkpoint_indexes.py
+# Indexes for the Mongo checkpoint collections and an explain()-based health check.
+#
+# Every turn loads the latest checkpoint of a thread
+#   checkpoints.find({thread_id, checkpoint_ns}).sort(checkpoint_id, -1).limit(1)
+# and its pending writes
+#   checkpoint_writes.find({thread_id, checkpoint_ns, checkpoint_id})
+# The saver only creates the compound indexes for these when a collection has fewer
+# than two indexes, so a collection that already has another index (the retention
+# TTL index, an index from the old sync saver) never gets them. `ensure_indexes`
+# creates them explicitly and `check_lookups` confirms with explain() that neither
+# lookup runs as a COLLSCAN.
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_INDEX = [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)]
+WRITES_INDEX     = [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1), ("task_id", 1), ("idx", 1)]
+
+# Used for explain() when the collection has no documents yet
+_PROBE_THREAD = "__index_check__"
+
+
+def _covers(index_key, keys) -> bool:
+    """True when an existing index key starts with `keys` (so it serves the same lookups)."""
+    existing = list(dict(index_key).items())
+    return existing[:len(keys)] == [(name, direction) for name, direction in keys]
+
+
+def _has_index(indexes: List[Dict[str, Any]], keys) -> bool:
+    return any(_covers(index["key"], keys) for index in indexes)
+
+
+async def _ensure_index(collection, keys) -> bool:
+    """Create the unique compound index unless an equivalent one exists. Returns True if created."""
+    indexes = await (await collection.list_indexes()).to_list()
+    if _has_index(indexes, keys):
+        return False
+    try:
+        await collection.create_index(keys, unique=True)
+    except OperationFailure as e:
+        # Duplicates left by an older writer: a plain index still serves the lookup
+        logger.error(f"Unique index on {collection.name} failed ({e}); creating a non-unique index instead")
+        await collection.create_index(keys, name="_".join(f"{k}_{d}" for k, d in keys) + "_lookup")
+    logger.info("Created index %s on %s", [k for k, _ in keys], collection.name)
+    return True
+
+
+async def ensure_indexes(db, checkpoint_collection: str, writes_collection: str) -> List[str]:
+    """Create the checkpoint / writes lookup indexes if missing. Returns the collections that got a new index."""
+    created = []
+    if await _ensure_index(db[checkpoint_collection], CHECKPOINT_INDEX):
+        created.append(checkpoint_collection)
+    if await _ensure_index(db[writes_collection], WRITES_INDEX):
+        created.append(writes_collection)
+    return created
+
+
+# ================================================================================
+# EXPLAIN CHECK
+# ================================================================================
+
+def plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """Stages of the winning plan, outermost first (e.g. ['LIMIT', 'FETCH', 'IXSCAN'])."""
+    planner = explain.get("queryPlanner", {})
+    plan = planner.get("winningPlan", {})
+    # Slot-based engine output nests the classic plan under "queryPlan"
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        inputs = plan.get("inputStages") or [plan.get("inputStage")]
+        plan = inputs[0] if inputs and inputs[0] else None
+    return stages
+
+
+def lookup_queries(checkpoint_collection: str, writes_collection: str, sample: Optional[Dict[str, Any]] = None):
+    """
+    The saver's two per-turn lookups as (name, collection, filter, sort, limit), filled
+    in from a sample checkpoint document (or a probe thread when there is none).
+    """
+    sample = sample or {}
+    scope = {
+        "thread_id": sample.get("thread_id", _PROBE_THREAD),
+        "checkpoint_ns": sample.get("checkpoint_ns", ""),
+    }
+    writes_filter = {**scope, "checkpoint_id": sample.get("checkpoint_id", _PROBE_THREAD)}
+    return [
+        ("latest checkpoint", checkpoint_collection, scope, [("checkpoint_id", -1)], 1),
+        ("pending writes", writes_collection, writes_filter, None, 0),
+    ]
+
+
+def evaluate(name: str, collection: str, explain: Dict[str, Any]) -> Dict[str, Any]:
+    stages = plan_stages(explain)
+    return {"lookup": name, "collection": collection, "stages": stages, "collscan": "COLLSCAN" in stages}
+
+
+async def check_lookups(db, checkpoint_collection: str, writes_collection: str) -> List[Dict[str, Any]]:
+    """Explain the per-turn lookups. Each result has the plan stages and `collscan`."""
+    sample = await db[checkpoint_collection].find_one({}, {"thread_id": 1, "checkpoint_ns": 1, "checkpoint_id": 1})
+    results = []
+    for name, collection, query, sort, limit in lookup_queries(checkpoint_collection, writes_collection, sample):
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        results.append(evaluate(name, collection, await cursor.explain()))
+    return results
@@ -0,0 +1,239 @@
+# src/Agents/checkpoint_retention.py
+# Retention for the Mongo checkpoint collections.
+#
+# The saver writes a full checkpoint (plus its pending writes) for every super-step
+# of every thread. This module bounds that growth:
+#   - compaction: keep only the latest N checkpoints per (thread_id, checkpoint_ns)
+#     and delete the older checkpoints together with their writes;
+#   - idle threads: a TTL index on `created_at` removes documents once a thread has
+#     been idle for CHECKPOINT_IDLE_TTL_SECONDS. The job stamps `created_at` on new
+#     documents (to the job interval), so the saver's own write path stays unchanged;
+#   - compression: large serialized values are zstd-compressed (zlib fallback)
+#     before storage by wrapping the saver's serde. Uncompressed documents still load.
+#
+# CLI:  python -m src.Agents.checkpoint_retention [--keep 20] [--interval 3600] [--dry-run]
+import argparse
+import asyncio
+import logging
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEEP_LAST          = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_IDLE_TTL_SECONDS   = int(os.getenv("CHECKPOINT_IDLE_TTL_SECONDS", "0"))  # 0 = no TTL
+CHECKPOINT_COMPRESSION        = os.getenv("CHECKPOINT_COMPRESSION", "1") == "1"
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "4096"))
+CHECKPOINT_COMPRESS_LEVEL     = int(os.getenv("CHECKPOINT_COMPRESS_LEVEL", "3"))
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to zlib
+    zstandard = None
+
+
+# ================================================================================
+# COMPRESSION
+# ================================================================================
+
+class CompressingSerializer:
+    """
+    Serde wrapper that compresses values of at least `min_bytes` after serialization.
+    The codec is recorded in the type tag ("msgpack+zstd"), so plain values written
+    before compression was enabled still load.
+    """
+
+    def __init__(self, inner, min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES, level: int = CHECKPOINT_COMPRESS_LEVEL):
+        self.inner = inner
+        self.min_bytes = min_bytes
+        self.level = level
+        self.codec = "zstd" if zstandard is not None else "zlib"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, min(self.level, 9))
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("checkpoint is zstd-compressed but the 'zstandard' package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == "zlib":
+            return zlib.decompress(data)
+        raise ValueError(f"Unknown checkpoint codec: {codec}")
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if isinstance(data, (bytes, bytearray)) and len(data) >= self.min_bytes:
+            compressed = self._compress(bytes(data))
+            if len(compressed) < len(data):
+                return f"{type_}+{self.codec}", compressed
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        base, sep, codec = type_.rpartition("+")
+        if sep and codec in ("zstd", "zlib"):
+            return self.inner.loads_typed((base, self._decompress(codec, payload)))
+        return self.inner.loads_typed(data)
+
+    def __getattr__(self, name):
+        # dumps / loads and anything else the saver may use
+        return getattr(self.inner, name)
+
+
+def enable_compression(saver) -> None:
+    """Wrap `saver.serde` so large checkpoints and writes are stored compressed (idempotent)."""
+    if CHECKPOINT_COMPRESSION and not isinstance(saver.serde, CompressingSerializer):
+        saver.serde = CompressingSerializer(saver.serde)
+
+
+# ================================================================================
+# TTL FOR IDLE THREADS
+# ================================================================================
+
+async def ensure_ttl_index(collection, ttl_seconds: int) -> None:
+    """Create (or update) the TTL index on `created_at`."""
+    indexes = await (await collection.list_indexes()).to_list()
+    for index in indexes:
+        if dict(index["key"]) == {"created_at": 1}:
+            if index.get("expireAfterSeconds") != ttl_seconds:
+                await collection.database.command(
+                    "collMod", collection.name,
+                    index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": ttl_seconds},
+                )
+            return
+    await collection.create_index([("created_at", 1)], expireAfterSeconds=ttl_seconds)
+
+
+async def stamp_created_at(collection) -> int:
+    """Set `created_at` on documents written since the last run. Returns the count."""
+    result = await collection.update_many({"created_at": None}, [{"$set": {"created_at": "$$NOW"}}])
+    return result.modified_count
+
+
+# ================================================================================
+# COMPACTION
+# ================================================================================
+
+async def _bytes_of(collection, query: Dict[str, Any]) -> Tuple[int, int]:
+    """(documents, BSON bytes) matching `query`."""
+    cursor = await collection.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "docs": {"$sum": 1}, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+    ])
+    async for row in cursor:
+        return row["docs"], row["bytes"]
+    return 0, 0
+
+
+async def compact(db, checkpoint_collection: str, writes_collection: str, keep_last: int = CHECKPOINT_KEEP_LAST,
+                  thread_id: Optional[str] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Delete all but the latest `keep_last` checkpoints of every thread (or only of
+    `thread_id`), with their writes. Returns counts and reclaimed bytes.
+    """
+    checkpoints, writes = db[checkpoint_collection], db[writes_collection]
+    report = {"threads": 0, "checkpoints": 0, "writes": 0, "checkpoint_bytes": 0, "writes_bytes": 0}
+    keep_last = max(1, keep_last)
+
+    match = {"thread_id": thread_id} if thread_id else {}
+    groups = await checkpoints.aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": keep_last}}},
+    ])
+    async for group in groups:
+        scope = {"thread_id": group["_id"]["thread_id"], "checkpoint_ns": group["_id"]["checkpoint_ns"]}
+        # checkpoint ids are time-ordered; the saver itself sorts on them
+        oldest_kept = None
+        async for doc in checkpoints.find(scope, {"checkpoint_id": 1}).sort("checkpoint_id", -1).skip(keep_last - 1).limit(1):
+            oldest_kept = doc["checkpoint_id"]
+        if oldest_kept is None:
+            continue
+        query = {**scope, "checkpoint_id": {"$lt": oldest_kept}}
+
+        checkpoint_docs, checkpoint_bytes = await _bytes_of(checkpoints, query)
+        write_docs, write_bytes = await _bytes_of(writes, query)
+        if not dry_run:
+            checkpoint_docs = (await checkpoints.delete_many(query)).deleted_count
+            write_docs = (await writes.delete_many(query)).deleted_count
+
+        report["threads"] += 1
+        report["checkpoints"] += checkpoint_docs
+        report["writes"] += write_docs
+        report["checkpoint_bytes"] += checkpoint_bytes
+        report["writes_bytes"] += write_bytes
+    return report
+
+
+async def run_retention(client, db_name: str, checkpoint_collection: str, writes_collection: str,
+                        keep_last: int = CHECKPOINT_KEEP_LAST, ttl_seconds: int = CHECKPOINT_IDLE_TTL_SECONDS,
+                        thread_id: Optional[str] = None, dry_run: bool = False) -> Dict[str, int]:
+    """One retention pass: TTL upkeep (when enabled) and compaction."""
+    db = client[db_name]
+    report = {"stamped": 0}
+    if ttl_seconds > 0 and not dry_run:
+        for name in (checkpoint_collection, writes_collection):
+            await ensure_ttl_index(db[name], ttl_seconds)
+            report["stamped"] += await stamp_created_at(db[name])
+    report.update(await compact(db, checkpoint_collection, writes_collection, keep_last, thread_id, dry_run))
+    report["reclaimed_bytes"] = report["checkpoint_bytes"] + report["writes_bytes"]
+    return report
+
+
+# ================================================================================
+# CLI
+# ================================================================================
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+async def _main(args) -> None:
+    from src.Agents.runtime import _new_client, DB_NAME, CHECKPOINT_COLLECTION, WRITES_COLLECTION
+    client = _new_client()
+    try:
+        while True:
+            started = time.perf_counter()
+            report = await run_retention(
+                client, DB_NAME, CHECKPOINT_COLLECTION, WRITES_COLLECTION,
+                keep_last=args.keep, ttl_seconds=args.ttl, thread_id=args.thread, dry_run=args.dry_run,
+            )
+            logger.info(
+                "%s %s checkpoints and %s writes from %s threads, reclaimed %s (%.1fs)",
+                "Would delete" if args.dry_run else "Deleted",
+                report["checkpoints"], report["writes"], report["threads"],
+                _format_bytes(report["reclaimed_bytes"]), time.perf_counter() - started,
+            )
+            if not args.interval:
+                break
+            await asyncio.sleep(args.interval)
+    finally:
+        await client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact the Mongo checkpoint collections")
+    parser.add_argument("--keep", type=int, default=CHECKPOINT_KEEP_LAST, help="checkpoints to keep per thread")
+    parser.add_argument("--ttl", type=int, default=CHECKPOINT_IDLE_TTL_SECONDS,
+                        help="expire threads idle for this many seconds (0 disables the TTL index)")
+    parser.add_argument("--thread", default=None, help="only compact this thread_id")
+    parser.add_argument("--interval", type=float, default=0, help="repeat every N seconds (0 = run once)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# src/Agents/loop_monitor.py
+# Debug-mode detector for synchronous work on the event loop.
+#
+# A heartbeat coroutine stamps the time every few milliseconds; a watchdog thread
+# checks the stamp. When the loop has not come back for longer than the threshold,
+# something is running synchronously inside a node or tool (a blocking llm.invoke,
+# file or Mongo I/O, a CPU-heavy parse, ...). The watchdog logs the loop thread's
+# current stack, which points at the offending call.
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCK_DETECTOR = os.getenv("LOOP_BLOCK_DETECTOR", os.getenv("DEBUG", "0")) == "1"
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+
+class LoopBlockMonitor:
+    """Warn (with the blocking stack) when the event loop stalls for more than `threshold_ms`."""
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, stack_depth: int = 12):
+        self.threshold = threshold_ms / 1000.0
+        self.stack_depth = stack_depth
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop_thread_id = None
+        self._heartbeat_task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    async def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-block-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Loop block detector enabled (threshold=%.0f ms)", self.threshold * 1000)
+
+    async def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        interval = self.threshold / 4
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            lag = time.monotonic() - beat
+            # Report each stall once, while it is still in progress
+            if lag < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_depth)) if frame else "<unavailable>"
+            logger.warning(
+                "Event loop blocked for %.0f ms (threshold %.0f ms) by synchronous code:\n%s",
+                lag * 1000, self.threshold * 1000, stack,
+            )
+
+
+_monitor = None
+
+
+async def start_loop_monitor():
+    """Start the detector when LOOP_BLOCK_DETECTOR=1 (or DEBUG=1). Returns the monitor or None."""
+    global _monitor
+    if not LOOP_BLOCK_DETECTOR or _monitor is not None:
+        return _monitor
+    _monitor = LoopBlockMonitor()
+    await _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor():
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
@@ -0,0 +1,287 @@
+# src/Agents/memory.py
+# Bounded conversation memory shared by the agent graphs.
+#
+# The checkpoint keeps the full message history; what the model sees each turn is
+# built here:
+#   [static system prompt] + [summary of older turns] + [recent turns verbatim]
+#
+# - Tokens are counted per message once and cached by message id (tiktoken, with a
+#   chars/4 fallback), so each turn only counts what is new.
+# - Recent turns are kept verbatim up to MEMORY_WINDOW_TOKENS, always starting at a
+#   user message so tool calls and their ToolMessages stay together.
+# - Once the not-yet-summarized history exceeds MEMORY_MAX_TOKENS, the turns that
+#   fall out of the window are folded into a rolling summary stored in state
+#   (`memory_summary`, plus `memory_cursor` = id of the last folded message).
+# - Large tool payloads from earlier turns (tool results, tool-call arguments such as
+#   pasted source files) are replaced by a short head and a reference.
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.graph import MessagesState
+
+from src.Agents.admission import llm_priority
+
+logger = logging.getLogger(__name__)
+
+MEMORY_ENABLED             = os.getenv("MEMORY_ENABLED", "1") == "1"
+MEMORY_MAX_TOKENS          = int(os.getenv("MEMORY_MAX_TOKENS", "12000"))
+MEMORY_WINDOW_TOKENS       = int(os.getenv("MEMORY_WINDOW_TOKENS", "6000"))
+MEMORY_TOOL_PAYLOAD_TOKENS = int(os.getenv("MEMORY_TOOL_PAYLOAD_TOKENS", "1000"))
+MEMORY_SUMMARY_MAX_TOKENS  = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "800"))
+MEMORY_TOKEN_ENCODING      = os.getenv("MEMORY_TOKEN_ENCODING", "o200k_base")
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and a middleware "
+    "migration assistant (Apache Camel / Java to WSO2). Merge the EXISTING SUMMARY with the "
+    "NEW MESSAGES into one updated summary. Keep: the user's goals and decisions, service and "
+    "parameter names, requirements, generated artifacts (name and purpose, not full code), open "
+    "issues and anything the user asked to remember. Drop greetings and repetition. "
+    f"Answer with the summary only, at most {MEMORY_SUMMARY_MAX_TOKENS} tokens."
+)
+
+
+class MemoryState(MessagesState):
+    """MessagesState plus the rolling summary kept by ConversationMemory."""
+    memory_summary: str
+    memory_cursor: str
+
+
+# ================================================================================
+# TOKEN COUNTING
+# ================================================================================
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_token_cache: "OrderedDict[tuple, int]" = OrderedDict()
+_TOKEN_CACHE_SIZE = 20000
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(MEMORY_TOKEN_ENCODING)
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating tokens as chars/4: {e}")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` (chars/4 estimate when tiktoken is not available)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def _tool_calls_text(message: BaseMessage) -> str:
+    calls = getattr(message, "tool_calls", None)
+    return json.dumps([{"name": c.get("name"), "args": c.get("args")} for c in calls], default=str) if calls else ""
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Tokens of one message (content + tool-call arguments), cached by message id."""
+    text, calls = _text(message), _tool_calls_text(message)
+    key = (message.id, len(text), len(calls)) if message.id else None
+    if key is not None and key in _token_cache:
+        _token_cache.move_to_end(key)
+        return _token_cache[key]
+    tokens = count_tokens(text) + count_tokens(calls) + 4  # + per-message overhead
+    if key is not None:
+        _token_cache[key] = tokens
+        if len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return tokens
+
+
+def messages_tokens(messages: List[BaseMessage]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+# ================================================================================
+# PAYLOAD TRIMMING
+# ================================================================================
+
+def _head(text: str, max_tokens: int) -> str:
+    # Cheap cut on characters; the reference line says how much was dropped
+    return text[: max(200, max_tokens * 2)]
+
+
+def _trim_message(message: BaseMessage, max_tokens: int) -> BaseMessage:
+    """Copy of an earlier-turn message with oversized tool payloads replaced by references."""
+    if isinstance(message, ToolMessage):
+        text = _text(message)
+        tokens = message_tokens(message)  # cached by message id
+        if tokens <= max_tokens:
+            return message
+        reference = f"\n[... tool result trimmed from memory: {tokens} tokens, tool_call_id={message.tool_call_id}]"
+        return message.model_copy(update={"content": _head(text, max_tokens) + reference})
+
+    if isinstance(message, AIMessage) and message.tool_calls:
+        trimmed_calls, changed = [], False
+        for call in message.tool_calls:
+            args = {}
+            for name, value in (call.get("args") or {}).items():
+                tokens = count_tokens(value) if isinstance(value, str) and len(value) > max_tokens else 0
+                if tokens > max_tokens:
+                    args[name] = f"[argument trimmed from memory: {tokens} tokens]"
+                    changed = True
+                else:
+                    args[name] = value
+            trimmed_calls.append({**call, "args": args})
+        if changed:
+            return message.model_copy(update={"tool_calls": trimmed_calls})
+    return message
+
+
+# ================================================================================
+# MEMORY MANAGER
+# ================================================================================
+
+@dataclass
+class MemoryContext:
+    """Model view of the conversation and the state keys to store back."""
+    messages: List[BaseMessage]
+    update: Dict[str, Any] = field(default_factory=dict)
+    tokens: int = 0
+
+
+def _turn_starts(messages: List[BaseMessage]) -> List[int]:
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    return starts or [0]
+
+
+class ConversationMemory:
+    """Sliding window of recent turns + rolling summary of older ones."""
+
+    def __init__(self, max_tokens: int = MEMORY_MAX_TOKENS, window_tokens: int = MEMORY_WINDOW_TOKENS,
+                 tool_payload_tokens: int = MEMORY_TOOL_PAYLOAD_TOKENS,
+                 summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.window_tokens = min(window_tokens, max_tokens)
+        self.tool_payload_tokens = tool_payload_tokens
+        self.summary_max_tokens = summary_max_tokens
+
+    # ---- window selection ---------------------------------------------------
+    @staticmethod
+    def _unsummarized(messages: List[BaseMessage], cursor: Optional[str]) -> List[BaseMessage]:
+        if cursor:
+            for i in range(len(messages) - 1, -1, -1):
+                if messages[i].id == cursor:
+                    return messages[i + 1:]
+        return list(messages)
+
+    def _window_start(self, messages: List[BaseMessage]) -> int:
+        """Index of the oldest turn start that keeps the window within budget (last turn always kept)."""
+        starts = _turn_starts(messages)
+        start = starts[-1]
+        tokens = messages_tokens(messages[start:])
+        for candidate in reversed(starts[:-1]):
+            tokens += messages_tokens(messages[candidate:start])
+            if tokens > self.window_tokens:
+                break
+            start = candidate
+        return start
+
+    def _view(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        # The current (last) turn is never trimmed
+        current = _turn_starts(messages)[-1]
+        return [_trim_message(m, self.tool_payload_tokens) if i < current else m for i, m in enumerate(messages)]
+
+    # ---- summarization ------------------------------------------------------
+    def _transcript(self, messages: List[BaseMessage]) -> str:
+        lines = []
+        for message in messages:
+            message = _trim_message(message, self.tool_payload_tokens)
+            role = {"human": "USER", "ai": "ASSISTANT", "tool": "TOOL RESULT", "system": "SYSTEM"}.get(message.type, message.type.upper())
+            text = _text(message)
+            calls = _tool_calls_text(message)
+            lines.append(f"{role}: {text}" + (f"\n(tool calls: {calls})" if calls else ""))
+        return "\n\n".join(lines)
+
+    def _bound_summary(self, summary: str) -> str:
+        if count_tokens(summary) <= self.summary_max_tokens * 2:
+            return summary
+        # Keep the most recent part of an overlong summary
+        return "..." + summary[-self.summary_max_tokens * 8:]
+
+    async def summarize(self, previous: str, messages: List[BaseMessage], llm=None) -> str:
+        """Fold `messages` into `previous`; falls back to an extractive summary if the model call fails."""
+        transcript = self._transcript(messages)
+        try:
+            if llm is None:
+                from src.Agents.LLM import get_llm
+                llm = get_llm()
+            # Summaries yield to the answers and tools of running turns
+            with llm_priority("background"):
+                response = await llm.ainvoke([
+                    SystemMessage(content=SUMMARY_PROMPT),
+                    HumanMessage(content=f"EXISTING SUMMARY:\n{previous or '(none)'}\n\nNEW MESSAGES:\n{transcript}"),
+                ])
+            summary = _text(response).strip()
+            if summary:
+                return self._bound_summary(summary)
+        except Exception as e:
+            logger.warning(f"Conversation summary failed, using extractive fallback: {e}")
+        extract = "\n".join(line[:300] for line in transcript.split("\n\n"))
+        return self._bound_summary(f"{previous}\n{extract}".strip())
+
+    # ---- public API -----------------------------------------------------------
+    async def prepare(self, state: Dict[str, Any], agent: str = "agent", llm=None) -> MemoryContext:
+        """
+        Build the bounded model view for `state`.
+        Returns the messages to send after the static system prompt and the state update
+        (new summary / cursor) the node should store.
+        """
+        if _encoding is None:
+            # First use may download the BPE file; keep that off the event loop
+            await asyncio.to_thread(_get_encoding)
+        messages = list(state.get("messages", []))
+        summary = state.get("memory_summary") or ""
+        update: Dict[str, Any] = {}
+
+        if MEMORY_ENABLED:
+            recent = self._unsummarized(messages, state.get("memory_cursor"))
+            if messages_tokens(recent) > self.max_tokens:
+                start = self._window_start(recent)
+                folded = recent[:start]
+                if folded:
+                    summary = await self.summarize(summary, folded, llm=llm)
+                    update = {"memory_summary": summary, "memory_cursor": folded[-1].id}
+                    logger.info(
+                        "[memory:%s] folded %s messages (%s tokens) into the summary",
+                        agent, len(folded), messages_tokens(folded),
+                    )
+                    recent = recent[start:]
+            view = self._view(recent)
+        else:
+            view = messages
+
+        if summary:
+            view = [SystemMessage(content=f"SUMMARY OF THE EARLIER CONVERSATION:\n{summary}")] + view
+        tokens = messages_tokens(view)
+        logger.info("[memory:%s] context: %s messages, ~%s tokens (thread has %s messages)", agent, len(view), tokens, len(messages))
+        return MemoryContext(messages=view, update=update, tokens=tokens)
+
+
+memory = ConversationMemory()
@@ -1,6 +1,12 @@
 # Agent package initialization
-from .graph import compiled_graph
-from .nodes import SharedState, main_agent_node
-from .tools import available_tools_decorated
+# Exports are imported on first access (no LLM client or graph compile at package import)
+from src.lazy_imports import lazy_exports
 
 __all__ = ['compiled_graph', 'SharedState', 'main_agent_node', 'available_tools_decorated']
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'compiled_graph': ('.graph', 'compiled_graph'),
+    'SharedState': ('.nodes', 'SharedState'),
+    'main_agent_node': ('.nodes', 'main_agent_node'),
+    'available_tools_decorated': ('.tools', 'available_tools_decorated'),
+})
@@ -1,7 +1,7 @@
 import os
 from langgraph.graph import MessagesState
-from langchain_core.messages import SystemMessage, ToolMessage
-from .tools import available_tools_decorated, load_file_sync # Import both the tools and load_file_sync function
+from langchain_core.messages import SystemMessage
+from .tools import available_tools_decorated, load_file, load_file_sync, PROJECT_SOURCE_TOOLS # Import both the tools and load_file_sync function
 
 
 # --- Configuration & Setup ---
@@ -12,21 +12,63 @@ from .tools import available_tools_decorated, load_file_sync # Import both the t
 
 # Use centralized LLM configuration
 from src.Agents.LLM import get_llm
-LLM = get_llm()
-# Bind tools to the LLM
-LLM_with_tools = LLM.bind_tools(available_tools_decorated)
+from src.Agents.prompt_cache import static_system_message, cache_hints, record_usage
+from src.Agents.tool_executor import run_tool_calls
+from src.Agents.memory import MemoryState, memory
+from src.Agents.sources.retrieval import source_context
+from langchain_core.runnables import RunnableConfig
 
-# Load the main conversational prompt using the load_file_sync function from tools.py
-GENAI_PROMPT = load_file_sync("", "GENAI.txt") # GENAI.txt is in the root of the prompt directory
+# Rounds of project-file lookups (list / read, no side effects) the agent may do
+# before answering; generation tools always end the turn with the follow-up answer
+PROJECT_TOOL_ROUNDS = int(os.getenv("PROJECT_TOOL_ROUNDS", "3"))
+
+# The LLM client, its tool binding and the GENAI prompt are created on first use
+# (not at import), so importing the agent stays cheap.
+_lazy = {}
+
+
+def get_agent_llm():
+    """Pooled LLM for this agent (created on first call)."""
+    if "llm" not in _lazy:
+        _lazy["llm"] = get_llm()
+    return _lazy["llm"]
+
+
+def get_agent_llm_with_tools():
+    """Agent LLM with the MW migration tools bound (created on first call)."""
+    if "llm_with_tools" not in _lazy:
+        # Bind tools to the LLM
+        _lazy["llm_with_tools"] = get_agent_llm().bind_tools(available_tools_decorated)
+    return _lazy["llm_with_tools"]
+
+
+def get_genai_prompt() -> str:
+    """The main conversational prompt (GENAI.txt in the root of the prompt directory)."""
+    return load_file_sync("", "GENAI.txt")
+
+
+async def aget_genai_prompt() -> str:
+    """get_genai_prompt() for the node: served from the template registry's memory, read off the loop on first use."""
+    return await load_file("", "GENAI.txt")
+
+
+# Backwards-compatible module attributes: LLM, LLM_with_tools, GENAI_PROMPT
+_LAZY_ATTRIBUTES = {"LLM": get_agent_llm, "LLM_with_tools": get_agent_llm_with_tools, "GENAI_PROMPT": get_genai_prompt}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- State Definition ---
-class SharedState(MessagesState):
+class SharedState(MemoryState):
     """State shared between all nodes. Inherits 'messages' from MessagesState."""
     pass
 
 
 # --- Node Functions ---
-async def main_agent_node(state: SharedState) -> SharedState:
+async def main_agent_node(state: SharedState, config: RunnableConfig) -> SharedState:
     """
     Main conversational agent node. Invokes the LLM with tools bound.
     The LLM will decide whether to respond directly or request a tool call.
@@ -35,11 +77,33 @@ async def main_agent_node(state: SharedState) -> SharedState:
     # Construct messages for the LLM
     # Include the system prompt and the current message history
     
-    system_message = SystemMessage(content=GENAI_PROMPT)
-    messages = [system_message] + state["messages"]
+    # The static GENAI prompt always goes first and byte-identical so the provider
+    # can serve it from its prompt cache; per-turn content follows it.
+    genai_prompt = await aget_genai_prompt()
+    system_message = static_system_message(genai_prompt)
+    # Bounded history: rolling summary of older turns + recent turns verbatim
+    context = await memory.prepare(state, agent="mw_migration", llm=get_agent_llm())
+    state.update(context.update)
+    # Excerpts of the attached sources relevant to this turn (not stored in state)
+    sources = await source_context(state, config, agent="mw_migration")
+    messages = [system_message] + context.messages + sources
+    hints = cache_hints("mw_migration", genai_prompt)
 
     # Invoke the LLM bound with tools
-    response = await LLM_with_tools.ainvoke(messages)
+    response = await get_agent_llm_with_tools().ainvoke(messages, **hints)
+    record_usage("mw_migration", response)
+
+    # Project-file lookups feed straight back into the tool-bound model, so it can
+    # list the project, read the relevant files and then call a generation tool
+    lookups = []
+    for _ in range(PROJECT_TOOL_ROUNDS):
+        calls = getattr(response, "tool_calls", None)
+        if not calls or any(call["name"] not in PROJECT_SOURCE_TOOLS for call in calls):
+            break
+        lookups += [response] + await run_tool_calls(calls, available_tools_decorated)
+        response = await get_agent_llm_with_tools().ainvoke(messages + lookups, **hints)
+        record_usage("mw_migration", response)
+    state["messages"].extend(lookups)
 
     # Append the response (which might contain tool calls) to the state
     # LangGraph's ToolNode will handle executing the calls later
@@ -48,32 +112,18 @@ async def main_agent_node(state: SharedState) -> SharedState:
     print(f"--- Agent Response: {response.content}")
     # 2) If tool calls exist, run them, add ToolMessage(s)
     if getattr(response, "tool_calls", None):
-        tools_dict = {t.name: t for t in available_tools_decorated}
-        for tool_call in response.tool_calls:
-            name = tool_call["name"]
-            args = tool_call["args"]
-            call_id = tool_call["id"]
-
-            try:
-                if name not in tools_dict:
-                    result = f"Unknown tool: {name}"
-                else:
-                    result = await tools_dict[name].ainvoke(args)
-                state["messages"].append(
-                    ToolMessage(content=str(result), tool_call_id=call_id)
-                )
-            except Exception as e:
-                state["messages"].append(
-                    ToolMessage(content=f"Error executing tool {name}: {e}", tool_call_id=call_id)
-                )
+        # Independent calls run concurrently; ToolMessages keep the call order
+        tool_messages = await run_tool_calls(response.tool_calls, available_tools_decorated)
+        state["messages"].extend(tool_messages)
 
         # 3) Final answer that uses the tool outputs
         final_system_hint = SystemMessage(content=(
             "You just received tool result(s). Now craft a concise answer for the user. "
             "Append the 'Tool result'."
         ))
-        follow_up_messages = [final_system_hint] + state["messages"]
-        follow_up_response = await LLM.ainvoke(follow_up_messages)
+        follow_up_messages = [system_message] + context.messages + sources + lookups + [response] + tool_messages + [final_system_hint]
+        follow_up_response = await get_agent_llm().ainvoke(follow_up_messages, **hints)
+        record_usage("mw_migration", follow_up_response)
         state["messages"].append(follow_up_response)
 
 
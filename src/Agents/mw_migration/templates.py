@@ -0,0 +1,218 @@
+# templates.py
+# In-memory registry for the prompt/** files used by the MW Migration tools.
+#
+# Each file is read once and parsed once into literal text and {field} slots.
+# Fields whose values never change (the example snippets) are pre-bound with
+# `bind()`, so a tool call only renders its per-call fields instead of running
+# str.format over the whole template.
+#
+# Lookups never touch the disk once the registry is preloaded (runtime warm-up, or
+# `ensure_loaded()` from an async caller): the files are read in a worker thread, and
+# `watch()` re-checks their mtimes there every PROMPT_RELOAD_INTERVAL seconds
+# (negative disables it), reloading changed files and picking up new ones.
+import asyncio
+import os
+import logging
+import threading
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt")
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+_formatter = Formatter()
+
+# (literal_text, field_name, format_spec, conversion); field_name is None for pure literals
+Piece = Tuple[str, Optional[str], str, Optional[str]]
+
+
+# ================================================================================
+# TEMPLATE
+# ================================================================================
+
+class Template:
+    """A str.format-style template pre-split into literal text and field slots."""
+
+    def __init__(self, pieces: List[Piece]):
+        self.pieces = pieces
+        self.fields = {name for _, name, _, _ in pieces if name is not None}
+
+    @classmethod
+    def parse(cls, text: str) -> "Template":
+        pieces = [
+            (literal, name, spec or "", conversion)
+            for literal, name, spec, conversion in _formatter.parse(text)
+        ]
+        return cls(pieces)
+
+    @staticmethod
+    def _format_field(name: str, spec: str, conversion: Optional[str], values: Dict[str, object]) -> str:
+        value, _ = _formatter.get_field(name, (), values)
+        value = _formatter.convert_field(value, conversion)
+        return format(value, spec)
+
+    def partial(self, **values) -> "Template":
+        """Render the fields present in `values` now and keep the others as slots."""
+        pieces: List[Piece] = []
+        literal_run: List[str] = []
+        for literal, name, spec, conversion in self.pieces:
+            literal_run.append(literal)
+            if name is None:
+                continue
+            if name.split(".", 1)[0].split("[", 1)[0] in values:
+                literal_run.append(self._format_field(name, spec, conversion, values))
+                continue
+            pieces.append(("".join(literal_run), name, spec, conversion))
+            literal_run = []
+        if literal_run:
+            pieces.append(("".join(literal_run), None, "", None))
+        return Template(pieces)
+
+    def render(self, **values) -> str:
+        """Fill the remaining fields (KeyError on a missing one, like str.format)."""
+        parts: List[str] = []
+        for literal, name, spec, conversion in self.pieces:
+            parts.append(literal)
+            if name is not None:
+                parts.append(self._format_field(name, spec, conversion, values))
+        return "".join(parts)
+
+
+# ================================================================================
+# REGISTRY
+# ================================================================================
+
+class TemplateRegistry:
+    """Loads prompt files once, keeps them parsed in memory and hot-reloads on mtime change."""
+
+    def __init__(self, root: str = PROMPT_DIR, reload_interval: float = PROMPT_RELOAD_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self._files: Dict[str, dict] = {}
+        self._bound: Dict[tuple, Template] = {}
+        self._lock = threading.Lock()
+        self._preloaded = False
+
+    def _path(self, folder_name: str, file_name: str) -> str:
+        return os.path.join(self.root, folder_name, file_name)
+
+    def _read(self, path: str, file_name: str, folder_name: str) -> dict:
+        if not os.path.isfile(path):
+            logger.error(f"File '{file_name}' not found at path '{path}'.")
+            raise FileNotFoundError(f"File '{file_name}' not found in '{os.path.dirname(path)}'. Searched path: {path}")
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        entry = {"text": text, "mtime": os.stat(path).st_mtime_ns, "template": None}
+        logger.debug(f"Loaded prompt file '{folder_name}/{file_name}' ({len(text)} chars)")
+        return entry
+
+    def _load(self, path: str, folder_name: str, file_name: str) -> dict:
+        with self._lock:
+            entry = self._read(path, file_name, folder_name)
+            self._files[path] = entry
+            # Drop partials built from the old text
+            self._bound = {key: tpl for key, tpl in self._bound.items() if key[0] != path}
+        return entry
+
+    def _entry(self, folder_name: str, file_name: str) -> dict:
+        path = self._path(folder_name, file_name)
+        entry = self._files.get(path)
+        if entry is not None:
+            return entry
+        if self._preloaded:
+            # Every file under the root is in memory (watch() adds new ones): no disk access here
+            logger.error(f"File '{file_name}' not found at path '{path}'.")
+            raise FileNotFoundError(f"File '{file_name}' not found in '{os.path.dirname(path)}'. Searched path: {path}")
+        return self._load(path, folder_name, file_name)
+
+    def _walk(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            folder_name = os.path.relpath(dirpath, self.root)
+            folder_name = "" if folder_name == "." else folder_name
+            for file_name in filenames:
+                yield folder_name, file_name
+
+    def is_loaded(self, folder_name: str, file_name: str) -> bool:
+        return self._path(folder_name, file_name) in self._files
+
+    def text(self, folder_name: str, file_name: str) -> str:
+        """Raw file content (FileNotFoundError when missing)."""
+        return self._entry(folder_name, file_name)["text"]
+
+    def template(self, folder_name: str, file_name: str) -> Template:
+        """Parsed template for the file."""
+        entry = self._entry(folder_name, file_name)
+        if entry["template"] is None:
+            entry["template"] = Template.parse(entry["text"])
+        return entry["template"]
+
+    def bind(self, folder_name: str, file_name: str, **static_values) -> Template:
+        """Template with `static_values` pre-rendered; cached until the file or a value changes."""
+        template = self.template(folder_name, file_name)
+        path = self._path(folder_name, file_name)
+        key = (path, self._files[path]["mtime"], tuple(sorted((k, hash(v)) for k, v in static_values.items())))
+        bound = self._bound.get(key)
+        if bound is None:
+            bound = template.partial(**static_values)
+            self._bound[key] = bound
+        return bound
+
+    def example(self, folder_name: str, file_name: str) -> str:
+        """Content of an example snippet, or "" (with a warning) when the file is missing."""
+        try:
+            return self.text(folder_name, file_name)
+        except FileNotFoundError as e:
+            logger.warning(f"Could not load example/template file: {e}. Tool prompts might be incomplete.")
+            # Remember the miss so the warning is not repeated on every call
+            self._files[self._path(folder_name, file_name)] = {"text": "", "mtime": None, "template": None}
+            return ""
+
+    def preload(self) -> int:
+        """Read every file under the prompt root (blocking; startup warm-up). Returns the file count."""
+        count = 0
+        for folder_name, file_name in self._walk():
+            self._load(self._path(folder_name, file_name), folder_name, file_name)
+            count += 1
+        self._preloaded = True
+        return count
+
+    async def ensure_loaded(self) -> None:
+        """Preload in a worker thread if the warm-up has not done it yet."""
+        if not self._preloaded:
+            await asyncio.to_thread(self.preload)
+
+    def refresh(self) -> int:
+        """
+        Reload files whose mtime changed and load new ones (blocking). Deleted files
+        keep their last content. Returns the number of files (re)loaded.
+        """
+        count = 0
+        for folder_name, file_name in self._walk():
+            path = self._path(folder_name, file_name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            entry = self._files.get(path)
+            if entry is not None and entry["mtime"] == mtime:
+                continue
+            logger.info(f"Prompt file changed on disk, reloading: {folder_name}/{file_name}")
+            self._load(path, folder_name, file_name)
+            count += 1
+        return count
+
+    async def watch(self) -> None:
+        """Run refresh() in a worker thread every reload_interval seconds (until cancelled)."""
+        if self.reload_interval < 0:
+            return
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Prompt reload check failed: {e}")
+
+
+prompts = TemplateRegistry()
@@ -4,10 +4,12 @@ import logging # Import the logging library
 from typing import Optional, Type
 from pydantic import BaseModel, Field
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
 from langchain_core.tools import tool
+from src.Agents.LLM import get_chat_model
+from .templates import prompts
+from .xml_check import StructuralXmlCheck
 import asyncio
+import time
 
 # ================================================================================
 # LOGGING CONFIGURATION
@@ -29,14 +31,14 @@ if not OPENAI_API_KEY:
 
 MODEL_NAME = "gpt-4.1" # Or your preferred model
 
-# Use centralized LLM configuration instead of creating separate instances
+# Use centralized, pooled LLM clients instead of creating separate instances per call
 def get_mw_llm():
     """Get LLM instance for MW Migration tools"""
-    return ChatOpenAI(model_name=MODEL_NAME, temperature=0, api_key=OPENAI_API_KEY)
+    return get_chat_model(MODEL_NAME, temperature=0, api_key=OPENAI_API_KEY)
 
 def get_thinking_llm():
     """Get thinking LLM instance for MW Migration tools"""
-    return ChatOpenAI(model_name="o3-mini", api_key=OPENAI_API_KEY)
+    return get_chat_model("o3-mini", api_key=OPENAI_API_KEY)
 
 # Create instances dynamically when needed (not at import time)
 LLM = None  # Will be set dynamically
@@ -59,103 +61,61 @@ EXAMPLE_DIR = "example"
 # ================================================================================
 
 async def load_file(folder_name: str, file_name: str) -> str:
-    """Load file content from a specified folder"""
-    logger.debug(f"Attempting to load file '{file_name}' from folder '{folder_name}'")
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    prompt_base_dir = os.path.join(base_dir, 'prompt')
-    folder_path = os.path.join(prompt_base_dir, folder_name)
-    full_path = os.path.join(folder_path, file_name)
-    if not os.path.isfile(full_path):
-        logger.error(f"File '{file_name}' not found at path '{full_path}'.")
-        raise FileNotFoundError(f"File '{file_name}' not found in '{folder_path}'. Searched path: {full_path}")
-    try:
-        with asyncio.open(full_path, 'r', encoding='utf-8') as file:
-            content = await file.read()
-            logger.debug(f"Successfully loaded file '{file_name}'. Content length: {len(content)}")
-            return content
-    except Exception as e:
-        logger.error(f"Error reading file '{full_path}': {e}", exc_info=True)
-        raise # Re-raise the exception after logging
+    """Load file content from a specified folder without blocking the event loop"""
+    if prompts.is_loaded(folder_name, file_name):
+        return prompts.text(folder_name, file_name)
+    return await asyncio.to_thread(prompts.text, folder_name, file_name)
 
 
 def load_file_sync(folder_name: str, file_name: str) -> str:
     """Load file content from a specified folder (synchronous version)"""
-    logger.debug(f"Attempting to load file '{file_name}' from folder '{folder_name}'")
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    prompt_base_dir = os.path.join(base_dir, 'prompt')
-    folder_path = os.path.join(prompt_base_dir, folder_name)
-    full_path = os.path.join(folder_path, file_name)
-    if not os.path.isfile(full_path):
-        logger.error(f"File '{file_name}' not found at path '{full_path}'.")
-        raise FileNotFoundError(f"File '{file_name}' not found in '{folder_path}'. Searched path: {full_path}")
-    try:
-        with open(full_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            logger.debug(f"Successfully loaded file '{file_name}'. Content length: {len(content)}")
-            return content
-    except Exception as e:
-        logger.error(f"Error reading file '{full_path}': {e}", exc_info=True)
-        raise # Re-raise the exception after logging
+    return prompts.text(folder_name, file_name)
 
 # ================================================================================
-# TEMPLATE/EXAMPLE FILE LOADING
+# TEMPLATE/EXAMPLE FILES
 # ================================================================================
+# Example snippets are read once through the template registry (not at import time)
+# and pre-bound into the prompt templates that use them.
 
-try:
-    logger.info("Loading example/template files...")
-    
+EXAMPLE_FILES = {
     # Request-related examples
-    request_mw_example = load_file_sync(EXAMPLE_DIR, "request_mw_example.txt")
-    request_wso2_example = load_file_sync(EXAMPLE_DIR, "request_wso2_example.txt")
-    incoming_request = load_file_sync(EXAMPLE_DIR, "incoming_request.txt")
-    sample_request = load_file_sync(EXAMPLE_DIR, "sample_request.txt")
-
+    "request_mw_example": "request_mw_example.txt",
+    "request_wso2_example": "request_wso2_example.txt",
+    "incoming_request": "incoming_request.txt",
+    "sample_request": "sample_request.txt",
     # Response-related examples
-    response_wso2_example = load_file_sync(EXAMPLE_DIR, "response_wso2_example.txt")
-    xparam = load_file_sync(EXAMPLE_DIR, "xparam.txt")
-    MultiOptions = load_file_sync(EXAMPLE_DIR, "MultiOptions.txt")
-
+    "response_wso2_example": "response_wso2_example.txt",
+    "xparam": "xparam.txt",
+    "MultiOptions": "MultiOptions.txt",
     # Dataservice-related examples
-    dataservice_example = load_file_sync(EXAMPLE_DIR, "dataservice_connection.txt")
-    dataservice_varHandler = load_file_sync(EXAMPLE_DIR, "dataservice_varHandler.txt")
-
+    "dataservice_example": "dataservice_connection.txt",
+    "dataservice_varHandler": "dataservice_varHandler.txt",
     # General mapping and handling examples
-    general_mapper = load_file_sync(EXAMPLE_DIR, "general_mapper.txt")
-    variable_handling = load_file_sync(EXAMPLE_DIR, "variable_handling.txt")
-
+    "general_mapper": "general_mapper.txt",
+    "variable_handling": "variable_handling.txt",
     # Failure handling examples
-    dafault_failure_handling = load_file_sync(EXAMPLE_DIR, "dafault_failure_handling.txt")
-    special_failure_handling = load_file_sync(EXAMPLE_DIR, "special_failure_handling.txt")
+    "dafault_failure_handling": "dafault_failure_handling.txt",
+    "special_failure_handling": "special_failure_handling.txt",
+    "wso2_fault_exception": "wso2-fault.txt",
+    # Additional mediator examples
+    "extra_data_mediator": "extra_data_mediator.txt",
+    "multioption_tag_mediator": "multioption_tag_mediator.txt",
+}
 
 
-    wso2_fault_exception = load_file_sync(EXAMPLE_DIR, "wso2-fault.txt")
-    # Additional mediator examples
-    extra_data_mediator = load_file_sync(EXAMPLE_DIR, "extra_data_mediator.txt")
-    multioption_tag_mediator = load_file_sync(EXAMPLE_DIR, "multioption_tag_mediator.txt")
-    
-    logger.info("Example/template files loaded successfully.")
-
-except FileNotFoundError as e:
-    logger.warning(f"Could not load example/template file: {e}. Tool prompts might be incomplete.")
-    # Assign empty strings or default values for missing files
-    request_mw_example = ""
-    request_wso2_example = ""
-    dataservice_example = ""
-    general_mapper = ""
-    response_wso2_example = ""
-    wso2_fault_exception = ""
-    incoming_request = ""
-    sample_request = ""
-    xparam = ""
-    MultiOptions = ""
-    dataservice_varHandler = ""
-    variable_handling = ""
-    dafault_failure_handling = ""
-    special_failure_handling = ""
-    extra_data_mediator = ""
-    multioption_tag_mediator = ""
-except Exception as e:
-    logger.error(f"Unexpected error loading example/template files: {e}", exc_info=True)
+def example(name: str) -> str:
+    """Content of an example snippet ("" when the file is missing)."""
+    return prompts.example(EXAMPLE_DIR, EXAMPLE_FILES[name])
+
+
+def bind_examples(folder_name: str, file_name: str, **example_fields):
+    """
+    Registry template with its static example fields pre-rendered.
+    `example_fields` maps template placeholder -> EXAMPLE_FILES key.
+    """
+    static_values = {field: example(name) for field, name in example_fields.items()}
+    return prompts.bind(folder_name, file_name, **static_values)
+
 
 # ================================================================================
 # PYDANTIC INPUT SCHEMAS
@@ -184,6 +144,15 @@ class GenerateWso2ResponseInput(BaseModel):
     input_response_structure:str = Field(description="What is the structure of the input response to the sequence?")
     service_name: str = Field(description="What is the name of the service?")
     dataservice_code: Optional[str] = Field(None, description="Optional WSO2 Dataservice (.dbs) XML configuration generated previously, to be potentially referenced by the sequence.")
+
+class ListProjectFilesInput(BaseModel):
+    project_id: str = Field(..., description="Id of the uploaded project (prj_...), as given in the conversation")
+    pattern: str = Field("", description="Case-insensitive substring of the path, e.g. the service name or 'dto'")
+    kind: str = Field("", description="Optional file kind: java, xml, properties, yaml, json, build, ...")
+
+class ReadProjectFileInput(BaseModel):
+    project_id: str = Field(..., description="Id of the uploaded project (prj_...)")
+    path: str = Field(..., description="Path of the file exactly as returned by list_project_files")
     
 
 
@@ -192,56 +161,108 @@ class GenerateWso2ResponseInput(BaseModel):
 # ================================================================================
 
 # --- WSO2 Request Sequence Generation ---
+# Reflection policy for the request sequence (REQUEST_SEQUENCE_MODE):
+#   full     - always run the self-reflection pass (previous behaviour)
+#   fast     - return the baseline when it passes the structural XML check, reflect otherwise
+#   baseline - never reflect
+REQUEST_SEQUENCE_MODES = ("full", "fast", "baseline")
+REQUEST_SEQUENCE_MODE = os.getenv("REQUEST_SEQUENCE_MODE", "full").lower()
+if REQUEST_SEQUENCE_MODE not in REQUEST_SEQUENCE_MODES:
+    logger.warning("Unknown REQUEST_SEQUENCE_MODE=%s, using 'full'", REQUEST_SEQUENCE_MODE)
+    REQUEST_SEQUENCE_MODE = "full"
+
+
+def _request_sequence_templates():
+    """Load and pre-bind the layer 2 / layer 3 templates (runs in a worker thread)."""
+    generation_template = bind_examples(
+        REQUEST_DIR, "request_WSO2_GENERATION.txt",
+        incoming_request="incoming_request",
+        variable_handling="variable_handling",
+        dataservice_varHandler="dataservice_varHandler",
+        dataservice_connection="dataservice_example",
+        general_mapper="general_mapper",
+        sample_request="sample_request",
+    )
+    reflection_template = bind_examples(
+        REQUEST_DIR, "SELF_REFLECTION_1.txt",
+        general_mapper="general_mapper",
+        incoming_request="incoming_request",
+    )
+    return generation_template, reflection_template
+
+
+async def _stream_content(llm_instance, messages, check: Optional[StructuralXmlCheck] = None) -> str:
+    """Stream a model answer, feeding each chunk to `check` as it arrives; returns the full text."""
+    parts = []
+    async for chunk in llm_instance.astream(messages):
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if text:
+            parts.append(text)
+            if check is not None:
+                check.feed(text)
+    return "".join(parts)
+
+
 async def generate_wso2_request_sequence(source_code: str, service_name: str, request_parameters: str, request_type: str,
-    hard_coded_parameters: str, configuration_parameters: str, HTTP_HEADERS: str) -> str:
+    hard_coded_parameters: str, configuration_parameters: str, HTTP_HEADERS: str, mode: Optional[str] = None) -> str:
     """
     Business‑logic wrapper: calls prompt templates, LLMs, etc.
     Keep this function unaware of the LangChain tool layer.
+
+    Staged pipeline: the layer 2/3 templates are loaded while the Java analysis runs,
+    the baseline is streamed through a structural XML check, and `mode` (default
+    REQUEST_SEQUENCE_MODE) decides whether the self-reflection pass runs.
     """
+    mode = (mode or REQUEST_SEQUENCE_MODE).lower()
+    templates_task = None
     try:
-        logger.info("Generating WSO2 request sequence for %s", service_name)
+        logger.info("Generating WSO2 request sequence for %s (mode=%s)", service_name, mode)
+        started = time.perf_counter()
+
+        await prompts.ensure_loaded()
+        # Prefetch: load/bind the later templates in a thread while layer 1 runs
+        templates_task = asyncio.create_task(asyncio.to_thread(_request_sequence_templates))
 
         # LAYER 1: JAVA SOURCE CODE ANALYSIS
-        source_code_analysis = await load_file(REQUEST_DIR, "java_source_code_analysis.txt").format(
+        source_code_analysis = prompts.template(REQUEST_DIR, "java_source_code_analysis.txt").render(
             java_source_code=source_code
         )
         
         # Get thinking LLM instance dynamically
         thinking_llm_instance = get_thinking_llm()
-        java_analysis = thinking_llm_instance.invoke([SystemMessage(content=source_code_analysis)]).content
+        java_analysis = (await thinking_llm_instance.ainvoke([SystemMessage(content=source_code_analysis)])).content
+        logger.info("Request sequence: java analysis done in %.1fs", time.perf_counter() - started)
                       
-        # LAYER 2: BASELINE OUTPUT
-        generation_prompt_template = await load_file(REQUEST_DIR, "request_WSO2_GENERATION.txt")
-
-        prompt = generation_prompt_template.format(
+        # LAYER 2: BASELINE OUTPUT (example snippets are pre-bound; only per-call fields are rendered)
+        generation_template, reflection_template = await templates_task
+        prompt = generation_template.render(
             java_analysis=java_analysis,
             service_name=service_name,
-            incoming_request=incoming_request,
             request_parameters=request_parameters,
             request_type=request_type,
             hard_coded_parameters=hard_coded_parameters,
-            variable_handling=variable_handling,
             configuration_parameters=configuration_parameters,
             HTTP_HEADERS=HTTP_HEADERS,
-            dataservice_varHandler=dataservice_varHandler,
-            dataservice_connection=dataservice_example,
-            general_mapper=general_mapper,
-            sample_request=sample_request
         )
 
-        # Get LLM instance dynamically
+        # Get LLM instance dynamically; the structural check runs on the tokens as they stream in
         llm_instance = get_mw_llm()
-        BASELINE_WSO2_CODE = await llm_instance.ainvoke([SystemMessage(content=prompt)]).content
+        check = StructuralXmlCheck(root_tag="sequence")
+        BASELINE_WSO2_CODE = await _stream_content(llm_instance, [SystemMessage(content=prompt)], check)
+        logger.info("Request sequence: baseline done in %.1fs (structure: %s)", time.perf_counter() - started, check.reason())
+
+        if mode == "baseline" or (mode == "fast" and check.passed):
+            logger.info("Request sequence: skipping self-reflection (mode=%s)", mode)
+            return BASELINE_WSO2_CODE
         
         # LAYER 3: SELF-REFLECTION
-        reflection_prompt = await load_file(REQUEST_DIR, "SELF_REFLECTION_1.txt").format(
+        reflection_prompt = reflection_template.render(
             wso2_generated_file=BASELINE_WSO2_CODE,
             configuration_parameters=configuration_parameters,
-            general_mapper=general_mapper,
-            incoming_request=incoming_request
         )
         # Use same LLM instance for consistency
-        wso2_refined = await llm_instance.ainvoke([SystemMessage(content=reflection_prompt)]).content
+        wso2_refined = (await llm_instance.ainvoke([SystemMessage(content=reflection_prompt)])).content
+        logger.info("Request sequence: reflection done in %.1fs", time.perf_counter() - started)
         
         return wso2_refined
 
@@ -253,22 +274,29 @@ async def generate_wso2_request_sequence(source_code: str, service_name: str, re
         logger.exception("Unexpected error while building WSO2 sequence")
         return f"Tool Error: {e}"
 
+    finally:
+        if templates_task is not None:
+            if not templates_task.done():
+                templates_task.cancel()
+            elif not templates_task.cancelled():
+                templates_task.exception()  # already reported above when it mattered
+
 # --- WSO2 Dataservice Configuration Generation ---
 async def generate_wso2_dataservice_config(db_logging_logic: str, user_requirements_db: Optional[str] = None) -> str:
     """Generates WSO2 Dataservice (.dbs) XML config based on DB logging logic."""
     logger.info("--- Entering Tool: generate_wso2_dataservice_config ---")
     try:
+        await prompts.ensure_loaded()
         prompt_file = "response_DATASERVICE_GENERATION.txt"
         logger.debug(f"Loading dataservice generation prompt from: {RESPONSE_DIR}/{prompt_file}")
-        prompt_template = await load_file(RESPONSE_DIR, prompt_file)
+        prompt_template = prompts.template(RESPONSE_DIR, prompt_file)
 
         required_keys_ds = ["dataservice_example"]
-        if not all(f"{{{key}}}" in prompt_template for key in required_keys_ds):
+        if not all(key in prompt_template.fields for key in required_keys_ds):
              logger.warning(f"Potential missing keys in {prompt_file}. Required: {required_keys_ds}")
 
-        prompt_text = prompt_template.format(
-            dataservice_example=dataservice_example
-        )
+        # Every field of this template is a static example: fully pre-rendered and cached
+        prompt_text = bind_examples(RESPONSE_DIR, prompt_file, dataservice_example="dataservice_example").render()
 
         human_message_content = f"Generate the WSO2 Dataservice connection based on the following database logging requirements:\n```\n{db_logging_logic}\n```"
         if user_requirements_db:
@@ -319,7 +347,7 @@ async def generate_wso2_response_sequence(
     logger.info(f"Dataservice code provided: {bool(dataservice_code)}")
 
     try:
-        
+        await prompts.ensure_loaded()
         human_message_content = f"""Generate a WSO2 response sequence based strictly on the following requirements:
             1.  **Service Name:** {service_name}
             2.  **Expected Response Structure:** This is the expected response structure that will be input to the response sequence: ```{input_response_structure}```
@@ -359,24 +387,26 @@ async def generate_wso2_response_sequence(
             """
         prompt_file = "response_WSO2_GENERATION.txt"
         logger.debug(f"Loading response sequence generation prompt from: {RESPONSE_DIR}/{prompt_file}")
-        prompt_template = await load_file(RESPONSE_DIR, prompt_file) 
+        prompt_template = prompts.template(RESPONSE_DIR, prompt_file)
 
 
         required_keys_seq = ["wso2_example", "dataservice_code"]
-        if not all(f"{{{key}}}" in prompt_template for key in required_keys_seq):
+        if not all(key in prompt_template.fields for key in required_keys_seq):
              logger.warning(f"Potential missing keys in {prompt_file}. Required: {required_keys_seq}")
 
-        prompt_text = prompt_template.format(
-            wso2_example=response_wso2_example,
+        prompt_text = bind_examples(
+            RESPONSE_DIR, prompt_file,
+            wso2_example="response_wso2_example",
+            MultiOptions="MultiOptions",
+            xparam="xparam",
+            special_failure_handling="special_failure_handling",
+            dafult_failure_handling="dafault_failure_handling",
+            variable_handling="variable_handling",
+            multioption_tag_mediator="multioption_tag_mediator",
+            extra_data_mediator="extra_data_mediator",
+        ).render(
             dataservice_code=dataservice_code,
-            MultiOptions=MultiOptions,
-            xparam=xparam,
             fail_DTO_xparam_parameters=fail_DTO_xparam_parameters,
-            special_failure_handling=special_failure_handling,
-            dafult_failure_handling=dafault_failure_handling,
-            variable_handling=variable_handling,
-            multioption_tag_mediator=multioption_tag_mediator,
-            extra_data_mediator=extra_data_mediator
         )
         logger.info(f"Response Sequence Prompt Text: {prompt_text}")
         logger.debug(f"Response Sequence Human Message (start): {human_message_content[:100]}...")
@@ -389,13 +419,12 @@ async def generate_wso2_response_sequence(
         llm_instance = get_mw_llm()
         WSO2_CODE = await llm_instance.ainvoke(messages)
         wso2_generated = WSO2_CODE.content
-        self_reflection = await load_file(RESPONSE_DIR,"RS_SLF_REFLECT.txt")
-        self_reflection_prompt = self_reflection.format(
+        self_reflection_prompt = prompts.template(RESPONSE_DIR, "RS_SLF_REFLECT.txt").render(
             wso2_generated_file=wso2_generated,
             service_name=service_name
         )
         # Use same LLM instance for consistency
-        refined_wso2_code = await llm_instance.ainvoke([SystemMessage(content=self_reflection_prompt)]).content
+        refined_wso2_code = (await llm_instance.ainvoke([SystemMessage(content=self_reflection_prompt)])).content
         logger.info(f"Generated response sequence received (start): {refined_wso2_code[:200]}...")
         logger.info("--- Exiting Tool: generate_wso2_response_sequence (Success) ---")
         return refined_wso2_code
@@ -453,10 +482,46 @@ async def generate_wso2_response_sequence(
 #         return f"Tool Error: An unexpected error occurred while generating the fault sequence: {e}"
 
 
+# --- Project sources (archives ingested through /agent/projects) ---
+PROJECT_LIST_LIMIT = 200
+PROJECT_READ_MAX_CHARS = int(os.getenv("PROJECT_READ_MAX_CHARS", "60000"))
+
+def list_project_files(project_id: str, pattern: str = "", kind: str = "") -> str:
+    from src.Agents.sources.store import source_store
+    try:
+        files = source_store.list_files(project_id, pattern, kind)
+    except KeyError:
+        return f"Tool Error: unknown project {project_id}"
+    lines = [f"{f.path}  ({f.kind}, {f.lines} lines)" for f in files[:PROJECT_LIST_LIMIT]]
+    if len(files) > PROJECT_LIST_LIMIT:
+        lines.append(f"... {len(files) - PROJECT_LIST_LIMIT} more files, narrow the pattern")
+    return "\n".join(lines) if lines else "No matching files."
+
+def read_project_file(project_id: str, path: str) -> str:
+    from src.Agents.sources.store import source_store
+    try:
+        content = source_store.read_file(project_id, path)
+    except KeyError:
+        return f"Tool Error: file {path} not found in project {project_id}"
+    if len(content) > PROJECT_READ_MAX_CHARS:
+        content = content[:PROJECT_READ_MAX_CHARS] + f"\n...[truncated {len(content) - PROJECT_READ_MAX_CHARS} chars]"
+    return content
+
+
 # ================================================================================
 # LANGCHAIN TOOL DECORATORS
 # ================================================================================
 
+@tool(args_schema=ListProjectFilesInput)
+async def list_project_files_tool(project_id: str, pattern: str = "", kind: str = "") -> str:
+    """Lists the files of an uploaded project (path, kind, lines), filtered by path substring and kind."""
+    return await asyncio.to_thread(list_project_files, project_id, pattern, kind)
+
+@tool(args_schema=ReadProjectFileInput)
+async def read_project_file_tool(project_id: str, path: str) -> str:
+    """Returns the content of one file of an uploaded project."""
+    return await asyncio.to_thread(read_project_file, project_id, path)
+
 @tool(args_schema=GenerateWso2RequestInput)
 async def generate_wso2_request_sequence_tool(source_code: str, service_name: str, request_parameters: str, request_type: str, hard_coded_parameters: str, configuration_parameters: str, HTTP_HEADERS: str) -> str:
     """Generates WSO2 request sequence XML. Analyzes Camel, uses requirements, produces sequence."""
@@ -494,6 +559,11 @@ available_tools_decorated = [
     generate_wso2_request_sequence_tool,
     generate_wso2_dataservice_config_tool,
     generate_wso2_response_sequence_tool,
+    list_project_files_tool,
+    read_project_file_tool,
 ]
 
+# Read-only lookups the agent node may chain before answering
+PROJECT_SOURCE_TOOLS = {list_project_files_tool.name, read_project_file_tool.name}
+
 logger.info("Tools module initialized with decorated tools.")
\ No newline at end of file
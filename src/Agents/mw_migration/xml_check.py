@@ -0,0 +1,82 @@
+# xml_check.py
+# Cheap, incremental structural check for generated WSO2 XML.
+#
+# The checker is fed the model output chunk by chunk while it streams. It skips any
+# prose / ```xml fence before the first tag, pushes the rest through an
+# XMLPullParser and stops once the root element closes. By the time the last token
+# arrives the verdict is ready, so deciding whether a reflection pass is needed adds
+# no latency. It checks well-formedness and the root tag only, not semantics.
+import re
+import logging
+from typing import Optional
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+logger = logging.getLogger(__name__)
+
+# First tag-like token: an XML declaration, a comment or an element
+_XML_START = re.compile(r"<(\?xml|!--|[A-Za-z_])")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class StructuralXmlCheck:
+    """Incremental well-formedness + root-tag check of streamed XML output."""
+
+    def __init__(self, root_tag: Optional[str] = "sequence"):
+        self.root_tag = root_tag
+        self.root = None
+        self.error: Optional[str] = None
+        self.complete = False
+        self._parser: Optional[XMLPullParser] = None
+        self._pending = ""
+        self._depth = 0
+
+    def feed(self, text: str) -> None:
+        if not text or self.complete or self.error:
+            return
+        if self._parser is None:
+            self._pending += text
+            match = _XML_START.search(self._pending)
+            if match is None:
+                return
+            text = self._pending[match.start():]
+            self._pending = ""
+            self._parser = XMLPullParser(events=("start", "end"))
+        self._parser.feed(text)
+        self._drain()
+
+    def _drain(self) -> None:
+        try:
+            for event, element in self._parser.read_events():
+                if event == "start":
+                    if self._depth == 0:
+                        self.root = _local_name(element.tag)
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        # Root closed: whatever follows (closing fence, notes) is not XML
+                        self.complete = True
+                        return
+        except ParseError as e:
+            self.error = str(e)
+
+    @property
+    def passed(self) -> bool:
+        """True when a complete, well-formed document with the expected root was seen."""
+        if not self.complete or self.error:
+            return False
+        return self.root_tag is None or self.root == self.root_tag
+
+    def reason(self) -> str:
+        if self.error:
+            return f"not well-formed: {self.error}"
+        if self._parser is None:
+            return "no XML found"
+        if not self.complete:
+            return "document is truncated"
+        if not self.passed:
+            return f"unexpected root <{self.root}>"
+        return "ok"
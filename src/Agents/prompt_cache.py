@@ -0,0 +1,65 @@
+# src/Agents/prompt_cache.py
+# Helpers for provider prompt-prefix caching.
+#
+# Providers cache the longest byte-identical prefix of a request (OpenAI: automatic
+# for prompts >= 1024 tokens). To benefit, every agent sends its large static system
+# prompt first and unchanged, followed by the per-thread content (history summary,
+# conversation, per-call hints). `prompt_cache_key` routes requests that share a
+# prefix to the same cache shard. Cached vs. uncached input tokens are recorded per
+# agent from the response usage metadata.
+import hashlib
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+from langchain_core.messages import SystemMessage
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_HINTS = os.getenv("PROMPT_CACHE_HINTS", "1") == "1"
+
+_static_messages: Dict[str, SystemMessage] = {}
+_usage: Dict[str, Dict[str, int]] = {}
+_usage_lock = threading.Lock()
+
+
+def _prefix_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def static_system_message(text: str) -> SystemMessage:
+    """Return one shared SystemMessage per static prompt, so the prefix is identical on every call."""
+    message = _static_messages.get(text)
+    if message is None:
+        message = _static_messages.setdefault(text, SystemMessage(content=text))
+    return message
+
+
+def cache_hints(agent: str, static_prompt: str) -> Dict[str, Any]:
+    """Invocation kwargs that ask the provider to reuse the cached prefix of `static_prompt`."""
+    if not PROMPT_CACHE_HINTS:
+        return {}
+    return {"extra_body": {"prompt_cache_key": f"seq_sonic:{agent}:{_prefix_hash(static_prompt)}"}}
+
+
+def record_usage(agent: str, response: Any) -> None:
+    """Accumulate cached / uncached input tokens reported for one model call."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    input_tokens = usage.get("input_tokens") or 0
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    with _usage_lock:
+        stats = _usage.setdefault(agent, {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "uncached_input_tokens": 0})
+        stats["calls"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_input_tokens"] += cached
+        stats["uncached_input_tokens"] += input_tokens - cached
+    logger.info("[%s] input tokens: %s (cached %s, uncached %s)", agent, input_tokens, cached, input_tokens - cached)
+
+
+def usage_stats() -> Dict[str, Dict[str, int]]:
+    """Snapshot of the per-agent prompt-cache counters."""
+    with _usage_lock:
+        return {agent: dict(stats) for agent, stats in _usage.items()}
@@ -1,32 +1,116 @@
 # src/Agents/runtime.py
-import os, importlib
-from pymongo import MongoClient
+import os, importlib, asyncio, logging, warnings
+from pymongo import AsyncMongoClient
 
-from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+
+from src.Agents.checkpoint_indexes import ensure_indexes, check_lookups
+from src.Agents.checkpoint_retention import enable_compression
+
+logger = logging.getLogger(__name__)
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://mongo:27017")
 DB_NAME      = os.getenv("MONGODB_DB_NAME", os.getenv("MONGODB_DB", "seq_sonic"))
 
-_client       = MongoClient(MONGODB_URI)
+# Keep the collection names used by the previous sync saver so existing threads load
+CHECKPOINT_COLLECTION = os.getenv("MONGODB_CHECKPOINT_COLLECTION", "checkpoints")
+WRITES_COLLECTION     = os.getenv("MONGODB_WRITES_COLLECTION", "checkpoint_writes")
+
+# Connection pool / timeouts (milliseconds)
+MONGODB_MAX_POOL_SIZE               = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE               = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS            = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS          = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS           = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+
+_client       = None
 _checkpointer = None
 _apps         = {}
+_open_lock    = asyncio.Lock()
+
+
+def _new_client() -> AsyncMongoClient:
+    return AsyncMongoClient(
+        MONGODB_URI,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+    )
+
+
+async def open_checkpointer():
+    """Create the async Mongo client and checkpointer (idempotent). Call from the app lifespan."""
+    global _client, _checkpointer
+    async with _open_lock:
+        if _checkpointer is not None:
+            return _checkpointer
+
+        client = _new_client()
+        with warnings.catch_warnings():
+            # The "use MongoDBSaver async methods" replacement only wraps the sync
+            # driver in a thread pool; the aio saver talks to AsyncMongoClient natively.
+            warnings.simplefilter("ignore", DeprecationWarning)
+            saver = AsyncMongoDBSaver(
+                client,
+                db_name=DB_NAME,
+                checkpoint_collection_name=CHECKPOINT_COLLECTION,
+                writes_collection_name=WRITES_COLLECTION,
+            )
+        # Store large checkpoints / writes compressed (CHECKPOINT_COMPRESSION)
+        enable_compression(saver)
+        try:
+            # Create indexes now; a failed lazy setup would leave the saver unusable
+            await saver._setup()
+        except Exception:
+            await client.close()
+            raise
+        try:
+            # Diagnostics only, never fatal: _setup skips collections that already have
+            # 2+ indexes, so make sure the lookup indexes exist regardless and that the
+            # per-turn lookups use them
+            await ensure_indexes(client[DB_NAME], CHECKPOINT_COLLECTION, WRITES_COLLECTION)
+            for result in await check_lookups(client[DB_NAME], CHECKPOINT_COLLECTION, WRITES_COLLECTION):
+                if result["collscan"]:
+                    logger.error(
+                        "Checkpoint %s lookup on %s is a COLLSCAN (%s); every turn will scan the collection",
+                        result["lookup"], result["collection"], " > ".join(result["stages"]),
+                    )
+        except Exception as e:
+            logger.warning(f"Checkpoint index check failed, continuing without it: {e}")
+
+        _client, _checkpointer = client, saver
+        logger.info("Async Mongo checkpointer ready (db=%s, maxPoolSize=%s)", DB_NAME, MONGODB_MAX_POOL_SIZE)
+        return _checkpointer
+
+
+async def close_checkpointer():
+    """Close the Mongo client and drop the apps compiled against it."""
+    global _client, _checkpointer
+    async with _open_lock:
+        if _client is not None:
+            await _client.close()
+        _client, _checkpointer = None, None
+        _apps.clear()
+
 
 async def get_app(key: str, module_path: str):
-    """Return a compiled app (memoized). Compiles with MongoDBSaver once."""
-    global _checkpointer
+    """Return a compiled app (memoized). Compiles with the async Mongo checkpointer once."""
     if key in _apps:
         return _apps[key]
 
-    # lazy create the checkpointer inside a running loop
-    if _checkpointer is None:
-        _checkpointer = MongoDBSaver(_client, db_name=DB_NAME)
+    # lazy create the checkpointer inside a running loop (no-op when the lifespan opened it)
+    checkpointer = await open_checkpointer()
 
     mod      = importlib.import_module(module_path)
     builder  = getattr(mod, "builder", None)
     compiled = getattr(mod, "compiled_graph", None)
 
     if builder is not None:
-        app = builder.compile(checkpointer=_checkpointer)
+        app = builder.compile(checkpointer=checkpointer)
     elif compiled is not None:
         app = compiled
     else:
@@ -35,15 +119,118 @@ async def get_app(key: str, module_path: str):
     _apps[key] = app
     return app
 
+# Graphs served by the backend (app key -> module with `builder` / `compiled_graph`)
+GRAPH_MODULES = {
+    "sonic":        "src.Agents.sonic.graph",
+    "wso2":         "src.Agents.smart_wso2_assistant.graph",
+    "mw_migration": "src.Agents.mw_migration.graph",
+}
+
 # convenience wrappers
 async def get_sonic_app():
-    return await get_app("sonic", "src.Agents.sonic.graph")
+    return await get_app("sonic", GRAPH_MODULES["sonic"])
 
 async def get_wso2_app():
-    return await get_app("wso2", "src.Agents.smart_wso2_assistant.graph")
+    return await get_app("wso2", GRAPH_MODULES["wso2"])
 
 async def get_mw_migration_app():
-    return await get_app("mw_migration", "src.Agents.mw_migration.graph")
-    
+    return await get_app("mw_migration", GRAPH_MODULES["mw_migration"])
+
 async def get_checkpointer():
-    return _checkpointer
\ No newline at end of file
+    return _checkpointer
+
+def get_mongo_client():
+    """Return the shared AsyncMongoClient (None until open_checkpointer has run)."""
+    return _client
+
+
+# ---- Warm-up / readiness -----------------------------------------------------
+# Each worker process imports and compiles every graph (and reads the prompt files)
+# in the background right after startup, so no user request pays for it while the
+# server itself starts accepting connections immediately. /health reports ready only
+# once all of it succeeded; failed steps are retried.
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "5"))
+
+_readiness         = {"checkpointer": False, "graphs": {key: False for key in GRAPH_MODULES}, "prompts": False}
+_warmup_task       = None
+_prompt_watch_task = None
+
+
+def readiness() -> dict:
+    """Snapshot of the warm-up state of this worker."""
+    return {**_readiness, "graphs": dict(_readiness["graphs"]), "ready": is_ready()}
+
+
+def is_ready() -> bool:
+    return _readiness["checkpointer"] and _readiness["prompts"] and all(_readiness["graphs"].values())
+
+
+async def warm_up() -> bool:
+    """One warm-up pass: open the checkpointer, compile all graphs, load the prompts. Returns readiness."""
+    global _prompt_watch_task
+    try:
+        await open_checkpointer()
+        _readiness["checkpointer"] = True
+    except Exception as e:
+        logger.error(f"Warm-up: Mongo checkpointer not available: {e}")
+
+    for key, module_path in GRAPH_MODULES.items():
+        if _readiness["graphs"][key]:
+            continue
+        try:
+            # Import off the loop (first import of an agent loads langchain / langgraph modules)
+            await asyncio.to_thread(importlib.import_module, module_path)
+            if _readiness["checkpointer"]:
+                await get_app(key, module_path)
+                _readiness["graphs"][key] = True
+        except Exception as e:
+            logger.error(f"Warm-up: failed to build graph '{key}': {e}")
+
+    if not _readiness["prompts"]:
+        try:
+            from src.Agents.mw_migration.templates import prompts
+            count = await asyncio.to_thread(prompts.preload)
+            _readiness["prompts"] = True
+            logger.info("Warm-up: %s prompt files loaded", count)
+            # Hot reload: mtime checks run in a worker thread, not on request paths
+            _prompt_watch_task = asyncio.create_task(prompts.watch())
+        except Exception as e:
+            logger.error(f"Warm-up: failed to load prompt files: {e}")
+    return is_ready()
+
+
+async def _warm_up_until_ready():
+    while not await warm_up():
+        logger.warning(f"Warm-up incomplete, retrying in {WARMUP_RETRY_INTERVAL}s: {readiness()}")
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+    logger.info("Warm-up complete: %s graphs compiled; worker is ready", len(GRAPH_MODULES))
+
+
+def start_warm_up():
+    """Start warming up this worker in the background (call from the app lifespan)."""
+    global _warmup_task
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.create_task(_warm_up_until_ready())
+    return _warmup_task
+
+
+async def stop_warm_up():
+    """Cancel a pending warm-up and reset the readiness state (app shutdown)."""
+    global _warmup_task, _prompt_watch_task
+    if _prompt_watch_task is not None:
+        _prompt_watch_task.cancel()
+        try:
+            await _prompt_watch_task
+        except asyncio.CancelledError:
+            pass
+        _prompt_watch_task = None
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+        _warmup_task = None
+    _readiness["checkpointer"] = False
+    _readiness["prompts"] = False
+    _readiness["graphs"] = {key: False for key in GRAPH_MODULES}
@@ -1,8 +1,4 @@
-from .nodes import *
-from .graph import *
-from .prompts import *
-from .tools import *
-from .models import *
+from src.lazy_imports import lazy_exports
 
 __all__ = [
     "compiled_graph",
@@ -22,3 +18,23 @@ __all__ = [
     "get_llm"
 ]
 
+# Exports are imported on first access (no prompts, tools or graph compile at package import)
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "compiled_graph": (".graph", "compiled_graph"),
+    "smart_wso2_agent": (".nodes", "smart_wso2_agent"),
+    "history_recorder": (".nodes", "history_recorder"),
+    "wso2_SharedState": (".models", "wso2_SharedState"),
+    "history_recorder_prompt": (".prompts", "history_recorder_prompt"),
+    "edit_code_prompt": (".prompts", "edit_code_prompt"),
+    "review_code_prompt": (".prompts", "review_code_prompt"),
+    "java_analyzer_prompt": (".prompts", "java_analyzer_prompt"),
+    "sequence_analyzer_prompt": (".prompts", "sequence_analyzer_prompt"),
+    "code_comparator_prompt": (".prompts", "code_comparator_prompt"),
+    "edit_code_tool": (".tools", "edit_code_tool"),
+    "review_code_tool": (".tools", "review_code_tool"),
+    "java_analyzer_tool": (".tools", "java_analyzer_tool"),
+    "sequence_analyzer_tool": (".tools", "sequence_analyzer_tool"),
+    "code_comparator_tool": (".tools", "code_comparator_tool"),
+    "tools": (".tools", "tools"),
+    "get_llm": ("src.Agents.LLM", "get_llm"),
+})
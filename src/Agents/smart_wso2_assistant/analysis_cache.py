@@ -0,0 +1,202 @@
+# src/Agents/smart_wso2_assistant/analysis_cache.py
+# Content-addressed cache for the deterministic analysis tools.
+#
+# java_analyzer, sequence_analyzer and code_comparator run at temperature 0 and
+# depend only on their input text, the prompt and the model. The cache key is a
+# sha256 over exactly those (input normalized for line endings / trailing blanks),
+# so editing one side of a comparison re-analyses only that side.
+#
+# Tiers:
+#   1. in-process LRU (ANALYSIS_CACHE_SIZE entries)
+#   2. optional Mongo collection with a TTL index (ANALYSIS_CACHE_MONGO=1), shared
+#      by every worker and surviving restarts; uses the runtime's AsyncMongoClient.
+# Concurrent requests for the same key share one model call.
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_ENABLED    = os.getenv("ANALYSIS_CACHE", "1") == "1"
+ANALYSIS_CACHE_SIZE       = int(os.getenv("ANALYSIS_CACHE_SIZE", "512"))
+ANALYSIS_CACHE_MONGO      = os.getenv("ANALYSIS_CACHE_MONGO", "0") == "1"
+ANALYSIS_CACHE_COLLECTION = os.getenv("ANALYSIS_CACHE_COLLECTION", "analysis_cache")
+ANALYSIS_CACHE_TTL        = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def normalize_code(text: str) -> str:
+    """Canonical form used for hashing: LF line endings, no trailing spaces or blank edges."""
+    lines = str(text).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def prompt_version(prompt: str) -> str:
+    """Short content hash of a prompt template; any prompt edit invalidates old entries."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def model_name(llm) -> Optional[str]:
+    """Model identifier of a chat model, or None for clients whose output must not be cached (MockLLM)."""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None)
+
+
+class AnalysisCache:
+    """Two-tier (LRU + optional Mongo) cache with single-flight and hit/miss counters."""
+
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_SIZE, use_mongo: bool = ANALYSIS_CACHE_MONGO,
+                 collection_name: str = ANALYSIS_CACHE_COLLECTION, ttl_seconds: int = ANALYSIS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.use_mongo = use_mongo
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._indexed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "mongo_hits": 0, "shared_hits": 0, "misses": 0, "mongo_errors": 0}
+
+    # ---- keys / stats -------------------------------------------------------
+    @staticmethod
+    def make_key(tool: str, prompt: str, model: str, **inputs: str) -> str:
+        payload = {
+            "tool": tool,
+            "prompt": prompt_version(prompt),
+            "model": model,
+            "inputs": {name: normalize_code(value) for name, value in sorted(inputs.items())},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["mongo_hits"] + stats["shared_hits"]
+        lookups = hits + stats["misses"]
+        stats["entries"] = len(self._lru)
+        stats["hit_ratio"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
+    # ---- in-process tier ----------------------------------------------------
+    def _lru_get(self, key: str) -> Optional[str]:
+        value = self._lru.get(key)
+        if value is not None:
+            self._lru.move_to_end(key)
+        return value
+
+    def _lru_put(self, key: str, value: str) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    # ---- Mongo tier ---------------------------------------------------------
+    async def _collection(self):
+        if not self.use_mongo:
+            return None
+        from src.Agents.runtime import get_mongo_client, DB_NAME
+        client = get_mongo_client()
+        if client is None:
+            return None
+        collection = client[DB_NAME][self.collection_name]
+        if not self._indexed:
+            await collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+            self._indexed = True
+        return collection
+
+    async def _mongo_get(self, key: str) -> Optional[str]:
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return None
+            doc = await collection.find_one({"_id": key}, {"result": 1})
+            return doc["result"] if doc else None
+        except Exception as e:
+            self._count("mongo_errors")
+            logger.warning(f"Analysis cache lookup failed (continuing without it): {e}")
+            return None
+
+    async def _mongo_put(self, key: str, tool: str, value: str) -> None:
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return
+            await collection.replace_one(
+                {"_id": key},
+                {"_id": key, "tool": tool, "result": value, "created_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            self._count("mongo_errors")
+            logger.warning(f"Analysis cache write failed: {e}")
+
+    # ---- public API ---------------------------------------------------------
+    async def get_or_compute(self, key: str, tool: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached result for `key`, or run `compute()` once and store it."""
+        value = self._lru_get(key)
+        if value is not None:
+            self._count("memory_hits")
+            logger.info(f"[analysis_cache] {tool}: memory hit")
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The request that owned the call was cancelled; compute it here instead
+                return await self.get_or_compute(key, tool, compute)
+            self._count("shared_hits")
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._mongo_get(key)
+            if value is not None:
+                self._count("mongo_hits")
+                logger.info(f"[analysis_cache] {tool}: mongo hit")
+            else:
+                self._count("misses")
+                value = await compute()
+                await self._mongo_put(key, tool, value)
+            self._lru_put(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Waiters get the same error; nothing is cached
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+analysis_cache = AnalysisCache()
+
+
+async def cached_analysis(tool: str, prompt: str, llm, compute: Callable[[], Awaitable[str]], **inputs: str) -> str:
+    """Run `compute` through the cache unless caching is disabled or the model is unknown."""
+    model = model_name(llm)
+    if not ANALYSIS_CACHE_ENABLED or not model:
+        return await compute()
+    key = AnalysisCache.make_key(tool, prompt, model, **inputs)
+    return await analysis_cache.get_or_compute(key, tool, compute)
+
+
+def cache_stats() -> Dict[str, float]:
+    """Hit/miss counters of the analysis cache."""
+    return analysis_cache.stats()
@@ -3,6 +3,7 @@ from langgraph.graph import START, END, StateGraph
 from .nodes import *
 from langchain_core.messages import HumanMessage, AIMessage
 from typing import Literal
+from .history import needs_compaction
 
 # Initialize state graph and add nodes
 graph = StateGraph(wso2_SharedState)
@@ -13,8 +14,8 @@ graph.add_node("history_recorder", history_recorder)
 def smart_wso2_agent_router(state: wso2_SharedState) -> Literal["history_recorder", END]:
     """Route from smart_wso2_agent based on conversation length and completion"""
     
-    # Check if we need to record history (memory management)
-    if len(state["messages"]) > 30:
+    # Check if we need to record history (memory management): based on token size
+    if needs_compaction(state["messages"]):
         return "history_recorder"
     
     # Otherwise, end the conversation
@@ -36,5 +37,11 @@ graph.add_edge("history_recorder", END)
 # `builder.compile(checkpointer=...)` to enable DB-backed memory.
 builder = graph
 
-# Compile graph (fallback if runtime does not provide a checkpointer)
-compiled_graph = graph.compile()
+# Compiled without a checkpointer only on first access (fallback for the langgraph CLI);
+# the runtime compiles `builder` with its checkpointer, so importing this module stays cheap.
+def __getattr__(name):
+    if name == "compiled_graph":
+        compiled = graph.compile()
+        globals()["compiled_graph"] = compiled
+        return compiled
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,99 @@
+# src/Agents/smart_wso2_assistant/history.py
+# Incremental conversation history for the Smart WSO2 assistant.
+#
+# `conversation_history` is a compact text log of the thread. Each run appends only
+# the messages whose ids were not recorded yet (`history_recorded_ids`), keeps the
+# most recent HISTORY_MAX_CHARS of the log, and drops old messages from the
+# checkpointed list through RemoveMessage so the add_messages reducer stays in
+# charge. Removal always cuts at a user message, so tool calls and their results
+# are kept or removed together.
+#
+# With the shared ConversationMemory enabled (src/Agents/memory.py), only messages
+# already folded into `memory_summary` (up to `memory_cursor`) are removed: the
+# others still reach the model verbatim and would otherwise be lost to both.
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+from src.Agents.memory import MEMORY_ENABLED, messages_tokens
+
+HISTORY_TRIGGER_TOKENS = int(os.getenv("HISTORY_TRIGGER_TOKENS", "16000"))
+HISTORY_KEEP_TOKENS    = int(os.getenv("HISTORY_KEEP_TOKENS", "6000"))
+HISTORY_MAX_CHARS      = int(os.getenv("HISTORY_MAX_CHARS", "6000"))
+HISTORY_LINE_CHARS     = int(os.getenv("HISTORY_LINE_CHARS", "500"))
+
+_ROLES = {"human": "USER", "ai": "ASSISTANT", "tool": "TOOL", "system": "SYSTEM"}
+
+
+def needs_compaction(messages: List[BaseMessage], trigger_tokens: int = HISTORY_TRIGGER_TOKENS) -> bool:
+    """True when the checkpointed messages exceed the token threshold."""
+    return messages_tokens(messages) > trigger_tokens
+
+
+def _line(message: BaseMessage) -> str:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    content = " ".join(content.split())
+    if not content and getattr(message, "tool_calls", None):
+        content = "called " + ", ".join(call["name"] for call in message.tool_calls)
+    if len(content) > HISTORY_LINE_CHARS:
+        content = content[:HISTORY_LINE_CHARS] + " [...]"
+    return f"{_ROLES.get(message.type, message.type.upper())}: {content}"
+
+
+def _keep_tail(history: str, max_chars: int) -> str:
+    """Most recent `max_chars` of the log, cut at a line boundary."""
+    if len(history) <= max_chars:
+        return history
+    tail = history[-max_chars:]
+    newline = tail.find("\n")
+    return tail[newline + 1:] if newline != -1 else tail
+
+
+def _tail_start(messages: List[BaseMessage], keep_tokens: int) -> int:
+    """Index of the oldest user message such that the tail from there fits `keep_tokens` (last turn always kept)."""
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts:
+        return 0
+    start = starts[-1]
+    for candidate in reversed(starts[:-1]):
+        if messages_tokens(messages[candidate:]) > keep_tokens:
+            break
+        start = candidate
+    return start
+
+
+def _summarized_end(messages: List[BaseMessage], cursor: Optional[str]) -> int:
+    """Index just after `memory_cursor` (0 when nothing was summarized)."""
+    if cursor:
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == cursor:
+                return i + 1
+    return 0
+
+
+def record(state: Dict[str, Any], keep_tokens: int = HISTORY_KEEP_TOKENS, max_chars: int = HISTORY_MAX_CHARS) -> Dict[str, Any]:
+    """
+    Append the not-yet-recorded messages to `conversation_history` and remove the
+    messages older than the kept tail. Returns the state update for the graph.
+    """
+    messages = state.get("messages", [])
+    recorded = set(state.get("history_recorded_ids") or [])
+    history = state.get("conversation_history", "") or ""
+
+    new_lines = [_line(m) for m in messages if m.id not in recorded]
+    if new_lines:
+        history = _keep_tail("\n".join(filter(None, [history] + new_lines)), max_chars)
+
+    start = _tail_start(messages, keep_tokens)
+    if MEMORY_ENABLED:
+        start = min(start, _summarized_end(messages, state.get("memory_cursor")))
+    removals = [RemoveMessage(id=m.id) for m in messages[:start] if m.id]
+    kept_ids = [m.id for m in messages[start:] if m.id]
+
+    return {
+        "conversation_history": history,
+        "history_recorded_ids": kept_ids,
+        "history_processed": True,
+        "messages": removals,
+    }
@@ -2,6 +2,7 @@ from typing import List, Optional, Literal, Dict, Any, Union, Deque
 from collections import deque
 from pydantic import BaseModel, Field, ConfigDict
 from langgraph.graph import MessagesState
+from src.Agents.memory import MemoryState
 
 
 
@@ -177,7 +178,7 @@ class ResultAnalyzerOutput(StrictBase):
 
 
 # --- The Shared State ---
-class wso2_SharedState(MessagesState):
+class wso2_SharedState(MemoryState):
     next_step: str = "END"
     java_analysis_json: Optional[CodeLogicAnalysisV2] = None
     is_java_analysis_complete: bool = False
@@ -186,6 +187,7 @@ class wso2_SharedState(MessagesState):
     result_of_code_review_json: Optional[CodeComparisonResult] = None
     report: str = ""
     conversation_history: str = ""
+    history_recorded_ids: List[str] = []
     is_wso2_refined_code: bool = False
     history_processed: bool = False
     
@@ -4,6 +4,7 @@
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langgraph.graph import END
 from typing import Literal
+from langchain_core.runnables import RunnableConfig
 import os
 import sys
 import json
@@ -15,6 +16,11 @@ try:
     from .models import wso2_SharedState
     from .prompts import smart_wso2_agent_prompt, history_recorder_prompt
     from src.Agents.LLM import get_llm
+    from src.Agents.prompt_cache import static_system_message, cache_hints, record_usage
+    from src.Agents.tool_executor import run_tool_calls
+    from src.Agents.memory import memory
+    from src.Agents.sources.retrieval import source_context
+    from .history import record as record_history
     from .tools import tools as tools_list
 except ImportError as e:
     print(f"Warning: Could not import some modules: {e}")
@@ -26,26 +32,33 @@ except ImportError as e:
 #############################################
 #  CONFIGURATION                            #
 #############################################
+# The history is sent as its own message after the static prompt, so the prompt
+# text stays identical across turns (provider prompt caching).
+HISTORY_POINTER = "(see the CONVERSATION HISTORY message below)"
 
 
 #############################################
 #  AGENT FUNCTIONS                          #
 #############################################
-async def smart_wso2_agent(state: wso2_SharedState) -> wso2_SharedState:
+async def smart_wso2_agent(state: wso2_SharedState, config: RunnableConfig) -> wso2_SharedState:
     # Setup environment
     #setup_environment()
     
-    #user message
-    user_message = HumanMessage(content=state["messages"][-1].content)
     #get conversation history
-    conversation_history = state.get("conversation_history", "EMPTY")
+    conversation_history = state.get("conversation_history", "") or "EMPTY"
     
-    #build system message
-    system_message = SystemMessage(content=smart_wso2_agent_prompt.replace(
-        '{conversation_history}', conversation_history
-    ))
-    #prepare messages
-    messages = [system_message, user_message] + state["messages"]
+    #build system messages: the static prompt first (byte-identical, cacheable),
+    #then the per-thread history, then the conversation itself
+    static_prompt = smart_wso2_agent_prompt.replace('{conversation_history}', HISTORY_POINTER)
+    system_message = static_system_message(static_prompt)
+    history_message = SystemMessage(content=f"CONVERSATION HISTORY:\n{conversation_history}")
+    #prepare messages: bounded history (rolling summary + recent turns verbatim)
+    context = await memory.prepare(state, agent="smart_wso2_assistant")
+    state.update(context.update)
+    #relevant excerpts of the sources attached to this thread (per turn, not stored)
+    sources = await source_context(state, config, agent="smart_wso2_assistant")
+    messages = [system_message, history_message] + context.messages + sources
+    hints = cache_hints("smart_wso2_assistant", static_prompt)
     
     try:
         #get llm
@@ -54,7 +67,8 @@ async def smart_wso2_agent(state: wso2_SharedState) -> wso2_SharedState:
         if tools_list:
             llm = llm.bind_tools(tools_list)
         #call llm
-        response = await llm.ainvoke(messages)
+        response = await llm.ainvoke(messages, **hints)
+        record_usage("smart_wso2_assistant", response)
     except Exception as e:
         # Fallback response if LLM fails
         response = AIMessage(content=f"I'm having trouble processing your request right now. Error: {str(e)}")
@@ -64,62 +78,28 @@ async def smart_wso2_agent(state: wso2_SharedState) -> wso2_SharedState:
     
     #check if response has tool calls
     if hasattr(response, 'tool_calls') and response.tool_calls:
-        # Create a tools dictionary for easy lookup
-        tools_dict = {tool.name: tool for tool in tools_list}
-        
-        # Process each tool call (there might be multiple)
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_input = tool_call["args"]
-            tool_call_id = tool_call["id"]
-            
-            # Call the actual tool function
-            if tool_name in tools_dict:
-                try:
-                    tool_result = await tools_dict[tool_name].ainvoke(tool_input)
-                    # Create proper ToolMessage
-                    tool_message = ToolMessage(
-                        content=str(tool_result),
-                        tool_call_id=tool_call_id
-                    )
-                    state["messages"].append(tool_message)
-                except Exception as e:
-                    # Handle tool execution errors
-                    error_message = ToolMessage(
-                        content=f"Error executing tool {tool_name}: {str(e)}",
-                        tool_call_id=tool_call_id
-                    )
-                    state["messages"].append(error_message)
-            else:
-                # Handle unknown tool
-                error_message = ToolMessage(
-                    content=f"Unknown tool: {tool_name}",
-                    tool_call_id=tool_call_id
-                )
-                state["messages"].append(error_message)
+        # Run the tool calls concurrently (capped per turn); results keep the call order
+        tool_messages = await run_tool_calls(response.tool_calls, tools_list)
+        state["messages"].extend(tool_messages)
         
         # Final answer that uses the tool outputs
         final_system_hint = SystemMessage(content=(
             "You just received tool result(s). Now craft a concise answer for the user. "
             "If helpful, append the 'Tool result'."
         ))
-        follow_up_messages = [final_system_hint] + state["messages"]
-        follow_up_response = await llm.ainvoke(follow_up_messages)
+        follow_up_messages = [system_message, history_message] + context.messages + sources + [response] + tool_messages + [final_system_hint]
+        follow_up_response = await llm.ainvoke(follow_up_messages, **hints)
+        record_usage("smart_wso2_assistant", follow_up_response)
         state["messages"].append(follow_up_response)
     
     return state
 
-async def history_recorder(state: wso2_SharedState) -> wso2_SharedState:
+async def history_recorder(state: wso2_SharedState) -> dict:
     """Record conversation history for memory management"""
     try:
-        # Simple history recording
-        conversation_text = "\n".join([msg.content for msg in state["messages"] if hasattr(msg, 'content')])
-        state["conversation_history"] = conversation_text[:1000]  # Limit to 1000 chars
-        
-        # Clear old messages to prevent memory issues
-        if len(state["messages"]) > 20:
-            state["messages"] = state["messages"][-10:]  # Keep last 10 messages
+        # Append only the messages recorded since the last run, keep the recent
+        # tail of the log and drop old messages through the add_messages reducer
+        return record_history(state)
     except Exception as e:
         print(f"Warning: Error in history recorder: {e}")
-    
-    return state
+        return {}
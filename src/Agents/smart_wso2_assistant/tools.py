@@ -7,6 +7,7 @@ from langchain_core.tools import tool
 from .prompts import review_code_tool_prompt, code_editor_prompt, java_analyzer_prompt, sequence_analyzer_prompt, code_comparator_prompt, result_comparison_analyzer_prompt
 from src.Agents.LLM import get_llm
 from langchain_core.messages import HumanMessage, SystemMessage
+from .analysis_cache import cached_analysis
 
 
 
@@ -93,10 +94,13 @@ async def java_analyzer(java_code: str) -> str:
     messages = [system_message, user_message]
     # Get LLM instance
     llm = get_llm()
-    # Get analysis response
-    response = await llm.ainvoke(messages)
-    #return the response
-    return response.content
+
+    async def analyze() -> str:
+        response = await llm.ainvoke(messages)
+        return response.content
+
+    # Get analysis response (served from the cache when this code was analysed before)
+    return await cached_analysis("java_analyzer", java_analyzer_prompt, llm, analyze, java_code=java_code)
 
 async def sequence_analyzer(wso2_code: str) -> str:
     """
@@ -116,10 +120,13 @@ async def sequence_analyzer(wso2_code: str) -> str:
     messages = [system_message, user_message]
     # Get LLM instance
     llm = get_llm()
-    # Get analysis response
-    response = await llm.ainvoke(messages)
-    #return the response
-    return response.content
+
+    async def analyze() -> str:
+        response = await llm.ainvoke(messages)
+        return response.content
+
+    # Get analysis response (served from the cache when this code was analysed before)
+    return await cached_analysis("sequence_analyzer", sequence_analyzer_prompt, llm, analyze, wso2_code=wso2_code)
 
 async def code_comparator(java_analysis: str, sequence_analysis: str) -> str:
     """
@@ -140,10 +147,16 @@ async def code_comparator(java_analysis: str, sequence_analysis: str) -> str:
     
     # Get a new LLM instance for the comparison
     llm = get_llm()
-    # Get the initial comparison results from the LLM
-    comparison_response = await llm.ainvoke(messages)
-    #return the comparison response
-    return comparison_response.content
+
+    async def compare() -> str:
+        comparison_response = await llm.ainvoke(messages)
+        return comparison_response.content
+
+    # Get the comparison results (cached per pair of analyses)
+    return await cached_analysis(
+        "code_comparator", code_comparator_prompt, llm, compare,
+        java_analysis=java_analysis, sequence_analysis=sequence_analysis,
+    )
 
 
 async def result_comparator_analyzer(comparison_results: str, optional_context: str) -> str:
@@ -2,10 +2,7 @@
 Sonic agent package for SEQ_SONIC project.
 """
 
-from .nodes import main_node, sonic_SharedState
-from .graph import compiled_graph
-from .prompts import main_prompt
-from .seq_example import api_example, wso2_custom_exception_example, main_sequence_template, endpoint_example
+from src.lazy_imports import lazy_exports
 
 __all__ = [
     "main_node",
@@ -17,3 +14,15 @@ __all__ = [
     "main_sequence_template",
     "endpoint_example"
 ]
+
+# Imported on first access so the package import does not load prompts or compile the graph
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "main_node": (".nodes", "main_node"),
+    "sonic_SharedState": (".nodes", "sonic_SharedState"),
+    "compiled_graph": (".graph", "compiled_graph"),
+    "main_prompt": (".prompts", "main_prompt"),
+    "api_example": (".seq_example", "api_example"),
+    "wso2_custom_exception_example": (".seq_example", "wso2_custom_exception_example"),
+    "main_sequence_template": (".seq_example", "main_sequence_template"),
+    "endpoint_example": (".seq_example", "endpoint_example"),
+})
@@ -15,8 +15,14 @@ graph.add_edge("sonic", END)
 # `builder.compile(checkpointer=...)` to enable DB-backed memory.
 builder = graph
 
-# Compile graph (fallback if runtime does not provide a checkpointer)
-compiled_graph = graph.compile()
+# Compiled without a checkpointer only on first access (fallback for the langgraph CLI);
+# the runtime compiles `builder` with its checkpointer, so importing this module stays cheap.
+def __getattr__(name):
+    if name == "compiled_graph":
+        compiled = graph.compile()
+        globals()["compiled_graph"] = compiled
+        return compiled
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
@@ -21,9 +21,49 @@ if str(src_dir) not in sys.path:
 # Now, import modules using absolute paths
 from src.Agents.sonic.prompts import main_prompt
 from src.Agents.LLM import get_llm
+from src.Agents.prompt_cache import static_system_message, cache_hints, record_usage
+from src.Agents.memory import MemoryState, memory
+from src.Agents.sonic.render import SONIC_FAST_PATH, extract_inputs, normalize_inputs, missing_fields, renderer
+from typing import Dict
+import logging
 
-class sonic_SharedState(MessagesState):
-    pass
+logger = logging.getLogger(__name__)
+
+class sonic_SharedState(MemoryState):
+    # service_name / api_context / service_code collected so far (see render.py)
+    sonic_inputs: Dict[str, str]
+
+
+def _last_user_text(state: sonic_SharedState) -> str:
+    for message in reversed(state.get("messages", [])):
+        if isinstance(message, HumanMessage):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+def render_fast_path(state: sonic_SharedState):
+    """
+    Merge the inputs given in the latest user message into state and, when this turn
+    completed or updated them, render the four sequences locally. Returns the AIMessage,
+    or None when the model has to answer (missing inputs, no new inputs, render error).
+    A message without labelled inputs clears the stored ones: the model answers it and
+    may change values in prose ("rename the service to X") that are not parsed here.
+    """
+    provided = extract_inputs(_last_user_text(state))
+    if not provided:
+        state["sonic_inputs"] = {}
+        return None
+    inputs = normalize_inputs({**(state.get("sonic_inputs") or {}), **provided})
+    state["sonic_inputs"] = inputs
+    if not SONIC_FAST_PATH or missing_fields(inputs):
+        return None
+    try:
+        if not renderer.available():
+            return None
+        return AIMessage(content=renderer.render(inputs))
+    except Exception as e:
+        logger.warning(f"[sonic] local render failed, falling back to the model: {e}")
+        return None
 
 
 
@@ -33,17 +73,26 @@ async def main_node(state: sonic_SharedState):
         # Get the last user message
         #user_message = HumanMessage(content=state["messages"][-1].content)
         
-        # Create system message with the main prompt
-        system_message = SystemMessage(content=main_prompt)
+        # All inputs known: the sequences are template text, rendered without the model
+        rendered = render_fast_path(state)
+        if rendered is not None:
+            state["messages"].append(rendered)
+            return state
         
-        # Prepare messages for LLM
-        messages = [system_message] + state["messages"]
+        # Create system message with the main prompt (static, cacheable prefix)
+        system_message = static_system_message(main_prompt)
         
         # Get LLM instance
         llm = get_llm()
         
-        # Generate response
-        response = llm.invoke(messages)
+        # Prepare messages for LLM: bounded history (summary + recent turns)
+        context = await memory.prepare(state, agent="sonic", llm=llm)
+        state.update(context.update)
+        messages = [system_message] + context.messages
+        
+        # Generate response (async: never block the event loop on the model call)
+        response = await llm.ainvoke(messages, **cache_hints("sonic", main_prompt))
+        record_usage("sonic", response)
         
         # Add AI response to state
         state["messages"].append(response)
@@ -0,0 +1,197 @@
+# src/Agents/sonic/render.py
+# Deterministic fast path for the sonic agent.
+#
+# The four artifacts are fixed templates (seq_example.py) filled with three inputs,
+# so once service_name, api_context and service_code are known they are rendered
+# here instead of asking the model to copy thousands of characters:
+# - Inputs are read from labelled fields in the user's messages ("service_name: X",
+#   "API context = /orders", a fenced block after "service_code:") and merged into
+#   state (`sonic_inputs`) across turns; later values win. A turn without labelled
+#   fields goes to the model and clears them, since it may change values in prose.
+# - Templates are split once into literal text and {field} / {{field}} slots; if a
+#   field has no slot in any template, the fast path is disabled with a warning.
+# - Rendered answers are cached by a sha256 over the normalized inputs and the
+#   template text (SONIC_RENDER_CACHE_SIZE entries, LRU).
+# The model is only called while inputs are missing (the missing-data dialogue).
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SONIC_FAST_PATH         = os.getenv("SONIC_FAST_PATH", "1") == "1"
+SONIC_RENDER_CACHE_SIZE = int(os.getenv("SONIC_RENDER_CACHE_SIZE", "256"))
+
+FIELDS = ("service_name", "api_context", "service_code")
+
+# (section header, template name in seq_example), in output order
+SECTIONS = (
+    ("API SEQUENCE", "api_example"),
+    ("CUSTOM EXCEPTION SEQUENCE", "wso2_custom_exception_example"),
+    ("MAIN SEQUENCE", "main_sequence_template"),
+    ("ENDPOINT SEQUENCE", "endpoint_example"),
+)
+
+
+# ================================================================================
+# INPUT EXTRACTION
+# ================================================================================
+
+# "service_name", "service name", "Service-Name", "serviceName"
+def _label(field: str) -> str:
+    first, second = field.split("_")
+    return rf"{first}[ _-]?{second}"
+
+
+_FIELD_LINE = {
+    field: re.compile(rf"^[\s*>`#-]*{_label(field)}[`*]*[ \t]*[:=][ \t]*(.*)$", re.I | re.M)
+    for field in FIELDS
+}
+_FENCE = re.compile(r"```[\w-]*\n(.*?)```", re.S)
+_NEXT_LABEL = re.compile(rf"^[\s*>`#-]*(?:{'|'.join(_label(f) for f in FIELDS)})[`*]*[ \t]*[:=]", re.I | re.M)
+
+
+def _strip_value(value: str) -> str:
+    return value.strip().strip("`*\"'").strip()
+
+
+def _code_value(text: str, start: int) -> str:
+    """service_code: a fenced block right after the label, else the text up to the next label."""
+    rest = text[start:]
+    fence = _FENCE.match(rest.lstrip())
+    if fence:
+        return fence.group(1).strip("\n")
+    following = _NEXT_LABEL.search(rest)
+    return (rest[:following.start()] if following else rest).strip()
+
+
+def extract_inputs(text: str) -> Dict[str, str]:
+    """Labelled inputs found in one user message (only the fields that are present and non-blank)."""
+    found: Dict[str, str] = {}
+    for field, pattern in _FIELD_LINE.items():
+        match = None
+        for match in pattern.finditer(text):
+            pass  # last occurrence wins
+        if match is None:
+            continue
+        if field == "service_code":
+            value = _code_value(text, match.start(1))
+        else:
+            value = _strip_value(match.group(1))
+        if value:
+            found[field] = value
+    return found
+
+
+def normalize_inputs(inputs: Dict[str, str]) -> Dict[str, str]:
+    """api_context starts with "/" and does not end with "/"; line endings normalized."""
+    normalized = {k: str(v).replace("\r\n", "\n").strip() for k, v in inputs.items() if str(v).strip()}
+    context = normalized.get("api_context")
+    if context is not None:
+        context = "/" + context.strip("/")
+        normalized["api_context"] = context if context != "/" else ""
+    return {k: v for k, v in normalized.items() if v}
+
+
+def missing_fields(inputs: Dict[str, str]) -> List[str]:
+    return [field for field in FIELDS if not inputs.get(field)]
+
+
+# ================================================================================
+# RENDERING
+# ================================================================================
+
+_SLOT = re.compile(r"\{\{\s*(" + "|".join(FIELDS) + r")\s*\}\}|\{(" + "|".join(FIELDS) + r")\}")
+
+# (literal, field) pieces; field is None for the trailing literal
+Pieces = List[Tuple[str, Optional[str]]]
+
+
+def _split(template: str) -> Pieces:
+    pieces, pos = [], 0
+    for match in _SLOT.finditer(template):
+        pieces.append((template[pos:match.start()], match.group(1) or match.group(2)))
+        pos = match.end()
+    pieces.append((template[pos:], None))
+    return pieces
+
+
+class SonicRenderer:
+    """Pre-split sonic templates plus an LRU of rendered answers keyed by input hash."""
+
+    def __init__(self, cache_size: int = SONIC_RENDER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._sections: Optional[List[Tuple[str, Pieces]]] = None
+        self._version = ""
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self.enabled = True
+
+    def _load(self) -> List[Tuple[str, Pieces]]:
+        if self._sections is None:
+            from . import seq_example
+            templates = [(header, getattr(seq_example, name)) for header, name in SECTIONS]
+            empty = [name for (_, name), (_, text) in zip(SECTIONS, templates) if not str(text).strip()]
+            if empty:
+                # Fail-safe of the prompt: never emit partial sequences
+                raise ValueError(f"empty sonic template(s): {', '.join(empty)}")
+            self._version = hashlib.sha256(
+                "\x00".join(str(text) for _, text in templates).encode("utf-8")
+            ).hexdigest()[:12]
+            sections = [(header, _split(str(text))) for header, text in templates]
+            slotted = {field for _, pieces in sections for _, field in pieces if field}
+            unused = [field for field in FIELDS if field not in slotted]
+            if unused:
+                # Placeholders renamed or dropped: rendering would silently ignore these
+                # inputs, so every answer goes to the model instead
+                logger.warning(f"[sonic] fast path disabled, no template slot for: {', '.join(unused)}")
+                self.enabled = False
+            self._sections = sections
+        return self._sections
+
+    def available(self) -> bool:
+        """Templates load and take every input field."""
+        self._load()
+        return self.enabled
+
+    def key(self, inputs: Dict[str, str]) -> str:
+        self._load()
+        payload = {"templates": self._version, "inputs": {f: inputs[f] for f in FIELDS}}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _render(self, inputs: Dict[str, str]) -> str:
+        parts = []
+        for number, (header, pieces) in enumerate(self._load(), start=1):
+            body = "".join(literal + (inputs[field] if field else "") for literal, field in pieces)
+            parts.append(f"{number}. {header}\n```xml\n{body.strip()}\n```")
+        return "\n\n".join(parts)
+
+    def render(self, inputs: Dict[str, str]) -> str:
+        """The four sections for complete, normalized inputs (cached)."""
+        key = self.key(inputs)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached
+            self._stats["misses"] += 1
+        rendered = self._render(inputs)
+        with self._lock:
+            self._cache[key] = rendered
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._cache)}
+
+
+renderer = SonicRenderer()
@@ -0,0 +1,13 @@
+"""
+Project sources: archive ingestion and a content-addressed store of project files.
+"""
+
+from src.lazy_imports import lazy_exports
+
+__all__ = ["source_store", "ingest_archive", "ArchiveError"]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "source_store": (".store", "source_store"),
+    "ingest_archive": (".ingest", "ingest_archive"),
+    "ArchiveError": (".ingest", "ArchiveError"),
+})
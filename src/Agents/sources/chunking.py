@@ -0,0 +1,274 @@
+# src/Agents/sources/chunking.py
+# Source chunking for retrieval.
+#
+# - Java: one chunk per method / constructor (prefixed with its class), plus one
+#   chunk per class for the declaration, fields and annotations outside methods.
+#   Found with a brace-depth scan (strings, chars and comments skipped), not a parser.
+# - XML: one chunk per mediator. Elements are split at their children, descending
+#   while an element is larger than CHUNK_MAX_LINES (sequence -> mediators,
+#   api -> resource -> inSequence -> mediators, camel route -> processors).
+# - Anything else, and XML that does not parse: windows of CHUNK_MAX_LINES lines.
+# Every chunk keeps its path and line range so excerpts can be cited.
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from xml.parsers import expat
+
+CHUNK_MAX_LINES = int(os.getenv("RETRIEVAL_CHUNK_MAX_LINES", "80"))
+CHUNK_OVERLAP_LINES = 10
+
+
+@dataclass(frozen=True)
+class Chunk:
+    path: str
+    start_line: int   # 1-based, inclusive
+    end_line: int
+    symbol: str       # e.g. "OrderService.createOrder", "<log>", "lines 1-80"
+    text: str
+
+
+def _lines(text: str) -> List[str]:
+    return text.splitlines()
+
+
+def _make(path: str, lines: List[str], start: int, end: int, symbol: str) -> Chunk:
+    """Chunk of 1-based lines [start, end]."""
+    return Chunk(path, start, end, symbol, "\n".join(lines[start - 1:end]))
+
+
+def chunk_lines(path: str, text: str, max_lines: int = CHUNK_MAX_LINES) -> List[Chunk]:
+    lines = _lines(text)
+    if not lines:
+        return []
+    step = max(1, max_lines - CHUNK_OVERLAP_LINES)
+    chunks = []
+    for start in range(1, len(lines) + 1, step):
+        end = min(len(lines), start + max_lines - 1)
+        chunks.append(_make(path, lines, start, end, f"lines {start}-{end}"))
+        if end == len(lines):
+            break
+    return chunks
+
+
+def _split_large(chunk: Chunk, max_lines: int) -> List[Chunk]:
+    if chunk.end_line - chunk.start_line + 1 <= max_lines * 2:
+        return [chunk]
+    parts = chunk_lines(chunk.path, chunk.text, max_lines)
+    offset = chunk.start_line - 1
+    return [
+        Chunk(p.path, p.start_line + offset, p.end_line + offset, f"{chunk.symbol} ({p.symbol})", p.text)
+        for p in parts
+    ]
+
+
+# ================================================================================
+# JAVA
+# ================================================================================
+
+_TYPE_DECL = re.compile(r"\b(class|interface|enum|record)\s+([A-Za-z_]\w*)")
+# Name followed by a parameter list right before the body: `name(...) [throws X] {`
+_METHOD_DECL = re.compile(r"([A-Za-z_]\w*)\s*\([^;{}]*\)\s*(?:throws\s+[\w.,\s]+)?$")
+_ANNOTATION = re.compile(r"@[\w.]+(\s*\((?:[^()]|\([^()]*\))*\))?")
+_ANONYMOUS = re.compile(r"\bnew\s+[\w.<>, ]+\s*\([^()]*\)$")
+_NOT_METHODS = {"if", "for", "while", "switch", "catch", "synchronized", "try", "else", "do", "return", "new"}
+
+
+def _java_blocks(text: str) -> List[Tuple[int, int, str]]:
+    """
+    (open_offset, close_offset, header) for every {...} block. The header is the
+    source between the previous ';', '{' or '}' and the opening brace.
+    """
+    blocks, stack = [], []
+    i, n, header_start = 0, len(text), 0
+    while i < n:
+        ch = text[i]
+        if ch == "/" and text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i == -1 else i
+            continue
+        if ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch in "\"'":
+            if text.startswith('"""', i):
+                end = text.find('"""', i + 3)
+                i = n if end == -1 else end + 3
+                continue
+            j = i + 1
+            while j < n and text[j] != ch and text[j] != "\n":
+                j += 2 if text[j] == "\\" else 1
+            i = j + 1
+            continue
+        if ch == "{":
+            stack.append((i, text[header_start:i]))
+            header_start = i + 1
+        elif ch == "}":
+            if stack:
+                start, header = stack.pop()
+                blocks.append((start, i, header))
+            header_start = i + 1
+        elif ch == ";":
+            header_start = i + 1
+        i += 1
+    return blocks
+
+
+def _strip_comments(header: str) -> str:
+    header = re.sub(r"/\*.*?\*/", " ", header, flags=re.S)
+    return re.sub(r"//[^\n]*", " ", header)
+
+
+def chunk_java(path: str, text: str, max_lines: int = CHUNK_MAX_LINES) -> List[Chunk]:
+    lines = _lines(text)
+    if not lines:
+        return []
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+
+    def line_of(offset: int) -> int:
+        lo, hi = 0, len(line_starts) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if line_starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo + 1
+
+    types, methods = [], []
+    for start, end, header in _java_blocks(text):
+        clean = " ".join(_ANNOTATION.sub(" ", _strip_comments(header)).split())
+        type_match = _TYPE_DECL.search(clean)
+        if type_match and "(" not in clean[:type_match.start()]:
+            types.append((start, end, type_match.group(2)))
+            continue
+        method_match = _METHOD_DECL.search(clean)
+        if method_match and method_match.group(1) not in _NOT_METHODS and not _ANONYMOUS.search(clean):
+            # Include annotations / javadoc directly above the declaration
+            head = start - len(header) + (len(header) - len(header.lstrip()))
+            methods.append((head, end, method_match.group(1)))
+
+    def enclosing_type(offset: int) -> str:
+        # Innermost type whose body contains `offset`
+        enclosing = [(s, name) for s, e, name in types if s < offset < e]
+        return max(enclosing)[1] if enclosing else ""
+
+    # Methods nested in other methods (anonymous / local classes) stay with the outer method
+    methods.sort()
+    top_methods, last_end = [], -1
+    for head, end, name in methods:
+        if head > last_end:
+            top_methods.append((head, end, name))
+            last_end = end
+
+    chunks: List[Chunk] = []
+    covered = set()
+    for head, end, name in top_methods:
+        owner = enclosing_type(head)
+        first, last = line_of(head), line_of(end)
+        covered.update(range(first, last + 1))
+        symbol = f"{owner}.{name}" if owner else name
+        chunks.extend(_split_large(_make(path, lines, first, last, symbol), max_lines))
+
+    # Class-level remainder: package / imports, declarations, fields, annotations
+    runs, run_start = [], None
+    for number in range(1, len(lines) + 1):
+        if number in covered:
+            if run_start is not None:
+                runs.append((run_start, number - 1))
+                run_start = None
+        elif run_start is None and lines[number - 1].strip():
+            run_start = number
+    if run_start is not None:
+        runs.append((run_start, len(lines)))
+    for first, last in runs:
+        chunk = _make(path, lines, first, last, "")
+        if not re.sub(r"[\s{}]", "", chunk.text):
+            continue  # closing braces only
+        owner = enclosing_type(line_starts[first - 1]) or (min(types)[2] if types else os.path.basename(path))
+        chunks.extend(_split_large(_make(path, lines, first, last, f"{owner} (declarations)"), max_lines))
+
+    chunks.sort(key=lambda c: c.start_line)
+    return chunks
+
+
+# ================================================================================
+# XML
+# ================================================================================
+
+def _xml_elements(text: str) -> Optional[List[Tuple[int, int, int, str]]]:
+    """(depth, start_line, end_line, tag) for every element, or None if not well-formed."""
+    parser = expat.ParserCreate()
+    elements, stack = [], []
+
+    def start(tag, attrs):
+        name = attrs.get("name") or attrs.get("key") or attrs.get("id") or attrs.get("uri-template") or ""
+        label = f"<{tag.rsplit(':', 1)[-1]}{' ' + name if name else ''}>"
+        stack.append((parser.CurrentLineNumber, label, len(elements)))
+        elements.append(None)
+
+    def end(tag):
+        start_line, label, index = stack.pop()
+        elements[index] = (len(stack), start_line, parser.CurrentLineNumber, label)
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.Parse(text, True)
+    except expat.ExpatError:
+        return None
+    return elements
+
+
+def chunk_xml(path: str, text: str, max_lines: int = CHUNK_MAX_LINES) -> List[Chunk]:
+    lines = _lines(text)
+    elements = _xml_elements(text)
+    if not elements:
+        return chunk_lines(path, text, max_lines)
+
+    def children(index: int) -> List[int]:
+        depth = elements[index][0]
+        found = []
+        for j in range(index + 1, len(elements)):
+            if elements[j][0] <= depth:
+                break
+            if elements[j][0] == depth + 1:
+                found.append(j)
+        return found
+
+    chunks: List[Chunk] = []
+
+    def emit(index: int, trail: str) -> None:
+        depth, first, last, label = elements[index]
+        symbol = f"{trail} > {label}" if trail else label
+        kids = children(index)
+        if last - first + 1 <= max_lines or not kids:
+            chunks.extend(_split_large(_make(path, lines, first, last, symbol), max_lines))
+            return
+        for kid in kids:
+            emit(kid, symbol)
+
+    # Opening tags of split elements, the prolog and comments outside elements are not indexed
+    emit(0, "")
+    chunks.sort(key=lambda c: c.start_line)
+    return chunks
+
+
+# ================================================================================
+# DISPATCH
+# ================================================================================
+
+_XML_EXTS = (".xml", ".xsd", ".wsdl", ".dbs", ".xsl", ".xslt")
+
+
+def chunk_file(path: str, text: str, max_lines: int = CHUNK_MAX_LINES) -> List[Chunk]:
+    """Chunks of one source file, chosen by extension."""
+    lower = path.lower()
+    if lower.endswith(".java"):
+        return chunk_java(path, text, max_lines)
+    if lower.endswith(_XML_EXTS):
+        return chunk_xml(path, text, max_lines)
+    return chunk_lines(path, text, max_lines)
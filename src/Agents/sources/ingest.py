@@ -0,0 +1,249 @@
+# src/Agents/sources/ingest.py
+# Archive ingestion (zip / tar[.gz|.bz2|.xz]) into the content-addressed SourceStore.
+#
+# The archive is read member by member; nothing is extracted to disk and only a
+# bounded number of members is in memory at a time. Per member: skip by directory /
+# extension / size, sniff for binary content, decode, hash, store the blob. Hashing
+# (hashlib) and zip inflation (zlib) release the GIL, so members are processed on a
+# thread pool sized to the CPU count; zip members are also inflated in the pool,
+# each worker with its own handle on the archive. Tar streams are sequential by
+# format, so they are read on the calling thread and only the per-member work runs
+# in the pool.
+import hashlib
+import logging
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from .store import Manifest, ProjectFile, SourceStore, new_manifest, new_project_id, source_store
+
+logger = logging.getLogger(__name__)
+
+PROJECT_MAX_FILE_BYTES = int(os.getenv("PROJECT_MAX_FILE_BYTES", str(2 * 1024 * 1024)))
+PROJECT_MAX_FILES      = int(os.getenv("PROJECT_MAX_FILES", "20000"))
+PROJECT_INGEST_WORKERS = int(os.getenv("PROJECT_INGEST_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+KINDS = {
+    ".java": "java", ".groovy": "groovy", ".kt": "kotlin", ".scala": "scala",
+    ".xml": "xml", ".xsd": "xml", ".wsdl": "xml", ".dbs": "xml", ".xsl": "xml", ".xslt": "xml",
+    ".properties": "properties", ".yaml": "yaml", ".yml": "yaml", ".json": "json",
+    ".sql": "sql", ".md": "text", ".txt": "text", ".csv": "text", ".sh": "script", ".bat": "script",
+    ".js": "script", ".py": "script", ".gradle": "build", ".conf": "config", ".cfg": "config", ".ini": "config",
+}
+BINARY_EXTS = {
+    ".class", ".jar", ".war", ".ear", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".svg", ".pdf", ".doc", ".docx", ".xls", ".xlsx",
+    ".so", ".dll", ".exe", ".bin", ".dat", ".db", ".keystore", ".jks", ".p12", ".ttf", ".woff", ".woff2",
+}
+SKIP_DIRS = {".git", ".svn", ".idea", ".vscode", ".gradle", ".mvn", "target", "build", "out", "bin", "node_modules", "__pycache__"}
+
+_SNIFF_BYTES = 8192
+
+
+class ArchiveError(ValueError):
+    """Not a readable zip / tar archive."""
+
+
+def _kind(path: str) -> str:
+    name = posixpath.basename(path).lower()
+    if name in ("pom.xml", "build.gradle", "makefile", "dockerfile"):
+        return "build"
+    return KINDS.get(posixpath.splitext(name)[1], "other")
+
+
+def _clean_path(name: str) -> Optional[str]:
+    """Archive member name -> safe relative posix path (None for unsafe names)."""
+    path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if not path or path == "." or path.startswith("../") or path == "..":
+        return None
+    return path
+
+
+def _skip_reason(path: str, size: int) -> Optional[str]:
+    parts = path.split("/")
+    if any(part in SKIP_DIRS or part.startswith(".") for part in parts[:-1]):
+        return "ignored directory"
+    if posixpath.splitext(path)[1].lower() in BINARY_EXTS:
+        return "binary file type"
+    if size > PROJECT_MAX_FILE_BYTES:
+        return f"larger than {PROJECT_MAX_FILE_BYTES} bytes"
+    return None
+
+
+def _decode(data: bytes) -> Optional[str]:
+    """Text of `data`, or None if it looks binary."""
+    if b"\x00" in data[:_SNIFF_BYTES]:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        try:
+            # Legacy encodings (ISO-8859-1 property files) are still text
+            text = data.decode("latin-1")
+        except UnicodeDecodeError:
+            return None
+        control = sum(1 for ch in text[:_SNIFF_BYTES] if ord(ch) < 32 and ch not in "\r\n\t\f")
+        return None if control > len(text[:_SNIFF_BYTES]) // 100 else text
+
+
+def _process(store: SourceStore, path: str, data: bytes) -> Tuple[Optional[ProjectFile], Optional[str]]:
+    text = _decode(data)
+    if text is None:
+        return None, "binary content"
+    sha256 = hashlib.sha256(data).hexdigest()
+    store.put_blob(sha256, text)
+    return ProjectFile(path=path, kind=_kind(path), size=len(data), lines=text.count("\n") + 1, sha256=sha256), None
+
+
+# ================================================================================
+# ARCHIVE READERS
+# ================================================================================
+
+def _zip_members(archive_path: str, opened: List) -> Iterator[Tuple[str, int, object]]:
+    """(path, size, loader) per zip file member; loader() inflates it in the worker thread."""
+    local = threading.local()
+    lock = threading.Lock()
+
+    def opener(info):
+        def load() -> bytes:
+            # One ZipFile handle per worker thread: reads can then run in parallel
+            handle = getattr(local, "zip", None)
+            if handle is None:
+                handle = local.zip = zipfile.ZipFile(archive_path)
+                with lock:
+                    opened.append(handle)
+            with handle.open(info) as member:
+                data = member.read(PROJECT_MAX_FILE_BYTES + 1)
+            if len(data) > PROJECT_MAX_FILE_BYTES:
+                raise ValueError(f"larger than {PROJECT_MAX_FILE_BYTES} bytes")
+            return data
+        return load
+
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, opener(info)
+
+
+def _tar_members(archive_path: str) -> Iterator[Tuple[str, int, object]]:
+    """(path, size, loader) per tar regular file; read sequentially in stream mode."""
+    with tarfile.open(archive_path, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            data = None
+            if info.size <= PROJECT_MAX_FILE_BYTES:
+                member = archive.extractfile(info)
+                data = member.read() if member is not None else b""
+            yield info.name, info.size, (lambda data=data: data)
+
+
+def _members(archive_path: str, opened: List) -> Iterator[Tuple[str, int, object]]:
+    if zipfile.is_zipfile(archive_path):
+        return _zip_members(archive_path, opened)
+    try:
+        with tarfile.open(archive_path, mode="r:*"):
+            pass
+    except (tarfile.TarError, OSError) as e:
+        raise ArchiveError(f"not a zip or tar archive: {e}")
+    return _tar_members(archive_path)
+
+
+# ================================================================================
+# INGESTION
+# ================================================================================
+
+def _submit_all(members, pool: ThreadPoolExecutor, manifest: Manifest, store: SourceStore, max_in_flight: int) -> None:
+    seen = set()
+    in_flight: List = []
+
+    def collect(path, future) -> None:
+        try:
+            entry, reason = future.result()
+        except Exception as e:
+            entry, reason = None, str(e)
+        if entry is not None:
+            manifest.files.append(entry)
+        else:
+            manifest.skipped.append({"path": path, "reason": reason})
+
+    for raw_name, size, load in members:
+        path = _clean_path(raw_name)
+        if path is None:
+            manifest.skipped.append({"path": raw_name, "reason": "unsafe path"})
+            continue
+        reason = _skip_reason(path, size)
+        if reason is None and path in seen:
+            reason = "duplicate path"
+        if reason is None and len(seen) >= PROJECT_MAX_FILES:
+            reason = f"more than {PROJECT_MAX_FILES} files"
+        if reason:
+            manifest.skipped.append({"path": path, "reason": reason})
+            continue
+        seen.add(path)
+        in_flight.append((path, pool.submit(lambda load=load, path=path: _process(store, path, load()))))
+        # Bound the members in flight (and so the bytes held in memory)
+        if len(in_flight) >= max_in_flight:
+            collect(*in_flight.pop(0))
+    for path, future in in_flight:
+        collect(path, future)
+
+
+def ingest_archive(archive_path: str, name: str = "", store: SourceStore = source_store,
+                   workers: int = PROJECT_INGEST_WORKERS) -> Manifest:
+    """
+    Index every text file of a zip / tar archive into `store` and save the manifest.
+    Blocking (run it in a thread). Raises ArchiveError for unreadable archives.
+    """
+    manifest = new_manifest(new_project_id(), name or os.path.basename(archive_path))
+    workers = max(1, workers)
+    opened: List = []
+    members = _members(archive_path, opened)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            _submit_all(members, pool, manifest, store, max_in_flight=workers * 4)
+    finally:
+        for handle in opened:
+            handle.close()
+
+    manifest.files.sort(key=lambda f: f.path)
+    store.save_manifest(manifest)
+    logger.info(
+        "Ingested project %s (%s): %s files, %s skipped",
+        manifest.project_id, manifest.name, len(manifest.files), len(manifest.skipped),
+    )
+    return manifest
+
+
+def files_project_id(name: str, files: List[Tuple[str, str]]) -> str:
+    """Project id derived from the files themselves, so the same attachments map to one project."""
+    digest = hashlib.sha256(name.encode("utf-8"))
+    for filename, text in files:
+        digest.update(b"\0" + filename.encode("utf-8") + b"\0" + hashlib.sha256(text.encode("utf-8")).digest())
+    return f"prj_{digest.hexdigest()[:32]}"
+
+
+def ingest_files(name: str, files: List[Tuple[str, str]], store: SourceStore = source_store,
+                 project_id: Optional[str] = None) -> Manifest:
+    """
+    Store loose (filename, text) uploads as a project, e.g. files attached to a chat turn.
+    When `project_id` is given and already stored, its manifest is returned unchanged.
+    """
+    if project_id is not None:
+        try:
+            return store.manifest(project_id)
+        except KeyError:
+            pass
+    manifest = new_manifest(project_id or new_project_id(), name)
+    for filename, text in files:
+        path = _clean_path(filename) or "uploaded_file"
+        data = text.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        store.put_blob(sha256, text)
+        manifest.files.append(ProjectFile(path=path, kind=_kind(path), size=len(data), lines=text.count("\n") + 1, sha256=sha256))
+    store.save_manifest(manifest)
+    return manifest
@@ -0,0 +1,223 @@
+# src/Agents/sources/retrieval.py
+# Per-thread lexical retrieval over the sources attached to a conversation.
+#
+# Files attached to a thread (ingested archives, large chat attachments) are chunked
+# along Java method / class and XML mediator boundaries (chunking.py) and indexed
+# with BM25. Each turn the agent nodes send only the top-k chunks for the latest
+# user message, within RETRIEVAL_MAX_TOKENS, so the prompt grows with the question
+# and not with the project. Identifiers are split on camelCase / snake_case so
+# "order id" matches `getOrderId`.
+#
+# Indexes are built off the event loop on first use and cached per worker
+# (RETRIEVAL_INDEX_CACHE threads); chunks are cached per file content.
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.Agents.memory import count_tokens
+from .chunking import Chunk, chunk_file
+from .store import SourceStore, source_store
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_ENABLED            = os.getenv("RETRIEVAL_ENABLED", "1") == "1"
+RETRIEVAL_TOP_K              = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_MAX_TOKENS         = int(os.getenv("RETRIEVAL_MAX_TOKENS", "4000"))
+RETRIEVAL_MIN_RELATIVE_SCORE = float(os.getenv("RETRIEVAL_MIN_RELATIVE_SCORE", "0.25"))
+RETRIEVAL_INDEX_CACHE        = int(os.getenv("RETRIEVAL_INDEX_CACHE", "16"))
+# Attachments up to this size are still pasted into the message (see routes/agent.py)
+RETRIEVAL_INLINE_CHARS       = int(os.getenv("RETRIEVAL_INLINE_CHARS", "12000"))
+
+_CHUNK_CACHE_SIZE = 5000
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "are", "was", "you", "can", "what", "how", "please",
+    "public", "private", "protected", "static", "final", "void", "return", "new", "import", "package",
+    "string", "int", "boolean", "null", "true", "false", "class", "xml", "version", "encoding",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms: whole identifiers plus their camelCase / snake_case parts."""
+    terms = []
+    for word in _IDENTIFIER.findall(text):
+        lower = word.lower()
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL.findall(piece)]
+        for term in {lower, *parts}:
+            if len(term) > 1 and term not in _STOPWORDS:
+                terms.append(term)
+    return terms
+
+
+# ================================================================================
+# BM25
+# ================================================================================
+
+class BM25Index:
+    """Okapi BM25 over chunks (path and symbol are indexed with the text)."""
+
+    def __init__(self, chunks: List[Chunk], k1: float = 1.2, b: float = 0.75):
+        self.chunks = chunks
+        self.k1, self.b = k1, b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for i, chunk in enumerate(chunks):
+            counts = Counter(tokenize(f"{chunk.path} {chunk.symbol}\n{chunk.text}"))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[float, Chunk]]:
+        n = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / norm
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, self.chunks[i]) for i, score in best]
+
+
+# ================================================================================
+# PER-THREAD INDEXES
+# ================================================================================
+
+class SourceRetriever:
+    """Builds and caches one BM25 index per set of attached projects."""
+
+    def __init__(self, store: SourceStore = source_store, cache_size: int = RETRIEVAL_INDEX_CACHE):
+        self.store = store
+        self.cache_size = cache_size
+        self._indexes: "OrderedDict[Tuple[str, ...], BM25Index]" = OrderedDict()
+        self._building: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self._chunks: "OrderedDict[Tuple[str, str], List[Chunk]]" = OrderedDict()
+        self._chunks_lock = threading.Lock()  # builds run in worker threads
+
+    def _file_chunks(self, path: str, sha256: str) -> List[Chunk]:
+        key = (sha256, path)
+        with self._chunks_lock:
+            cached = self._chunks.get(key)
+        if cached is None:
+            cached = chunk_file(path, self.store.get_blob(sha256))
+            with self._chunks_lock:
+                self._chunks[key] = cached
+                if len(self._chunks) > _CHUNK_CACHE_SIZE:
+                    self._chunks.popitem(last=False)
+        return cached
+
+    def _build(self, project_ids: Tuple[str, ...]) -> BM25Index:
+        chunks: List[Chunk] = []
+        for project_id in project_ids:
+            try:
+                manifest = self.store.manifest(project_id)
+                project_chunks = [c for f in manifest.files for c in self._file_chunks(f.path, f.sha256)]
+            except KeyError:
+                continue  # unknown or collected (store retention)
+            chunks.extend(project_chunks)
+        logger.info("[retrieval] indexed %s chunks from %s project(s)", len(chunks), len(project_ids))
+        return BM25Index(chunks)
+
+    async def index_for(self, thread_id: str) -> Optional[BM25Index]:
+        project_ids = tuple(await asyncio.to_thread(self.store.thread_projects, thread_id))
+        if not project_ids:
+            return None
+        index = self._indexes.get(project_ids)
+        if index is not None:
+            self._indexes.move_to_end(project_ids)
+            return index
+        # Single flight: concurrent turns of the same thread share one build
+        pending = self._building.get(project_ids)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._building[project_ids] = future
+        try:
+            index = await asyncio.to_thread(self._build, project_ids)
+            future.set_result(index)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: waiters re-raise, nobody else needs to
+            raise
+        finally:
+            self._building.pop(project_ids, None)
+        self._indexes[project_ids] = index
+        if len(self._indexes) > self.cache_size:
+            self._indexes.popitem(last=False)
+        return index
+
+    async def retrieve(self, thread_id: str, query: str, k: int = RETRIEVAL_TOP_K,
+                       max_tokens: int = RETRIEVAL_MAX_TOKENS) -> List[Chunk]:
+        """Top-k chunks for `query` among the thread's sources, within `max_tokens`."""
+        index = await self.index_for(thread_id)
+        if index is None or not query.strip():
+            return []
+        hits = index.search(query, k)
+        selected, used = [], 0
+        for score, chunk in hits:
+            # Weak matches (a shared common term) are not worth their tokens
+            if score < hits[0][0] * RETRIEVAL_MIN_RELATIVE_SCORE:
+                break
+            tokens = count_tokens(chunk.text)
+            if used + tokens > max_tokens:
+                continue
+            selected.append(chunk)
+            used += tokens
+        return selected
+
+
+retriever = SourceRetriever()
+
+
+def format_excerpts(chunks: List[Chunk]) -> str:
+    parts = [
+        f"--- {c.path} lines {c.start_line}-{c.end_line} ({c.symbol}) ---\n{c.text}"
+        for c in sorted(chunks, key=lambda c: (c.path, c.start_line))
+    ]
+    return "\n\n".join(parts)
+
+
+# Notes added by the backend to the user message ("[Attached files, indexed ...]", "[Project ...]")
+_SOURCE_NOTES = re.compile(r"\[(?:Attached files, indexed|Project )[^\]]*\]")
+
+
+def _last_user_text(messages: List[Any]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            text = message.content if isinstance(message.content, str) else str(message.content)
+            return _SOURCE_NOTES.sub(" ", text)
+    return ""
+
+
+async def source_context(state: Dict[str, Any], config: Optional[Dict[str, Any]], agent: str = "agent") -> List[SystemMessage]:
+    """
+    Messages to add to this turn's prompt: the source excerpts relevant to the latest
+    user message, or [] when the thread has no attached sources. Not stored in state.
+    """
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    if not RETRIEVAL_ENABLED or not thread_id:
+        return []
+    try:
+        chunks = await retriever.retrieve(thread_id, _last_user_text(state.get("messages", [])))
+    except Exception as e:
+        logger.warning(f"[retrieval:{agent}] failed, continuing without excerpts: {e}")
+        return []
+    if not chunks:
+        return []
+    logger.info("[retrieval:%s] %s excerpts for thread %s", agent, len(chunks), thread_id)
+    return [SystemMessage(content=(
+        "RELEVANT SOURCE EXCERPTS (retrieved from the files attached to this conversation "
+        "for the latest user message):\n\n" + format_excerpts(chunks)
+    ))]
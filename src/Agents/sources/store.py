@@ -0,0 +1,274 @@
+# src/Agents/sources/store.py
+# Content-addressed store for ingested project sources.
+#
+# Layout under PROJECT_STORE_DIR:
+#   blobs/<sha256[:2]>/<sha256>   file content (UTF-8 text), written once per content
+#   projects/<project_id>.json    manifest: path -> (kind, size, lines, sha256)
+#   threads/<sha1(thread_id)>.json  project ids attached to a conversation thread
+# Identical files across projects (or re-uploads of the same project) share a blob.
+# Manifests are small, so they are read whole and cached per process.
+#
+# Retention (collect(), run at most every _COLLECT_EVERY seconds after a manifest is
+# saved): a thread's attachment list expires PROJECT_TTL_SECONDS after its last use,
+# a project once no live thread refers to it and it is older than the TTL, and a blob
+# once no remaining manifest refers to it (blobs written or reused within the last
+# _BLOB_GRACE_SECONDS are kept, as an ingest may not have saved its manifest yet).
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_STORE_DIR   = os.getenv("PROJECT_STORE_DIR", os.path.join(tempfile.gettempdir(), "seq_sonic_projects"))
+PROJECT_TTL_SECONDS = int(os.getenv("PROJECT_TTL_SECONDS", str(7 * 86400)))
+
+_PROJECT_ID = re.compile(r"^prj_[0-9a-f]{32}$")
+_MANIFEST_CACHE_SIZE = 32
+_COLLECT_EVERY = 600.0
+_BLOB_GRACE_SECONDS = 3600.0
+
+
+def _scan(path: str) -> List[os.DirEntry]:
+    try:
+        return list(os.scandir(path))
+    except FileNotFoundError:
+        return []
+
+
+def _mtime(entry: os.DirEntry) -> float:
+    try:
+        return entry.stat().st_mtime
+    except FileNotFoundError:
+        return float("inf")  # removed meanwhile (another worker): nothing to do
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+@dataclass
+class ProjectFile:
+    path: str
+    kind: str
+    size: int
+    lines: int
+    sha256: str
+
+
+@dataclass
+class Manifest:
+    project_id: str
+    name: str
+    created: float
+    files: List[ProjectFile] = field(default_factory=list)
+    skipped: List[Dict[str, str]] = field(default_factory=list)
+
+    def by_path(self) -> Dict[str, ProjectFile]:
+        return {f.path: f for f in self.files}
+
+    def summary(self) -> Dict[str, object]:
+        kinds: Dict[str, int] = {}
+        for f in self.files:
+            kinds[f.kind] = kinds.get(f.kind, 0) + 1
+        return {
+            "project_id": self.project_id,
+            "name": self.name,
+            "files": len(self.files),
+            "bytes": sum(f.size for f in self.files),
+            "kinds": kinds,
+            "skipped": len(self.skipped),
+        }
+
+
+def new_project_id() -> str:
+    return f"prj_{uuid.uuid4().hex}"
+
+
+class SourceStore:
+    """Blob + manifest storage shared by all workers through the filesystem."""
+
+    def __init__(self, root: str = PROJECT_STORE_DIR, ttl_seconds: int = PROJECT_TTL_SECONDS):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._manifests: "OrderedDict[str, Manifest]" = OrderedDict()
+        self._last_collect = 0.0
+
+    # ---- blobs ----------------------------------------------------------------
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "blobs", sha256[:2], sha256)
+
+    def put_blob(self, sha256: str, text: str) -> None:
+        """Write `text` under its hash unless already present (atomic rename)."""
+        path = self._blob_path(sha256)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # reused: restart the collection grace period
+                return
+            except FileNotFoundError:
+                pass  # collected meanwhile: write it again
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def get_blob(self, sha256: str) -> str:
+        """Blob content. KeyError if it is not stored (or was collected)."""
+        try:
+            with open(self._blob_path(sha256), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(sha256)
+
+    # ---- manifests ------------------------------------------------------------
+    def _manifest_path(self, project_id: str) -> str:
+        if not _PROJECT_ID.match(project_id or ""):
+            raise KeyError(project_id)
+        return os.path.join(self.root, "projects", f"{project_id}.json")
+
+    def save_manifest(self, manifest: Manifest) -> None:
+        path = self._manifest_path(manifest.project_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(manifest), f)
+        os.replace(tmp, path)
+        self.maybe_collect()
+
+    def manifest(self, project_id: str) -> Manifest:
+        """Manifest of `project_id`. KeyError if unknown."""
+        cached = self._manifests.get(project_id)
+        if cached is not None:
+            self._manifests.move_to_end(project_id)
+            return cached
+        try:
+            with open(self._manifest_path(project_id), encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(project_id)
+        manifest = Manifest(
+            project_id=raw["project_id"], name=raw["name"], created=raw["created"],
+            files=[ProjectFile(**f) for f in raw["files"]], skipped=raw.get("skipped", []),
+        )
+        self._manifests[project_id] = manifest
+        if len(self._manifests) > _MANIFEST_CACHE_SIZE:
+            self._manifests.popitem(last=False)
+        return manifest
+
+    # ---- queries --------------------------------------------------------------
+    def list_files(self, project_id: str, pattern: str = "", kind: str = "") -> List[ProjectFile]:
+        """Files whose path contains `pattern` (case-insensitive) and, if given, of `kind`."""
+        pattern = pattern.lower()
+        return [
+            f for f in self.manifest(project_id).files
+            if (not pattern or pattern in f.path.lower()) and (not kind or f.kind == kind)
+        ]
+
+    def read_file(self, project_id: str, path: str) -> str:
+        """Content of `path` in the project. KeyError if the project or the path is unknown."""
+        entry = self.manifest(project_id).by_path().get(path.strip().lstrip("/"))
+        if entry is None:
+            raise KeyError(path)
+        return self.get_blob(entry.sha256)
+
+    # ---- thread attachments ---------------------------------------------------
+    def _thread_path(self, thread_id: str) -> str:
+        digest = hashlib.sha1(thread_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "threads", f"{digest}.json")
+
+    def thread_projects(self, thread_id: str) -> List[str]:
+        """Project ids attached to `thread_id`, oldest first. Counts as use of the thread for retention."""
+        path = self._thread_path(thread_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                projects = json.load(f)
+            os.utime(path)
+            return projects
+        except FileNotFoundError:
+            return []
+
+    def attach(self, thread_id: str, project_id: str) -> List[str]:
+        """Attach a project to a thread (idempotent). Returns the thread's project ids."""
+        self.manifest(project_id)  # KeyError for unknown projects
+        projects = self.thread_projects(thread_id)
+        if project_id not in projects:
+            projects.append(project_id)
+            path = self._thread_path(thread_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(projects, f)
+            os.replace(tmp, path)
+        return projects
+
+    # ---- retention ------------------------------------------------------------
+    def maybe_collect(self) -> None:
+        now = time.monotonic()
+        if now - self._last_collect < _COLLECT_EVERY:
+            return
+        self._last_collect = now
+        try:
+            removed = self.collect()
+        except OSError as e:
+            logger.warning(f"Project store collection failed: {e}")
+            return
+        if any(removed.values()):
+            logger.info("Project store: removed %(threads)s thread lists, %(projects)s projects, %(blobs)s blobs", removed)
+
+    def collect(self) -> Dict[str, int]:
+        """Remove expired thread lists, then unreferenced projects, then unreferenced blobs (see the module comment)."""
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        removed = {"threads": 0, "projects": 0, "blobs": 0}
+
+        live_projects = set()
+        for entry in _scan(os.path.join(self.root, "threads")):
+            if _mtime(entry) < cutoff:
+                removed["threads"] += _remove(entry.path)
+                continue
+            if entry.name.endswith(".json"):
+                try:
+                    with open(entry.path, encoding="utf-8") as f:
+                        live_projects.update(json.load(f))
+                except (FileNotFoundError, ValueError):
+                    pass
+
+        live_blobs = set()
+        for entry in _scan(os.path.join(self.root, "projects")):
+            project_id = entry.name[:-len(".json")] if entry.name.endswith(".json") else None
+            if project_id not in live_projects and _mtime(entry) < cutoff:
+                removed["projects"] += _remove(entry.path)
+                self._manifests.pop(project_id, None)
+                continue
+            if project_id is not None:
+                try:
+                    with open(entry.path, encoding="utf-8") as f:
+                        live_blobs.update(item["sha256"] for item in json.load(f)["files"])
+                except (FileNotFoundError, ValueError, KeyError):
+                    pass
+
+        blob_cutoff = now - _BLOB_GRACE_SECONDS
+        for shard in _scan(os.path.join(self.root, "blobs")):
+            for entry in _scan(shard.path):
+                if entry.name not in live_blobs and _mtime(entry) < blob_cutoff:
+                    removed["blobs"] += _remove(entry.path)
+        return removed
+
+
+def new_manifest(project_id: str, name: str) -> Manifest:
+    return Manifest(project_id=project_id, name=name, created=time.time())
+
+
+source_store = SourceStore()
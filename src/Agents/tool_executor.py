@@ -0,0 +1,55 @@
+# src/Agents/tool_executor.py
+# Concurrent execution of the tool calls requested in one model turn.
+#
+# The calls a model emits together are independent (e.g. java_analyzer_tool and
+# sequence_analyzer_tool), so they are dispatched with asyncio.gather and the turn
+# costs the slowest call instead of the sum. A per-turn semaphore caps how many run
+# at once; ToolMessages come back in the original call order. Model calls made
+# inside a tool are admitted with "tool" priority (see admission.py), behind the
+# agents' own answers.
+import asyncio
+import logging
+import os
+import time
+from typing import Iterable, List, Optional
+
+from langchain_core.messages import ToolMessage
+
+from src.Agents.admission import llm_priority
+
+logger = logging.getLogger(__name__)
+
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+
+
+async def _run_one(tool_call: dict, tools_dict: dict, semaphore: asyncio.Semaphore) -> ToolMessage:
+    name = tool_call["name"]
+    call_id = tool_call["id"]
+
+    if name not in tools_dict:
+        return ToolMessage(content=f"Unknown tool: {name}", tool_call_id=call_id)
+
+    async with semaphore, llm_priority("tool"):
+        started = time.perf_counter()
+        try:
+            result = await tools_dict[name].ainvoke(tool_call["args"])
+            content = str(result)
+        except Exception as e:
+            content = f"Error executing tool {name}: {e}"
+        logger.info("Tool %s finished in %.2fs", name, time.perf_counter() - started)
+    return ToolMessage(content=content, tool_call_id=call_id)
+
+
+async def run_tool_calls(tool_calls: List[dict], tools: Iterable, max_concurrency: Optional[int] = None) -> List[ToolMessage]:
+    """
+    Run `tool_calls` concurrently (at most `max_concurrency` at a time, default
+    TOOL_CALL_CONCURRENCY) and return one ToolMessage per call, in call order.
+
+    Tool errors and unknown tool names become error ToolMessages, as before, so
+    one failing call does not cancel the others.
+    """
+    if not tool_calls:
+        return []
+    tools_dict = {tool.name: tool for tool in tools}
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or TOOL_CALL_CONCURRENCY))
+    return list(await asyncio.gather(*(_run_one(call, tools_dict, semaphore) for call in tool_calls)))
@@ -0,0 +1,158 @@
+# src/Backend/cancellation.py
+# Request-scoped cancellation of graph runs.
+#
+# Starlette only notices that a streaming client went away when a write fails, and
+# a long tool chain (request / response sequence generation) writes nothing for
+# minutes. The request is therefore polled for http.disconnect while the graph runs;
+# on disconnect (or when a newer turn supersedes the run, see thread_guard.py) the
+# task driving the graph is cancelled, which cancels the pending model HTTP
+# requests (the httpx call is aborted and its connection dropped).
+#
+# Nodes commit atomically, so a cancelled run leaves the checkpoint of the last
+# finished step. That can end the thread on the user message, or on an AIMessage
+# whose tool calls never got results (mw_migration's tool_executor), which the
+# provider rejects on the next turn. repair_cancelled_turn() closes such a turn with
+# placeholder ToolMessages and a short "cancelled" answer, before the thread's
+# guard lets the next turn in.
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.5"))
+
+CANCELLED_TOOL_RESULT = "Cancelled: the run was stopped before this tool finished."
+CANCELLED_ANSWER = "(Generation cancelled before the answer was complete.)"
+
+T = TypeVar("T")
+
+
+class RunCancelled(Exception):
+    """The run was stopped before it finished."""
+
+
+class ClientDisconnected(RunCancelled):
+    """The HTTP client went away while its request was still running."""
+
+
+class RunSuperseded(RunCancelled):
+    """A newer request on the same thread took over (see thread_guard.py)."""
+
+
+async def _watch(request: Optional[Request], stop: Optional[asyncio.Event],
+                 interval: float = DISCONNECT_POLL_INTERVAL) -> RunCancelled:
+    """Wait until the client disconnects (`request`) or `stop` is set; returns the reason."""
+    while True:
+        if stop is not None and stop.is_set():
+            return RunSuperseded()
+        if request is not None and await request.is_disconnected():
+            return ClientDisconnected()
+        if stop is None:
+            await asyncio.sleep(interval)
+        else:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), interval)
+
+
+async def _cancel(task: asyncio.Future) -> None:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def cancel_on_disconnect(request: Optional[Request], awaitable: Awaitable[T],
+                               stop: Optional[asyncio.Event] = None) -> T:
+    """
+    Await `awaitable` in a child task. If the client leaves or `stop` is set first, cancel
+    it and raise ClientDisconnected / RunSuperseded. `request=None` skips the disconnect check.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_watch(request, stop))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            return task.result()
+        raise watcher.result()
+    finally:
+        # Also reached when the handler itself is cancelled (server shutdown)
+        await _cancel(watcher)
+        if not task.done():
+            await _cancel(task)
+
+
+async def until_disconnected(request: Optional[Request], events: AsyncGenerator[T, None],
+                             stop: Optional[asyncio.Event] = None) -> AsyncIterator[T]:
+    """
+    Yield from the async generator `events` until it ends, the client disconnects or
+    `stop` is set. In the last two cases the pending step is cancelled (which cancels
+    the graph run behind `events`) and ClientDisconnected / RunSuperseded is raised.
+    `events` is closed on the way out.
+    """
+    watcher = asyncio.create_task(_watch(request, stop))
+    try:
+        while True:
+            step = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({step, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if step not in done:
+                await _cancel(step)
+                raise watcher.result()
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await _cancel(watcher)
+        await events.aclose()
+
+
+# -----------------------------------------------------------------------------
+# Checkpoint repair
+# -----------------------------------------------------------------------------
+def _closing_messages(messages: list) -> list:
+    """Messages that complete an unfinished last turn ([] if the turn has its answer)."""
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    if last_human < 0:
+        return []
+    turn = messages[last_human + 1:]
+    if any(isinstance(m, AIMessage) and not m.tool_calls for m in turn):
+        return []
+    answered = {m.tool_call_id for m in turn if isinstance(m, ToolMessage)}
+    closing = [
+        ToolMessage(content=CANCELLED_TOOL_RESULT, tool_call_id=call["id"])
+        for m in turn if isinstance(m, AIMessage)
+        for call in m.tool_calls if call.get("id") not in answered
+    ]
+    return closing + [AIMessage(content=CANCELLED_ANSWER)]
+
+
+async def repair_cancelled_turn(app, config: Dict[str, Any], as_node: str) -> None:
+    """Close the thread's last turn if a cancelled run left it unfinished."""
+    try:
+        snapshot = await app.aget_state(config)
+        closing = _closing_messages((snapshot.values or {}).get("messages", []))
+        if not closing:
+            return
+        # `as_node` must route to END for an answer without tool calls
+        await app.aupdate_state(config, {"messages": closing}, as_node=as_node)
+        logger.info(
+            "[cancel] closed unfinished turn of thread %s (%s message(s))",
+            config.get("configurable", {}).get("thread_id"), len(closing),
+        )
+    except Exception as e:
+        logger.warning(f"[cancel] could not repair thread checkpoint: {e}")
+
+
+def schedule_repair(lease, app, config: Dict[str, Any], as_node: str) -> None:
+    """
+    Run repair_cancelled_turn() when `lease` (thread_guard.hold) is released: the caller
+    is usually being cancelled itself (Starlette cancels the response task) and cannot
+    await it, while the guard's exit still holds the thread and is not cancelled with it.
+    """
+    lease.on_release(functools.partial(repair_cancelled_turn, app, config, as_node))
@@ -1,33 +1,187 @@
 # src/Backend/routes/agent.py
-from fastapi import APIRouter, File, UploadFile
-from fastapi.responses import StreamingResponse
-from typing import List, Dict, Any
-import json
+from fastapi import APIRouter, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import ValidationError
+from typing import List, Dict, Any, AsyncIterator, Tuple
 import asyncio
+import contextlib
+import json
+import os
+import uuid
 
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
-from langchain_core.tracers import LangChainTracer
 
 # Import compiled apps that were built with the checkpointer
 from src.Agents.runtime import get_sonic_app, get_wso2_app, get_mw_migration_app
+from src.Agents.sources.store import source_store
+from src.Agents.sources.ingest import ingest_archive, ingest_files, files_project_id, ArchiveError
+from src.Agents.sources.retrieval import RETRIEVAL_ENABLED, RETRIEVAL_INLINE_CHARS
 
 # Import your Pydantic schemas (unchanged shapes expected)
 from ..schema.input_schema import InputSchema, OutputSchema
+from ..sse import coalesce, open_stream, find_stream
+from ..cancellation import (
+    RunCancelled, ClientDisconnected, RunSuperseded,
+    cancel_on_disconnect, until_disconnected, repair_cancelled_turn, schedule_repair,
+)
+from ..thread_guard import ThreadBusy, thread_guard
+from ..uploads import (
+    MultipartStream, upload_store, spool_to_file,
+    UPLOAD_INLINE_BYTES, UPLOAD_MAX_TOTAL_BYTES, UPLOAD_MAX_ARCHIVE_BYTES,
+)
 
 agent_router = APIRouter(prefix="/agent")
 
 # -----------------------------------------------------------------------------
-# Optional helper: accept uploaded files and return concatenated text (unchanged)
+# Uploads: streamed to disk, referenced later by handle (agent_input.attachments)
 # -----------------------------------------------------------------------------
+# The body is parsed while it arrives (form field "files", one or more files), so the
+# byte limits hold for what is received, not for what Starlette already buffered.
 @agent_router.post("/upload_files")
-def file_to_text(files: List[UploadFile] = File(...)):
-    # Minimal text concatenation. Extend with MIME checks if needed.
-    texts = []
-    last_filename = None
-    for f in files:
-        last_filename = f.filename
-        texts.append(f.file.read().decode("utf-8", errors="ignore"))
-    return {"filename": last_filename, "content": "\n".join(texts)}
+async def file_to_text(request: Request):
+    form = MultipartStream(request, max_bytes=UPLOAD_MAX_TOTAL_BYTES)
+    stored = []
+    remaining = UPLOAD_MAX_TOTAL_BYTES
+    try:
+        async for f in form.files("files"):
+            item = await upload_store.save(f, remaining_bytes=remaining)
+            remaining -= item.bytes
+            stored.append(item)
+    except Exception:
+        # All or nothing: drop the files of this request that were already spooled
+        await upload_store.discard([item.handle for item in stored])
+        raise
+    if not stored:
+        raise HTTPException(status_code=422, detail="No files in form field 'files'")
+
+    response = {
+        "filename": stored[-1].filename if stored else None,
+        "files": [
+            {"handle": s.handle, "filename": s.filename, "bytes": s.bytes, "chars": s.chars}
+            for s in stored
+        ],
+    }
+    # Small uploads are still echoed for callers that use the text directly
+    total = sum(s.bytes for s in stored)
+    if total <= UPLOAD_INLINE_BYTES:
+        texts = [(await upload_store.read(s.handle))[1] for s in stored]
+        response["content"] = "\n".join(texts)
+    return response
+
+
+# -----------------------------------------------------------------------------
+# Projects: zip / tar archives indexed server-side (agent_input.project_id)
+# -----------------------------------------------------------------------------
+@agent_router.post("/projects")
+async def upload_project(request: Request):
+    # Form field "archive": written straight to one temp file as it arrives
+    form = MultipartStream(request, max_bytes=UPLOAD_MAX_ARCHIVE_BYTES)
+    path = filename = None
+    async for archive in form.files("archive"):
+        filename = archive.filename
+        suffix = "".join(os.path.splitext(filename)[1:])
+        path = await spool_to_file(archive, suffix=suffix)
+        break
+    if path is None:
+        raise HTTPException(status_code=422, detail="No file in form field 'archive'")
+    try:
+        manifest = await asyncio.to_thread(ingest_archive, path, filename)
+    except ArchiveError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    finally:
+        os.remove(path)
+    return {**manifest.summary(), "skipped_files": manifest.skipped[:200]}
+
+
+@agent_router.get("/projects/{project_id}")
+async def get_project(project_id: str):
+    try:
+        manifest = await asyncio.to_thread(source_store.manifest, project_id)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": f"Unknown project {project_id}"})
+    return {
+        **manifest.summary(),
+        "files": [{"path": f.path, "kind": f.kind, "size": f.size, "lines": f.lines} for f in manifest.files],
+    }
+
+
+@agent_router.get("/projects/{project_id}/file")
+async def get_project_file(project_id: str, path: str):
+    try:
+        content = await asyncio.to_thread(source_store.read_file, project_id, path)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": f"Unknown project or file: {project_id} {path}"})
+    return {"project_id": project_id, "path": path, "content": content}
+
+
+def _project_note(project_id: str) -> str:
+    manifest = source_store.manifest(project_id)
+    kinds = ", ".join(f"{count} {kind}" for kind, count in sorted(manifest.summary()["kinds"].items()))
+    return (
+        f"\n\n[Project {project_id} '{manifest.name}': {len(manifest.files)} files ({kinds}). "
+        "Use list_project_files / read_project_file to fetch the files relevant to the service.]"
+    )
+
+
+async def _index_attachments(thread_id: str, handles: List[str]) -> str:
+    """Store large chat attachments as a project attached to the thread (for retrieval); returns the note for the message."""
+    files = []
+    for handle in handles:
+        try:
+            meta, text = await upload_store.read(handle)
+        except KeyError:
+            continue
+        files.append((meta.filename, text))
+    if not files:
+        return "\n\n[Attached files not found or expired]"
+    # Content-derived id: re-sending the same files reuses their project; unused ones
+    # expire with the store's retention (src/Agents/sources/store.py)
+    project_id = files_project_id("attachments", files)
+    manifest = await asyncio.to_thread(ingest_files, "attachments", files, project_id=project_id)
+    await asyncio.to_thread(source_store.attach, thread_id, manifest.project_id)
+    names = ", ".join(f.path for f in manifest.files)
+    return f"\n\n[Attached files, indexed for retrieval (project {manifest.project_id}): {names}]"
+
+
+async def _attachments_chars(handles: List[str]) -> int:
+    total = 0
+    for handle in handles:
+        try:
+            meta, _ = await upload_store.read(handle, max_chars=0)
+        except KeyError:
+            continue
+        total += meta.chars
+    return total
+
+
+async def _with_attachments(agent_input: InputSchema, messages: List):
+    """
+    Add `agent_input.attachments` (upload handles) and `agent_input.project_id` (an
+    ingested project) to the new user message. Small attachments are pasted inline;
+    larger ones, and projects, are attached to the thread and reach the model as
+    retrieved excerpts (src/Agents/sources/retrieval.py) instead.
+    """
+    incoming = agent_input.agent_input or {}
+    handles = incoming.get("attachments") or []
+    project_id = incoming.get("project_id")
+    if not (handles or project_id) or not messages:
+        return messages
+    thread_id = agent_input.thread_id or "default_thread"
+    last = messages[-1]
+    text = last.content if isinstance(last.content, str) else str(last.content)
+    if handles:
+        if RETRIEVAL_ENABLED and await _attachments_chars(handles) > RETRIEVAL_INLINE_CHARS:
+            text += await _index_attachments(thread_id, handles)
+        else:
+            text = text + "\n\n[Attached files]" + await upload_store.resolve(handles)
+    if project_id:
+        try:
+            text += await asyncio.to_thread(_project_note, project_id)
+            await asyncio.to_thread(source_store.attach, thread_id, project_id)
+        except KeyError:
+            text += f"\n\n[Project {project_id} not found]"
+    messages[-1] = last.model_copy(update={"content": text.strip()})
+    return messages
 
 # -----------------------------------------------------------------------------
 # Utilities
@@ -57,9 +211,31 @@ def _tracer_for(agent_name: str):
         "sonic": "Sonic Agent",
         "mw_migration": "MW Migration",
     }.get(agent_name, "Default Project")
+    # Imported on first use: the tracer pulls in the LangSmith client (slow import)
+    from langchain_core.tracers import LangChainTracer
     return LangChainTracer(project_name=project)
 
 
+def _run_config(agent_name: str, thread_id: str) -> Dict[str, Any]:
+    return {
+        "callbacks": [_tracer_for(agent_name)],
+        "tags": [f"agent:{agent_name}"],
+        "metadata": {"agent": agent_name, "thread_id": thread_id},
+        # Use empty checkpoint namespace to match what's being stored
+        "configurable": {"thread_id": thread_id},
+    }
+
+
+# Node each graph resumes from when a cancelled turn is closed (must route to END)
+_CLOSING_NODES = {
+    "smart_wso2_assistant": "history_recorder",
+    "sonic": "sonic",
+    "mw_migration": "main_agent",
+}
+
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "1") == "1"
+
+
 async def _select_app(name: str):
     if name == "smart_wso2_assistant":
         return await get_wso2_app()
@@ -69,71 +245,324 @@ async def _select_app(name: str):
         return await get_mw_migration_app()
     raise ValueError(f"Unsupported agent {name}")
 
+
+def _chunk_text(chunk) -> str:
+    """Extract the text delta from a streamed AIMessageChunk."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    # Some providers stream a list of content parts instead of a plain string
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content or []
+    )
+
+
+async def _agent_events(app, inputs: Dict[str, Any], config: Dict[str, Any]) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Run the graph and yield ("node" | "token" | "final", payload) tuples as they happen.
+
+    Tokens come from the chat model calls made directly by the graph nodes. Model calls
+    made inside a tool (analysis layers, self-reflection, ...) are intermediate output and
+    are not forwarded. If nothing was streamed (mock LLM, fallback messages, non-streaming
+    providers) the last message of the final state is emitted once as "final".
+    """
+    tool_runs = set()
+    last_run_id = None
+    streamed = False
+    final_output = ""
+
+    async for event in app.astream_events(inputs, config, version="v2"):
+        kind = event["event"]
+        parent_ids = event.get("parent_ids") or []
+
+        if kind == "on_tool_start":
+            tool_runs.add(event["run_id"])
+        elif kind in ("on_tool_end", "on_tool_error"):
+            tool_runs.discard(event["run_id"])
+        elif kind == "on_chat_model_stream":
+            if tool_runs.intersection(parent_ids):
+                continue
+            text = _chunk_text(event["data"].get("chunk"))
+            if not text:
+                continue
+            # Separate consecutive model answers (e.g. pre-tool text and the follow-up)
+            if streamed and event["run_id"] != last_run_id:
+                yield "token", "\n\n"
+            last_run_id = event["run_id"]
+            streamed = True
+            yield "token", text
+        elif kind == "on_chain_start" and len(parent_ids) == 1:
+            node = event.get("metadata", {}).get("langgraph_node")
+            if node and node == event["name"] and not node.startswith("__"):
+                yield "node", node
+        elif kind == "on_chain_end" and not parent_ids:
+            output = event["data"].get("output") or {}
+            messages = output.get("messages") if isinstance(output, dict) else None
+            if messages:
+                final_output = messages[-1].content
+
+    if not streamed and final_output:
+        yield "final", final_output
+
+
 @agent_router.post("/stream")
-async def stream_agent_response(agent_input: InputSchema):
+async def stream_agent_response(agent_input: InputSchema, request: Request):
     app = await _select_app(agent_input.agent_name)
     thread_id = agent_input.thread_id or "default_thread"
 
     incoming = agent_input.agent_input or {}
-    incoming_msgs = _rehydrate_messages(incoming.get("messages", []))
+    incoming_msgs = await _with_attachments(agent_input, _rehydrate_messages(incoming.get("messages", [])))
+
+    if thread_guard.policy == "reject" and await thread_guard.busy(thread_id):
+        return JSONResponse(status_code=409, content={"error": f"Thread {thread_id} is busy", "busy": True, "done": True})
+
+    stream = open_stream()
+    config = _run_config(agent_input.agent_name, thread_id)
+    closing_node = _CLOSING_NODES[agent_input.agent_name]
 
     async def generate_stream():
         try:
-            tracer = _tracer_for(agent_input.agent_name)
-            config = {
-                "callbacks": [tracer],
-                "tags": [f"agent:{agent_input.agent_name}"],
-                "metadata": {"agent": agent_input.agent_name, "thread_id": thread_id},
-                # Use empty checkpoint namespace to match what's being stored
-                "configurable": {"thread_id": thread_id},
-            }
-            
-            # Pass the new message - checkpointer will automatically merge with stored history
-            if incoming_msgs:
-                # Get the latest message to add to conversation
-                new_message = incoming_msgs[-1]
-                # LangGraph with checkpointer will automatically load previous messages
-                # and append this new message to the conversation
-                result = await app.ainvoke({"messages": [new_message]}, config)
-            else:
-                result = {"messages": []}
-            output = result["messages"][-1].content if result.get("messages") else ""
-
-            # Stream character by character for smooth typing effect
-            for char in output:
-                yield f"data: {json.dumps({'content': char, 'done': False})}\n\n"
-                await asyncio.sleep(0.01)  # Slightly faster for better UX
-            yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
-            yield "data: [DONE]\n\n"
+            # One turn per thread at a time (queue / reject / cancel-previous, see thread_guard.py)
+            async with thread_guard.hold(thread_id) as lease:
+                # Pass the new message - checkpointer will automatically merge with stored history
+                if incoming_msgs:
+                    # Get the latest message to add to conversation
+                    new_message = incoming_msgs[-1]
+                    # LangGraph with checkpointer will automatically load previous messages
+                    # and append this new message to the conversation.
+                    # Model tokens are coalesced into frames as they are produced.
+                    # A client that goes away, or a newer turn taking over the thread, cancels
+                    # the run even while nothing is being written.
+                    events = until_disconnected(
+                        request if CANCEL_ON_DISCONNECT else None,
+                        coalesce(_agent_events(app, {"messages": [new_message]}, config)),
+                        stop=lease.stop,
+                    )
+                    try:
+                        async with contextlib.aclosing(events):
+                            async for kind, payload in events:
+                                if kind == "node":
+                                    yield await stream.send({"node": payload, "done": False})
+                                else:
+                                    yield await stream.send({"content": payload, "done": False})
+                    except RunCancelled:
+                        # Still holding the thread: close the turn before the next one starts
+                        await repair_cancelled_turn(app, config, closing_node)
+                        raise
+                    except (asyncio.CancelledError, GeneratorExit):
+                        # Starlette cancelled or closed the response (disconnect noticed on
+                        # its side): repaired on the guard's exit, before the thread is released
+                        schedule_repair(lease, app, config, closing_node)
+                        raise
+            yield await stream.send({"content": "", "done": True})
+        except ThreadBusy as e:
+            yield await stream.send({"error": str(e), "busy": True, "done": True})
+        except RunSuperseded:
+            yield await stream.send({"cancelled": True, "done": True})
+        except ClientDisconnected:
+            return
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e), 'done': True})}\n\n"
+            yield await stream.send({"error": str(e), "done": True})
+        finally:
+            # No yield here: the generator may be closing because the client went away
+            terminal = await stream.close()
+        yield terminal
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx) so tokens reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Stream-Id": stream.stream_id},
+    )
+
+
+@agent_router.get("/stream/{stream_id}")
+async def resume_agent_stream(stream_id: str, last_event_id: str | None = Header(default=None)):
+    """Replay the frames of a recent stream after Last-Event-ID and follow it if still running."""
+    # This worker's buffer, or the shared frame store when another worker runs the stream
+    stream = await find_stream(stream_id)
+    if stream is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown or expired stream {stream_id}", "done": True})
+    return StreamingResponse(
+        stream.replay(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Stream-Id": stream.stream_id},
+    )
+
+# -----------------------------------------------------------------------------
+# Persistent channel: one WebSocket per chat thread, turns multiplexed by turn_id
+# -----------------------------------------------------------------------------
+async def _turn_events(agent_input: InputSchema) -> AsyncIterator[Tuple[str, str]]:
+    """Coalesced ("node" | "token" | "final", payload) events of one turn."""
+    app = await _select_app(agent_input.agent_name)
+    incoming = agent_input.agent_input or {}
+    incoming_msgs = await _with_attachments(agent_input, _rehydrate_messages(incoming.get("messages", [])))
+    if not incoming_msgs:
+        return
+    config = _run_config(agent_input.agent_name, agent_input.thread_id)
+    closing_node = _CLOSING_NODES[agent_input.agent_name]
+    async with thread_guard.hold(agent_input.thread_id) as lease:
+        events = until_disconnected(
+            None, coalesce(_agent_events(app, {"messages": [incoming_msgs[-1]]}, config)), stop=lease.stop,
+        )
+        try:
+            async with contextlib.aclosing(events):
+                async for event in events:
+                    yield event
+        except RunCancelled:
+            await repair_cancelled_turn(app, config, closing_node)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # The channel cancelled the turn: repaired before the guard lets the next turn in
+            schedule_repair(lease, app, config, closing_node)
+            raise
+
+
+@agent_router.websocket("/ws/{thread_id}")
+async def agent_channel(websocket: WebSocket, thread_id: str):
+    """
+    Long-lived channel for one chat thread (alternative to a POST /stream per turn).
+
+    Client -> server (JSON text frames):
+        {"type": "turn", "turn_id": "...", "agent_name": "...", "agent_input": {...}}
+        {"type": "cancel", "turn_id": "..."}    (no turn_id: cancel every running turn)
+        {"type": "ping"}
+    Server -> client:
+        {"turn_id", "node" | "content", "done": false} while the turn runs, then one of
+        {"turn_id", "content": "", "done": true}, {"turn_id", "error", "done": true} or
+        {"turn_id", "cancelled": true, "done": true};  {"type": "pong"}
+
+    A new turn cancels the turn still running on the channel and starts once that turn's
+    task has ended, which is after its checkpoint was repaired (see thread_guard.py).
+    Closing the socket cancels everything, so an abandoned generation stops spending
+    model tokens.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    turns: Dict[str, asyncio.Task] = {}
+
+    async def send(payload: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    async def run(turn_id: str, agent_input: InputSchema) -> None:
+        try:
+            async with contextlib.aclosing(_turn_events(agent_input)) as events:
+                async for kind, payload in events:
+                    key = "node" if kind == "node" else "content"
+                    await send({"turn_id": turn_id, key: payload, "done": False})
+            await send({"turn_id": turn_id, "content": "", "done": True})
+        except asyncio.CancelledError:
+            with contextlib.suppress(Exception):
+                await send({"turn_id": turn_id, "cancelled": True, "done": True})
+            raise
+        except RunSuperseded:
+            await send({"turn_id": turn_id, "cancelled": True, "done": True})
+        except ThreadBusy as e:
+            await send({"turn_id": turn_id, "error": str(e), "busy": True, "done": True})
+        except Exception as e:
+            with contextlib.suppress(Exception):
+                await send({"turn_id": turn_id, "error": str(e), "done": True})
+        finally:
+            turns.pop(turn_id, None)
+
+    async def cancel(tasks: List[asyncio.Task]) -> None:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await send({"error": "Invalid JSON frame", "done": True})
+                continue
+            if not isinstance(message, dict):
+                await send({"error": "Frame must be a JSON object", "done": True})
+                continue
+            kind = message.get("type")
+            if kind == "ping":
+                await send({"type": "pong"})
+            elif kind == "cancel":
+                turn_id = message.get("turn_id")
+                if turn_id:
+                    await cancel([turns[turn_id]] if turn_id in turns else [])
+                else:
+                    await cancel(list(turns.values()))
+            elif kind == "turn":
+                turn_id = message.get("turn_id") or uuid.uuid4().hex
+                try:
+                    agent_input = InputSchema(
+                        thread_id=thread_id,
+                        agent_name=message.get("agent_name") or "",
+                        agent_input=message.get("agent_input") or {},
+                    )
+                except ValidationError as e:
+                    await send({"turn_id": turn_id, "error": str(e), "done": True})
+                    continue
+                # Superseded: stop the previous generation before the new turn touches the thread
+                await cancel(list(turns.values()))
+                turns[turn_id] = asyncio.create_task(run(turn_id, agent_input))
+            else:
+                await send({"error": f"Unknown frame type {kind!r}", "done": True})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await cancel(list(turns.values()))
 
-    return StreamingResponse(generate_stream(), media_type="text/event-stream")
 
 @agent_router.post("/invoke")
-async def invoke_agent(agent_input: InputSchema) -> OutputSchema:
+async def invoke_agent(agent_input: InputSchema, request: Request) -> OutputSchema:
     app = await _select_app(agent_input.agent_name)
     thread_id = agent_input.thread_id or "default_thread"
     incoming = agent_input.agent_input or {}
-    incoming_msgs = _rehydrate_messages(incoming.get("messages", []))
+    incoming_msgs = await _with_attachments(agent_input, _rehydrate_messages(incoming.get("messages", [])))
+
+    config = _run_config(agent_input.agent_name, thread_id)
 
-    tracer = _tracer_for(agent_input.agent_name)
-    config = {
-        "callbacks": [tracer],
-        "tags": [f"agent:{agent_input.agent_name}"],
-        "metadata": {"agent": agent_input.agent_name, "thread_id": thread_id},
-        # Use empty checkpoint namespace to match what's being stored
-        "configurable": {"thread_id": thread_id},
-    }
-    
     # Pass the new message - checkpointer will automatically merge with stored history
     if incoming_msgs:
         # Get the latest message to add to conversation
         new_message = incoming_msgs[-1]
         # LangGraph with checkpointer will automatically load previous messages
         # and append this new message to the conversation
-        result = await app.ainvoke({"messages": [new_message]}, config)
+        try:
+            async with thread_guard.hold(thread_id) as lease:
+                try:
+                    result = await cancel_on_disconnect(
+                        request if CANCEL_ON_DISCONNECT else None,
+                        app.ainvoke({"messages": [new_message]}, config),
+                        stop=lease.stop,
+                    )
+                except RunCancelled:
+                    await repair_cancelled_turn(app, config, _CLOSING_NODES[agent_input.agent_name])
+                    raise
+                except asyncio.CancelledError:
+                    schedule_repair(lease, app, config, _CLOSING_NODES[agent_input.agent_name])
+                    raise
+        except ThreadBusy as e:
+            return JSONResponse(status_code=409, content={"error": str(e), "busy": True, "done": True})
+        except RunSuperseded:
+            return JSONResponse(status_code=409, content={"error": "Superseded by a newer turn on this thread", "done": True})
+        except ClientDisconnected:
+            # Nobody reads this; 499 = client closed request (nginx convention)
+            return JSONResponse(status_code=499, content={"error": "Client disconnected", "done": True})
     else:
         result = {"messages": []}
     output = result["messages"][-1].content if result.get("messages") else ""
-    return {"AI_Response": output}
\ No newline at end of file
+    return {"AI_Response": output}
+
+
+@agent_router.get("/cache_stats")
+async def cache_stats():
+    """Prompt-cache token counters, analysis-cache hit/miss counters and LLM admission counters."""
+    from src.Agents.prompt_cache import usage_stats
+    from src.Agents.smart_wso2_assistant.analysis_cache import cache_stats as analysis_cache_stats
+    from src.Agents.admission import admission_stats
+    return {
+        "prompt_cache": usage_stats(),
+        "analysis_cache": analysis_cache_stats(),
+        "llm_admission": admission_stats(),
+    }
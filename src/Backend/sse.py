@@ -0,0 +1,325 @@
+# src/Backend/sse.py
+# Server-Sent Events framing for the agent streaming endpoints.
+#
+# Model tokens arrive a few characters at a time. Sending one SSE frame per delta
+# costs a json.dumps, ~40 bytes of framing and an event-loop wakeup on both ends,
+# so deltas are coalesced by time window / size before they are framed. Every frame
+# carries an id ("<stream_id>:<seq>") and is kept in a bounded replay buffer so a
+# client that lost its connection can resume with Last-Event-ID.
+#
+# Uvicorn workers share one port, so a resume can reach any of them: frames are also
+# written to a Mongo collection (in batches every SSE_REPLAY_FLUSH_MS, expiring after
+# SSE_REPLAY_TTL_SECONDS) and a worker that does not own the stream replays it from
+# there, polling while the owner is still producing. Mongo errors fail open: the
+# stream can then only be resumed on its own worker.
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# ---- Configuration ----------------------------------------------------------
+
+COALESCE_WINDOW = float(os.getenv("SSE_COALESCE_MS", "16")) / 1000.0
+COALESCE_MAX_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "256"))
+REPLAY_MAX_STREAMS = int(os.getenv("SSE_REPLAY_STREAMS", "64"))
+REPLAY_SHARED = os.getenv("SSE_REPLAY_MONGO", "1") == "1"
+REPLAY_COLLECTION = os.getenv("SSE_REPLAY_COLLECTION", "sse_frames")
+REPLAY_TTL_SECONDS = float(os.getenv("SSE_REPLAY_TTL_SECONDS", "3600"))
+REPLAY_FLUSH_INTERVAL = float(os.getenv("SSE_REPLAY_FLUSH_MS", "200")) / 1000.0
+REPLAY_POLL_INTERVAL = float(os.getenv("SSE_REPLAY_POLL_MS", "250")) / 1000.0
+# A stream followed from another worker that gets no new frame for this long is
+# given up on (its worker probably died)
+REPLAY_IDLE_TIMEOUT = float(os.getenv("SSE_REPLAY_IDLE_SECONDS", "600"))
+
+_DONE = object()
+
+
+# -----------------------------------------------------------------------------
+# Delta coalescing
+# -----------------------------------------------------------------------------
+async def coalesce(
+    events: AsyncIterator[Tuple[str, str]],
+    window: float = COALESCE_WINDOW,
+    max_bytes: int = COALESCE_MAX_BYTES,
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Merge consecutive ("token", text) events.
+
+    Pending text is flushed when it reaches `max_bytes`, when `window` seconds have
+    passed since the first pending delta, or when a non-token event arrives (which is
+    passed through unchanged, after the flush, to keep ordering).
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_DONE)
+
+    producer = asyncio.create_task(pump())
+    pending: List[str] = []
+    pending_bytes = 0
+    deadline: Optional[float] = None
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield "token", "".join(pending)
+                pending, pending_bytes, deadline = [], 0, None
+                continue
+
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                if pending:
+                    yield "token", "".join(pending)
+                    pending, pending_bytes, deadline = [], 0, None
+                raise item
+
+            kind, payload = item
+            if kind == "token":
+                pending.append(payload)
+                pending_bytes += len(payload.encode("utf-8"))
+                if deadline is None:
+                    deadline = loop.time() + window
+                if pending_bytes >= max_bytes:
+                    yield "token", "".join(pending)
+                    pending, pending_bytes, deadline = [], 0, None
+                continue
+
+            if pending:
+                yield "token", "".join(pending)
+                pending, pending_bytes, deadline = [], 0, None
+            yield kind, payload
+
+        if pending:
+            yield "token", "".join(pending)
+    finally:
+        if not producer.done():
+            producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+# -----------------------------------------------------------------------------
+# Shared frame store (Mongo), read by the workers that do not own a stream
+# -----------------------------------------------------------------------------
+class FrameStore:
+    """Frames of every stream as {_id: "<stream_id>:<seq>", stream_id, seq, frame, last, expires_at}."""
+
+    def __init__(self, enabled: bool = REPLAY_SHARED, collection_name: str = REPLAY_COLLECTION,
+                 ttl_seconds: float = REPLAY_TTL_SECONDS):
+        self.enabled = enabled
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._indexed = False
+
+    async def _collection(self):
+        if not self.enabled:
+            return None
+        from src.Agents.runtime import get_mongo_client, DB_NAME
+        client = get_mongo_client()
+        if client is None:
+            return None
+        collection = client[DB_NAME][self.collection_name]
+        if not self._indexed:
+            await collection.create_index([("stream_id", 1), ("seq", 1)])
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    async def append(self, stream_id: str, frames: List[Tuple[int, str, bool]]) -> None:
+        """Store (seq, frame, last) frames; already stored ones are skipped."""
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return
+            expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+            docs = [
+                {"_id": f"{stream_id}:{seq}", "stream_id": stream_id, "seq": seq,
+                 "frame": frame, "last": last, "expires_at": expires_at}
+                for seq, frame, last in frames
+            ]
+            try:
+                await collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        except PyMongoError as e:
+            logger.warning(f"[sse] could not store frames of stream {stream_id}: {e}")
+
+    async def frames_after(self, stream_id: str, seq: int) -> Optional[List[Tuple[int, str, bool]]]:
+        """Stored (seq, frame, last) frames after `seq` in order, or None if the store is unavailable."""
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return None
+            cursor = collection.find({"stream_id": stream_id, "seq": {"$gt": seq}}).sort("seq", 1)
+            return [(doc["seq"], doc["frame"], doc.get("last", False)) for doc in await cursor.to_list(None)]
+        except PyMongoError as e:
+            logger.warning(f"[sse] could not read frames of stream {stream_id}: {e}")
+            return None
+
+
+frame_store = FrameStore()
+
+# Strong references to pending frame writes (asyncio keeps only weak ones)
+_background: Set[asyncio.Task] = set()
+
+
+# -----------------------------------------------------------------------------
+# Framing + replay buffer
+# -----------------------------------------------------------------------------
+class EventStream:
+    """Frames the events of one response and keeps them for Last-Event-ID replay."""
+
+    def __init__(self, stream_id: Optional[str] = None, store: Optional[FrameStore] = None):
+        self.stream_id = stream_id or uuid.uuid4().hex
+        self.frames: List[Tuple[int, str]] = []
+        self.closed = False
+        self.store = store if store is not None else frame_store
+        self._changed = asyncio.Condition()
+        self._stored = 0
+        self._flush: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def _frame(self, data: str) -> str:
+        seq = len(self.frames)
+        frame = f"id: {self.stream_id}:{seq}\ndata: {data}\n\n"
+        self.frames.append((seq, frame))
+        return frame
+
+    def _schedule_flush(self, delay: float) -> None:
+        """Write the frames not stored yet in the background (batched; never awaited by send)."""
+        if self._flush is not None and not self.closed:
+            return  # a pending write picks the new frames up
+        task = asyncio.get_running_loop().create_task(self._write(delay))
+        self._flush = task
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+    async def _write(self, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        async with self._flush_lock:  # writes in order, so readers never see a gap close late
+            self._flush = None
+            end = len(self.frames)
+            batch = [(seq, frame, self.closed and seq == end - 1) for seq, frame in self.frames[self._stored:end]]
+            self._stored = end
+            if batch:
+                await self.store.append(self.stream_id, batch)
+
+    async def send(self, payload: Dict[str, Any]) -> str:
+        """Frame a JSON payload (`content` / `done` / `error` ...) and record it."""
+        frame = self._frame(json.dumps(payload))
+        self._schedule_flush(REPLAY_FLUSH_INTERVAL)
+        async with self._changed:
+            self._changed.notify_all()
+        return frame
+
+    async def close(self) -> str:
+        """Emit the terminal [DONE] marker and mark the stream finished."""
+        frame = self._frame("[DONE]")
+        self.closed = True
+        self._schedule_flush(0)
+        async with self._changed:
+            self._changed.notify_all()
+        return frame
+
+    async def replay(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the frames after `last_event_id`, following the stream while it is live."""
+        next_seq = _parse_seq(last_event_id, self.stream_id) + 1
+        while True:
+            while next_seq < len(self.frames):
+                yield self.frames[next_seq][1]
+                next_seq += 1
+            if self.closed:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.closed or next_seq < len(self.frames))
+
+
+def _parse_seq(last_event_id: Optional[str], stream_id: str) -> int:
+    if not last_event_id:
+        return -1
+    sid, _, seq = last_event_id.rpartition(":")
+    if sid != stream_id or not seq.isdigit():
+        return -1
+    return int(seq)
+
+
+_streams: "OrderedDict[str, EventStream]" = OrderedDict()
+
+
+def open_stream() -> EventStream:
+    """Create and register a new EventStream (oldest streams are evicted)."""
+    stream = EventStream()
+    _streams[stream.stream_id] = stream
+    while len(_streams) > REPLAY_MAX_STREAMS:
+        _streams.popitem(last=False)
+    return stream
+
+
+def get_stream(stream_id: str) -> Optional[EventStream]:
+    return _streams.get(stream_id)
+
+
+class RemoteStream:
+    """A stream owned by another worker, replayed from the shared frame store."""
+
+    def __init__(self, stream_id: str, store: FrameStore, first: List[Tuple[int, str, bool]]):
+        self.stream_id = stream_id
+        self.store = store
+        self._first = first
+
+    async def replay(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the stored frames after `last_event_id`, polling until the [DONE] frame."""
+        loop = asyncio.get_running_loop()
+        next_seq = _parse_seq(last_event_id, self.stream_id) + 1
+        frames, idle_since = self._first, loop.time()
+        while True:
+            for seq, frame, last in frames or []:
+                if seq < next_seq:
+                    continue
+                if seq > next_seq:
+                    break  # a batch still being written: read it again on the next poll
+                yield frame
+                next_seq += 1
+                idle_since = loop.time()
+                if last:
+                    return
+            if loop.time() - idle_since > REPLAY_IDLE_TIMEOUT:
+                return
+            await asyncio.sleep(REPLAY_POLL_INTERVAL)
+            frames = await self.store.frames_after(self.stream_id, next_seq - 1)
+
+
+async def find_stream(stream_id: str, store: Optional[FrameStore] = None) -> Optional[Any]:
+    """The stream of this worker, else one another worker stored; None if unknown or expired."""
+    stream = get_stream(stream_id)
+    if stream is not None:
+        return stream
+    store = store if store is not None else frame_store
+    frames = await store.frames_after(stream_id, -1)
+    if not frames:
+        return None
+    return RemoteStream(stream_id, store, frames)
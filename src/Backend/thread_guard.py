@@ -0,0 +1,274 @@
+# src/Backend/thread_guard.py
+# One graph run per thread_id at a time.
+#
+# Two runs on the same thread load the same checkpoint and write divergent children
+# (double submits, or every anonymous caller sharing "default_thread"). Runs are
+# serialized per thread:
+#   - in-process with an asyncio.Lock per thread_id;
+#   - across workers / replicas with a lease document in Mongo
+#     ({_id: thread_id, owner, expires_at}), renewed every THREAD_LEASE_RENEW_SECONDS
+#     while the run lasts and expiring after THREAD_LEASE_TTL_SECONDS if its worker dies.
+#
+# THREAD_CONCURRENCY_POLICY decides what a second run does while the thread is busy:
+#   queue  - wait (up to THREAD_QUEUE_TIMEOUT seconds) for the thread
+#   reject - fail at once with ThreadBusy (HTTP 409)
+#   cancel - stop the running turn and any queued ones (their `stop` event is set, or
+#            `cancel_requested` on the lease for a run on another worker), then take over
+# Mongo errors fail open: the run proceeds with the in-process lock only.
+#
+# Callbacks registered with Lease.on_release() (the repair of a cancelled turn's
+# checkpoint) run on the way out while the thread is still held, so the next turn
+# never starts on an unrepaired checkpoint.
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("queue", "reject", "cancel")
+
+THREAD_CONCURRENCY_POLICY  = os.getenv("THREAD_CONCURRENCY_POLICY", "queue").lower()
+THREAD_QUEUE_TIMEOUT       = float(os.getenv("THREAD_QUEUE_TIMEOUT", "300"))
+THREAD_LEASE_MONGO         = os.getenv("THREAD_LEASE_MONGO", "1") == "1"
+THREAD_LEASE_COLLECTION    = os.getenv("THREAD_LEASE_COLLECTION", "thread_leases")
+THREAD_LEASE_TTL_SECONDS   = float(os.getenv("THREAD_LEASE_TTL_SECONDS", "30"))
+THREAD_LEASE_RENEW_SECONDS = float(os.getenv("THREAD_LEASE_RENEW_SECONDS", "2"))
+
+if THREAD_CONCURRENCY_POLICY not in POLICIES:
+    logger.warning(f"Unknown THREAD_CONCURRENCY_POLICY {THREAD_CONCURRENCY_POLICY!r}, using 'queue'")
+    THREAD_CONCURRENCY_POLICY = "queue"
+
+# Strong references to the exit tasks (cleanups, lease release, unlock)
+_background: Set[asyncio.Task] = set()
+
+
+async def _finish_shielded(task: asyncio.Task) -> None:
+    """
+    Await `task` to the end even if the caller is cancelled (again) meanwhile, then
+    re-raise the cancellation: the holder's task outlives its exit path, so e.g. the
+    WebSocket channel starts its next turn only after the repair.
+    """
+    cancelled = False
+    while not task.done():
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError()
+    task.result()
+
+
+class ThreadBusy(Exception):
+    """The thread is running another turn and the policy does not allow waiting for it."""
+
+    def __init__(self, thread_id: str, reason: str):
+        super().__init__(f"Thread {thread_id} is busy ({reason})")
+        self.thread_id = thread_id
+        self.reason = reason
+
+
+class Lease:
+    """The right to run one turn on a thread. `stop` is set when a newer turn takes over."""
+
+    def __init__(self, thread_id: str, owner_prefix: str):
+        self.thread_id = thread_id
+        self.owner = f"{owner_prefix}:{uuid.uuid4().hex}"
+        self.stop = asyncio.Event()
+        self.distributed = False
+        self._on_release: List[Callable[[], Awaitable[None]]] = []
+
+    def on_release(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Await `callback()` before the thread is released, even if the holder is being cancelled."""
+        self._on_release.append(callback)
+
+
+class ThreadGuard:
+    """Per-thread mutual exclusion: asyncio locks in-process, Mongo leases across workers."""
+
+    def __init__(self, policy: str = THREAD_CONCURRENCY_POLICY, queue_timeout: float = THREAD_QUEUE_TIMEOUT,
+                 use_mongo: bool = THREAD_LEASE_MONGO, collection_name: str = THREAD_LEASE_COLLECTION,
+                 ttl_seconds: float = THREAD_LEASE_TTL_SECONDS, renew_seconds: float = THREAD_LEASE_RENEW_SECONDS):
+        self.policy = policy
+        self.queue_timeout = queue_timeout
+        self.use_mongo = use_mongo
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self.renew_seconds = renew_seconds
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, Lease] = {}
+        self._pending: Dict[str, List[Lease]] = defaultdict(list)
+        self._indexed = False
+
+    # ---- Mongo lease ----------------------------------------------------------
+    async def _collection(self):
+        if not self.use_mongo:
+            return None
+        from src.Agents.runtime import get_mongo_client, DB_NAME
+        client = get_mongo_client()
+        if client is None:
+            return None
+        collection = client[DB_NAME][self.collection_name]
+        if not self._indexed:
+            # Clean-up only; expiry itself is decided by comparing expires_at
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def _expiry(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+
+    async def _try_lease(self, collection, lease: Lease) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await collection.find_one_and_update(
+                {"_id": lease.thread_id, "$or": [{"expires_at": {"$lte": now}}, {"owner": lease.owner}]},
+                {"$set": {"owner": lease.owner, "expires_at": self._expiry(), "cancel_requested": False}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # held by a live owner
+
+    async def _acquire_lease(self, lease: Lease, policy: str, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return
+            requested = False
+            while not await self._try_lease(collection, lease):
+                if policy == "reject":
+                    raise ThreadBusy(lease.thread_id, "running on another worker")
+                if policy == "cancel" and not requested:
+                    await collection.update_one({"_id": lease.thread_id}, {"$set": {"cancel_requested": True}})
+                    requested = True
+                if lease.stop.is_set():
+                    raise ThreadBusy(lease.thread_id, "superseded by a newer turn")
+                if loop.time() >= deadline:
+                    raise ThreadBusy(lease.thread_id, "timed out waiting for the running turn")
+                await asyncio.sleep(min(self.renew_seconds, 0.5))
+            lease.distributed = True
+        except PyMongoError as e:
+            logger.warning(f"[thread_guard] lease unavailable for {lease.thread_id}, using the local lock only: {e}")
+
+    async def _renew(self, lease: Lease) -> None:
+        """Extend the lease while the turn runs; relay a cancel request from another worker."""
+        collection = await self._collection()
+        while True:
+            await asyncio.sleep(self.renew_seconds)
+            try:
+                doc = await collection.find_one_and_update(
+                    {"_id": lease.thread_id, "owner": lease.owner},
+                    {"$set": {"expires_at": self._expiry()}},
+                    return_document=ReturnDocument.AFTER,
+                )
+            except PyMongoError as e:
+                logger.warning(f"[thread_guard] could not renew lease of {lease.thread_id}: {e}")
+                continue
+            if doc is None:
+                logger.warning(f"[thread_guard] lease of {lease.thread_id} was lost, stopping the turn")
+                lease.stop.set()
+                return
+            if doc.get("cancel_requested"):
+                lease.stop.set()
+
+    async def _release_lease(self, lease: Lease) -> None:
+        try:
+            collection = await self._collection()
+            await collection.delete_one({"_id": lease.thread_id, "owner": lease.owner})
+        except PyMongoError as e:
+            logger.warning(f"[thread_guard] could not release lease of {lease.thread_id} (expires on its own): {e}")
+
+    async def _finish(self, lease: Lease, lock: asyncio.Lock, renewal: Optional[asyncio.Task]) -> None:
+        """Exit path of hold(): cleanups while still holding the thread, then release it."""
+        thread_id = lease.thread_id
+        try:
+            for callback in lease._on_release:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.warning(f"[thread_guard] release callback failed for {thread_id}: {e}")
+            if renewal is not None:
+                renewal.cancel()
+            if lease.distributed:
+                await self._release_lease(lease)
+        finally:
+            if self._holders.get(thread_id) is lease:
+                del self._holders[thread_id]
+            lock.release()
+            if not lock.locked() and thread_id not in self._pending:
+                self._locks.pop(thread_id, None)
+
+    # ---- public ---------------------------------------------------------------
+    async def busy(self, thread_id: str) -> bool:
+        """Whether a turn is running on the thread (this worker or, with Mongo, any worker)."""
+        lock = self._locks.get(thread_id)
+        if lock is not None and lock.locked():
+            return True
+        try:
+            collection = await self._collection()
+            if collection is None:
+                return False
+            doc = await collection.find_one({"_id": thread_id, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+            return doc is not None
+        except PyMongoError:
+            return False
+
+    @asynccontextmanager
+    async def hold(self, thread_id: str, policy: Optional[str] = None) -> AsyncIterator[Lease]:
+        """Run the body as the only turn on `thread_id` (see the module comment for policies)."""
+        policy = policy or self.policy
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        lease = Lease(thread_id, self.owner_prefix)
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+
+        if lock.locked():
+            if policy == "reject":
+                raise ThreadBusy(thread_id, "a turn is already running")
+            if policy == "cancel":
+                for other in [self._holders.get(thread_id), *self._pending[thread_id]]:
+                    if other is not None:
+                        other.stop.set()
+
+        self._pending[thread_id].append(lease)
+        try:
+            try:
+                await asyncio.wait_for(lock.acquire(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                raise ThreadBusy(thread_id, "timed out waiting for the running turn") from None
+        finally:
+            self._pending[thread_id].remove(lease)
+            if not self._pending[thread_id]:
+                del self._pending[thread_id]
+
+        renewal = None
+        try:
+            if lease.stop.is_set():
+                raise ThreadBusy(thread_id, "superseded by a newer turn")
+            await self._acquire_lease(lease, policy, deadline)
+            self._holders[thread_id] = lease
+            if lease.distributed:
+                renewal = asyncio.create_task(self._renew(lease))
+            yield lease
+        finally:
+            # Own task: it completes even if the caller is being cancelled, and the
+            # thread stays locked until it has
+            finish = loop.create_task(self._finish(lease, lock, renewal))
+            _background.add(finish)
+            finish.add_done_callback(_background.discard)
+            await _finish_shielded(finish)
+
+
+thread_guard = ThreadGuard()
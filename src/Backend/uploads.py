@@ -0,0 +1,365 @@
+# src/Backend/uploads.py
+# Bounded, streaming storage for /agent/upload_files.
+#
+# The upload routes read the request body themselves (MultipartStream) instead of
+# taking UploadFile parameters, which Starlette only hands over once it has received
+# and spooled the whole body. A declared Content-Length above the limit is rejected
+# before anything is read, and the multipart body is parsed as it arrives.
+#
+# Each uploaded file is decoded incrementally (UTF-8, invalid bytes replaced) and
+# written to a spool file on disk in UPLOAD_CHUNK_BYTES batches, so a worker never
+# holds a whole upload in memory. Per-file and per-request byte limits are enforced
+# on the bytes received so far. The response carries a handle per file; later agent
+# calls pass the handles (`agent_input.attachments`) and the text is resolved on
+# the server. Spool files live in UPLOAD_DIR, which all workers of a container
+# share, and expire after UPLOAD_TTL_SECONDS.
+
+import asyncio
+import codecs
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# ---- Configuration ----------------------------------------------------------
+
+UPLOAD_DIR               = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "seq_sonic_uploads"))
+UPLOAD_CHUNK_BYTES       = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+UPLOAD_MAX_FILE_BYTES    = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_MAX_TOTAL_BYTES   = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_INLINE_BYTES      = int(os.getenv("UPLOAD_INLINE_BYTES", str(16 * 1024)))
+UPLOAD_TTL_SECONDS       = int(os.getenv("UPLOAD_TTL_SECONDS", "86400"))
+UPLOAD_MAX_ARCHIVE_BYTES = int(os.getenv("UPLOAD_MAX_ARCHIVE_BYTES", str(500 * 1024 * 1024)))
+# Upper bound of attachment text added to one agent turn
+UPLOAD_ATTACH_MAX_CHARS  = int(os.getenv("UPLOAD_ATTACH_MAX_CHARS", "180000"))
+# Allowance for boundaries and part headers on top of the file bytes of a request
+UPLOAD_FORM_OVERHEAD     = int(os.getenv("UPLOAD_FORM_OVERHEAD", str(1024 * 1024)))
+
+_HANDLE = re.compile(r"^upl_[0-9a-f]{32}$")
+_PURGE_EVERY = 600.0
+
+
+@dataclass
+class StoredUpload:
+    """Metadata of one spooled upload (the text is in `<handle>.txt`)."""
+    handle: str
+    filename: str
+    content_type: Optional[str]
+    bytes: int
+    chars: int
+    created: float
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(status_code=413, detail=detail)
+
+
+# ---- Streaming multipart ----------------------------------------------------
+
+class FilePart:
+    """One file field of a MultipartStream. Read `chunks()` once, before the next part."""
+
+    def __init__(self, form: "MultipartStream", field: str, filename: str, content_type: Optional[str]):
+        self._form = form
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The part's bytes as they arrive, batched to about UPLOAD_CHUNK_BYTES."""
+        buffer = bytearray()
+        async for data in self._form._part_data():
+            buffer += data
+            if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+
+class MultipartStream:
+    """
+    multipart/form-data body of `request`, parsed while it is received. Raises
+    UploadTooLarge (413) when the declared or the received body exceeds `max_bytes`
+    (file bytes; UPLOAD_FORM_OVERHEAD is allowed on top) and HTTPException (400) on a
+    malformed or truncated body.
+    """
+
+    def __init__(self, request: Request, max_bytes: int):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+        self.max_body_bytes = max_bytes + UPLOAD_FORM_OVERHEAD
+        declared = request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > self.max_body_bytes:
+            raise UploadTooLarge(f"request body of {declared} bytes exceeds the limit of {max_bytes} bytes")
+
+        self._body = request.stream()
+        self._received = 0
+        self._done = False
+        self._complete = False
+        self._in_part = False
+        # Parser callbacks only queue events; the async side consumes them
+        self._events: Deque[Tuple[str, Any]] = deque()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+    # ---- parser callbacks ---------------------------------------------------
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        self._events.append(("part", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        self._events.append(("end", None))
+
+    def _on_end(self) -> None:
+        self._complete = True
+
+    # ---- reading --------------------------------------------------------------
+    async def _feed(self) -> None:
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            self._done = True
+            if not self._complete:
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+            return
+        self._received += len(chunk)
+        if self._received > self.max_body_bytes:
+            raise UploadTooLarge(f"request body exceeds the limit of {self.max_body_bytes - UPLOAD_FORM_OVERHEAD} bytes")
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+
+    async def _next_event(self) -> Optional[Tuple[str, Any]]:
+        while not self._events and not self._done:
+            await self._feed()
+        return self._events.popleft() if self._events else None
+
+    async def _part_data(self) -> AsyncIterator[bytes]:
+        while self._in_part:
+            event = await self._next_event()
+            if event is None:
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+            kind, value = event
+            if kind == "data":
+                yield value
+            elif kind == "end":
+                self._in_part = False
+
+    async def files(self, field: str) -> AsyncIterator[FilePart]:
+        """The file parts of form field `field`, in body order; other fields are skipped unread."""
+        while True:
+            async for _ in self._part_data():
+                pass  # the rest of the previous part
+            event = await self._next_event()
+            if event is None:
+                return
+            kind, headers = event
+            if kind != "part":
+                continue
+            self._in_part = True
+            _, options = parse_options_header(headers.get(b"content-disposition", b""))
+            filename = options.get(b"filename")
+            if options.get(b"name", b"").decode("utf-8", "replace") != field or filename is None:
+                continue
+            content_type = headers.get(b"content-type", b"").decode("latin-1") or None
+            yield FilePart(self, field, filename.decode("utf-8", "replace"), content_type)
+
+
+class UploadStore:
+    """Spool directory of uploaded files, addressed by handle."""
+
+    def __init__(self, root: str = UPLOAD_DIR, ttl_seconds: int = UPLOAD_TTL_SECONDS):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._last_purge = 0.0
+
+    def _path(self, handle: str, ext: str) -> str:
+        if not _HANDLE.match(handle or ""):
+            raise KeyError(handle)
+        return os.path.join(self.root, f"{handle}.{ext}")
+
+    # ---- writing ------------------------------------------------------------
+    async def save(self, upload: FilePart, max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+                   remaining_bytes: Optional[int] = None) -> StoredUpload:
+        """
+        Stream `upload` into the spool directory. Raises UploadTooLarge (413) as soon as
+        the file exceeds `max_file_bytes` or the request's `remaining_bytes`.
+        """
+        await asyncio.to_thread(self._prepare)
+        handle = f"upl_{uuid.uuid4().hex}"
+        text_path = self._path(handle, "txt")
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        limit = max_file_bytes if remaining_bytes is None else min(max_file_bytes, remaining_bytes)
+        size = chars = 0
+
+        out = await asyncio.to_thread(open, text_path, "w", encoding="utf-8")
+        try:
+            async for chunk in upload.chunks():
+                size += len(chunk)
+                if size > limit:
+                    which = "file" if limit == max_file_bytes else "request"
+                    raise UploadTooLarge(
+                        f"{upload.filename}: upload exceeds the {which} limit of {limit} bytes"
+                    )
+                text = decoder.decode(chunk)
+                chars += len(text)
+                await asyncio.to_thread(out.write, text)
+            text = decoder.decode(b"", final=True)
+            chars += len(text)
+            await asyncio.to_thread(out.write, text)
+        except BaseException:
+            await asyncio.to_thread(out.close)
+            await asyncio.to_thread(self._remove, handle)
+            raise
+        await asyncio.to_thread(out.close)
+
+        stored = StoredUpload(
+            handle=handle, filename=upload.filename or "uploaded_file", content_type=upload.content_type,
+            bytes=size, chars=chars, created=time.time(),
+        )
+        await asyncio.to_thread(self._write_meta, stored)
+        return stored
+
+    def _write_meta(self, stored: StoredUpload) -> None:
+        with open(self._path(stored.handle, "json"), "w", encoding="utf-8") as f:
+            json.dump(asdict(stored), f)
+
+    def _remove(self, handle: str) -> None:
+        for ext in ("txt", "json"):
+            try:
+                os.remove(self._path(handle, ext))
+            except FileNotFoundError:
+                pass
+
+    async def discard(self, handles: List[str]) -> None:
+        for handle in handles:
+            await asyncio.to_thread(self._remove, handle)
+
+    # ---- reading ------------------------------------------------------------
+    def _load(self, handle: str, max_chars: Optional[int]):
+        with open(self._path(handle, "json"), encoding="utf-8") as f:
+            meta = StoredUpload(**json.load(f))
+        with open(self._path(handle, "txt"), encoding="utf-8") as f:
+            text = f.read(max_chars) if max_chars is not None else f.read()
+        return meta, text
+
+    async def read(self, handle: str, max_chars: Optional[int] = None):
+        """(StoredUpload, text) of a handle, text cut at `max_chars`. KeyError if unknown or expired."""
+        try:
+            return await asyncio.to_thread(self._load, handle, max_chars)
+        except FileNotFoundError:
+            raise KeyError(handle)
+
+    async def resolve(self, handles: List[str], max_chars: int = UPLOAD_ATTACH_MAX_CHARS) -> str:
+        """
+        Attachment block for an agent turn, in the same "--- file:<name> ---" layout the
+        frontend uses for inline files. Unknown handles are noted, not fatal.
+        """
+        parts, remaining = [], max_chars
+        for handle in handles:
+            if remaining <= 0:
+                parts.append("\n...[additional files truncated]")
+                break
+            try:
+                meta, text = await self.read(handle, max_chars=remaining + 1)
+            except KeyError:
+                parts.append(f"\n\n--- file:{handle} ---\n[upload not found or expired]")
+                continue
+            if len(text) > remaining:
+                text = text[:remaining] + f"\n...[truncated {meta.chars - remaining} chars]"
+            remaining -= len(text)
+            parts.append(f"\n\n--- file:{meta.filename} ---\n{text}")
+        return "".join(parts)
+
+    # ---- expiry -------------------------------------------------------------
+    def _prepare(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._maybe_purge()
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < _PURGE_EVERY:
+            return
+        self._last_purge = now
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+async def spool_to_file(upload: FilePart, max_bytes: int = UPLOAD_MAX_ARCHIVE_BYTES, suffix: str = "") -> str:
+    """Write a (binary) upload to a temporary file as it arrives. Returns its path; the caller removes it."""
+    fd, path = await asyncio.to_thread(tempfile.mkstemp, suffix=suffix)
+    out = os.fdopen(fd, "wb")
+    size = 0
+    try:
+        async for chunk in upload.chunks():
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"{upload.filename}: archive exceeds the limit of {max_bytes} bytes")
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        os.remove(path)
+        raise
+    await asyncio.to_thread(out.close)
+    return path
+
+
+upload_store = UploadStore()
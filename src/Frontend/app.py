@@ -4,8 +4,12 @@
 
 import os
 import json
+import time
 import uuid
-from typing import Any, Dict, List, Tuple
+import asyncio
+import logging
+import contextlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
 import chainlit as cl
@@ -14,6 +18,16 @@ from chainlit.input_widget import Select
 # ---- Environment ------------------------------------------------------------
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+# Shared connection pool to the backend (keep-alive) and cached health / circuit breaker
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "100"))
+BACKEND_KEEPALIVE_SECONDS = float(os.getenv("BACKEND_KEEPALIVE_SECONDS", "60"))
+BACKEND_HEALTH_INTERVAL = float(os.getenv("BACKEND_HEALTH_INTERVAL", "10"))
+BACKEND_BREAKER_FAILURES = int(os.getenv("BACKEND_BREAKER_FAILURES", "3"))
+BACKEND_BREAKER_COOLDOWN = float(os.getenv("BACKEND_BREAKER_COOLDOWN", "15"))
+# "sse": one POST /agent/stream per turn; "ws": one WebSocket per chat (/agent/ws/{thread_id})
+BACKEND_CHANNEL = os.getenv("BACKEND_CHANNEL", "sse").lower()
+
+logger = logging.getLogger(__name__)
 
 # ---- Agent registry ---------------------------------------------------------
 AGENTS = {
@@ -42,6 +56,95 @@ AGENTS = {
 
 selected_agent = "mw_migration"
 
+# =============================================================================
+# Backend client (one pooled session per process, cached health)
+# =============================================================================
+class BackendClient:
+    """
+    App-lifetime aiohttp session to BACKEND_URL with keep-alive, plus a health state
+    refreshed in the background every BACKEND_HEALTH_INTERVAL seconds.
+
+    Circuit breaker: after BACKEND_BREAKER_FAILURES consecutive failures (probes or
+    real requests) the circuit opens and messages fail fast without a round-trip.
+    After BACKEND_BREAKER_COOLDOWN seconds requests are let through again (half-open);
+    the first success closes it.
+    """
+
+    def __init__(self, base_url: str = BACKEND_URL):
+        self.base_url = base_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probed = False
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=BACKEND_POOL_SIZE, keepalive_timeout=BACKEND_KEEPALIVE_SECONDS)
+            # No total timeout: streamed answers can run for minutes
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=10)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    # ---- circuit breaker ------------------------------------------------------
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("[backend] circuit closed")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= BACKEND_BREAKER_FAILURES:
+            if self._opened_at is None:
+                logger.warning(f"[backend] circuit open after {self._failures} failures")
+            # (Re)start the cool-down; a failed half-open attempt re-opens it
+            self._opened_at = time.monotonic()
+
+    def available(self) -> bool:
+        """Cached health: False only while the circuit is open and cooling down."""
+        if self._opened_at is None:
+            return True
+        return time.monotonic() - self._opened_at >= BACKEND_BREAKER_COOLDOWN
+
+    # ---- background health ----------------------------------------------------
+    async def probe(self) -> bool:
+        try:
+            async with self.session().get(f"{self.base_url}/health", timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                healthy = resp.status == 200
+        except Exception:
+            healthy = False
+        self._probed = True
+        if healthy:
+            self.record_success()
+        else:
+            self.record_failure()
+        return healthy
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(BACKEND_HEALTH_INTERVAL)
+            await self.probe()
+
+    async def start(self) -> None:
+        """Start the health refresher (idempotent); probes once if the state is still unknown."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+        if not self._probed:
+            await self.probe()
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+backend = BackendClient()
+
+
 # =============================================================================
 # File helpers
 # =============================================================================
@@ -49,6 +152,8 @@ TEXT_EXTS = {".txt", ".md", ".markdown", ".py", ".js", ".ts", ".tsx", ".jsx", ".
 TEXT_MIME_PREFIXES = ("text/", "application/json", "application/xml", "application/x-yaml", "application/yaml")
 MAX_CHARS_PER_FILE = 60_000
 MAX_TOTAL_CHARS = 180_000
+# Attachments that only have a URL are fetched with this total timeout (seconds)
+ATTACHMENT_FETCH_TIMEOUT = float(os.getenv("ATTACHMENT_FETCH_TIMEOUT", "30"))
 
 
 def _looks_textual(name: str, mime: str | None) -> bool:
@@ -75,7 +180,9 @@ async def _read_uploaded_file(uploaded) -> Tuple[str, str | None]:
             with open(uploaded.path, "rb") as f:
                 data = f.read()
         elif hasattr(uploaded, "url") and uploaded.url:
-            async with aiohttp.ClientSession() as session:
+            # Own short-lived session: the backend pool is sized for, and limited to, the backend
+            timeout = aiohttp.ClientTimeout(total=ATTACHMENT_FETCH_TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
                 async with session.get(uploaded.url) as response:
                     data = await response.read()
         else:
@@ -101,15 +208,95 @@ async def _read_uploaded_file(uploaded) -> Tuple[str, str | None]:
     return wrapped, None
 
 
-async def collect_files_text(message: cl.Message) -> Tuple[str, List[str]]:
-    notes: List[str] = []
-    chunks: List[str] = []
+ARCHIVE_EXTS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
 
+def _is_archive(name: str) -> bool:
+    return (name or "").lower().endswith(ARCHIVE_EXTS)
+
+
+def _uploaded_files(message: cl.Message) -> List[Any]:
     uploaded_files = []
     if hasattr(message, "elements") and message.elements:
         uploaded_files = [el for el in message.elements if hasattr(el, "type") and el.type in ["file", "image", "audio", "video"]]
     if not uploaded_files and hasattr(message, "attachments") and message.attachments:
         uploaded_files = message.attachments
+    return uploaded_files
+
+
+async def upload_projects(message: cl.Message) -> Tuple[List[str], List[str]]:
+    """Send zip / tar attachments to the backend for server-side ingestion. Returns (project_ids, notes)."""
+    project_ids: List[str] = []
+    notes: List[str] = []
+    for f in _uploaded_files(message):
+        name = getattr(f, "name", "project")
+        if not _is_archive(name) or not getattr(f, "path", None):
+            continue
+        try:
+            with open(f.path, "rb") as archive:
+                form = aiohttp.FormData()
+                form.add_field("archive", archive, filename=name)
+                async with backend.session().post(f"{BACKEND_URL}/agent/projects", data=form) as resp:
+                    body = await resp.json(content_type=None)
+            if resp.status != 200:
+                notes.append(f"- {name}: ingestion failed ({body.get('error') or body.get('detail') or resp.status})")
+                continue
+            project_ids.append(body["project_id"])
+            notes.append(f"- {name}: {body['files']} files indexed ({body['skipped']} skipped)")
+        except Exception as e:  # defensive
+            notes.append(f"- {name}: upload error: {e}")
+    return project_ids, notes
+
+
+def _uploadable_files(message: cl.Message) -> List[Any]:
+    """Attachments upload_attachments() sends: local text files that are not archives."""
+    return [
+        f for f in _uploaded_files(message)
+        if not _is_archive(getattr(f, "name", "")) and getattr(f, "path", None)
+        and _looks_textual(getattr(f, "name", ""), getattr(f, "mime", None))
+    ]
+
+
+async def upload_attachments(message: cl.Message) -> Tuple[List[str], List[str]]:
+    """
+    Upload the _uploadable_files() of the message to the backend (/agent/upload_files)
+    and return (handles, notes). The backend inlines small files and indexes larger ones
+    for retrieval, so the file text is not repeated in the message. Returns no handles
+    if the upload fails.
+    """
+    files = _uploadable_files(message)
+    if not files:
+        return [], []
+    handles_open = []
+    try:
+        form = aiohttp.FormData()
+        for f in files:
+            handle = open(f.path, "rb")
+            handles_open.append(handle)
+            form.add_field("files", handle, filename=getattr(f, "name", "uploaded_file"))
+        async with backend.session().post(f"{BACKEND_URL}/agent/upload_files", data=form) as resp:
+            body = await resp.json(content_type=None)
+        if resp.status != 200:
+            return [], [f"- upload failed ({body.get('detail') or resp.status}), files sent inline"]
+        return [item["handle"] for item in body.get("files", [])], []
+    except Exception as e:  # defensive
+        return [], [f"- upload error ({e}), files sent inline"]
+    finally:
+        for handle in handles_open:
+            handle.close()
+
+
+async def collect_files_text(message: cl.Message, skip: List[Any] = ()) -> Tuple[str, List[str]]:
+    """Inline text of the attachments not in `skip` (those already uploaded), with notes on skipped files."""
+    notes: List[str] = []
+    chunks: List[str] = []
+
+    # Archives are ingested by the backend (see upload_projects)
+    skipped = {id(f) for f in skip}
+    uploaded_files = [
+        f for f in _uploaded_files(message)
+        if not _is_archive(getattr(f, "name", "")) and id(f) not in skipped
+    ]
 
     current_total = 0
     for f in uploaded_files:
@@ -129,12 +316,9 @@ async def collect_files_text(message: cl.Message) -> Tuple[str, List[str]]:
 
 
 async def check_backend_health() -> bool:
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{BACKEND_URL}/health", timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                return resp.status == 200
-    except Exception:
-        return False
+    """Cached backend health (no request on the hot path; see BackendClient)."""
+    await backend.start()
+    return backend.available()
 
 
 # =============================================================================
@@ -151,6 +335,17 @@ async def set_agent(agent_id: str):
 # =============================================================================
 # UI lifecycle
 # =============================================================================
+if hasattr(cl, "on_app_startup"):
+    @cl.on_app_startup
+    async def app_startup():
+        await backend.start()
+
+if hasattr(cl, "on_app_shutdown"):
+    @cl.on_app_shutdown
+    async def app_shutdown():
+        await backend.close()
+
+
 @cl.on_chat_start
 async def start():
     if not await check_backend_health():
@@ -206,6 +401,7 @@ async def main(message: cl.Message):
     await thinking_msg.send()
 
     try:
+        # Cached state from the background health check; no probe per message
         if not await check_backend_health():
             await thinking_msg.remove()
             await cl.Message(
@@ -216,7 +412,14 @@ async def main(message: cl.Message):
             ).send()
             return
 
-        files_text, file_notes = await collect_files_text(message)
+        attachments, file_notes = await upload_attachments(message)
+        # Everything the upload did not take (URL-only files, failed uploads) goes inline;
+        # non-text files are reported there
+        uploaded = _uploadable_files(message) if attachments else []
+        files_text, inline_notes = await collect_files_text(message, skip=uploaded)
+        file_notes += inline_notes
+        project_ids, project_notes = await upload_projects(message)
+        file_notes += project_notes
         user_text = (message.content or "").strip()
         if files_text:
             user_text = (user_text + "\n\n[Attached files]" + files_text).strip()
@@ -226,6 +429,12 @@ async def main(message: cl.Message):
         # Only the new human turn. Checkpointer restores prior state by thread_id.
         messages = [{"type": "human", "content": user_text}]
         input_data = {"messages": messages}
+        if attachments:
+            # Resolved by the backend: inlined when small, retrieved by relevance otherwise
+            input_data["attachments"] = attachments
+        if project_ids:
+            # The backend adds a reference to the project to this turn
+            input_data["project_id"] = project_ids[-1]
 
         response_msg = cl.Message(content="", author=AGENTS[agent_id]["name"])
         await response_msg.send()
@@ -240,6 +449,143 @@ async def main(message: cl.Message):
         await cl.Message(content=f"❌ **Error**: {str(e)}", author="System").send()
 
 
+class AgentChannel:
+    """
+    Long-lived WebSocket to /agent/ws/{thread_id} for one chat session. Turns are
+    multiplexed by turn_id; a reader task routes incoming frames to the waiting turn.
+    A turn that is abandoned before its final frame (user pressed stop, message
+    handler cancelled) is cancelled on the backend as well. Failed connects and lost
+    connections count towards the backend circuit breaker, like failed HTTP requests.
+    """
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._turns: Dict[str, asyncio.Queue] = {}
+        self._lock = asyncio.Lock()
+        self._closing = False
+
+    async def _connect(self) -> aiohttp.ClientWebSocketResponse:
+        async with self._lock:
+            if self._ws is None or self._ws.closed:
+                try:
+                    self._ws = await backend.session().ws_connect(
+                        f"{BACKEND_URL}/agent/ws/{self.thread_id}", heartbeat=30,
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    backend.record_failure()
+                    raise
+                backend.record_success()
+                self._reader = asyncio.create_task(self._read(self._ws))
+            return self._ws
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.ERROR:
+                    break
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    obj = json.loads(msg.data)
+                except json.JSONDecodeError:
+                    continue
+                queue = self._turns.get(obj.get("turn_id"))
+                if queue is not None:
+                    queue.put_nowait(obj)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"[backend] channel read failed: {e}")
+        finally:
+            # Closed by the backend, a missed heartbeat or a read error (not by close())
+            if not self._closing:
+                backend.record_failure()
+            # Connection lost: end the turns still waiting for frames
+            for queue in self._turns.values():
+                queue.put_nowait({"error": "Connection to backend lost", "done": True})
+
+    async def turn(self, agent_name: str, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Send one turn and yield its frames up to and including the final one."""
+        ws = await self._connect()
+        turn_id = uuid.uuid4().hex
+        queue: asyncio.Queue = asyncio.Queue()
+        self._turns[turn_id] = queue
+        finished = False
+        try:
+            await ws.send_json({"type": "turn", "turn_id": turn_id, "agent_name": agent_name, "agent_input": input_data})
+            while not finished:
+                obj = await queue.get()
+                finished = bool(obj.get("done"))
+                yield obj
+        finally:
+            self._turns.pop(turn_id, None)
+            if not finished and not ws.closed:
+                with contextlib.suppress(Exception):
+                    await ws.send_json({"type": "cancel", "turn_id": turn_id})
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+
+
+def _session_channel() -> AgentChannel:
+    channel = cl.user_session.get("channel")
+    if channel is None:
+        channel = AgentChannel(cl.user_session.get("thread_id", "default_thread"))
+        cl.user_session.set("channel", channel)
+    return channel
+
+
+async def _sse_frames(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Frames of one POST /agent/stream."""
+    async with backend.session().post(
+        f"{BACKEND_URL}/agent/stream",
+        json=payload,
+        headers={"Content-Type": "application/json"},
+    ) as resp:
+        if resp.status != 200:
+            if resp.status >= 500:
+                backend.record_failure()
+            yield {"error": f"Backend returned status {resp.status}", "done": True}
+            return
+        backend.record_success()
+
+        async for raw in resp.content:
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                return
+            try:
+                yield json.loads(data)
+            except json.JSONDecodeError:
+                continue
+
+
+async def _turn_frames(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Frames of one turn over the chat's WebSocket (BACKEND_CHANNEL=ws) or a POST /agent/stream."""
+    if BACKEND_CHANNEL == "ws":
+        channel = _session_channel()
+        try:
+            frames = channel.turn(payload["agent_name"], payload["agent_input"])
+            first = await frames.__anext__()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"[backend] channel unavailable, streaming over HTTP: {e}")
+        else:
+            async with contextlib.aclosing(frames):
+                yield first
+                async for obj in frames:
+                    yield obj
+            return
+    async with contextlib.aclosing(_sse_frames(payload)) as frames:
+        async for obj in frames:
+            yield obj
+
+
 async def stream_response(agent_id: str, input_data: Dict[str, Any]):
     try:
         agent_info = AGENTS[agent_id]
@@ -249,36 +595,17 @@ async def stream_response(agent_id: str, input_data: Dict[str, Any]):
             "agent_input": input_data,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{BACKEND_URL}/agent/stream",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-            ) as resp:
-                if resp.status != 200:
-                    yield f"Error: Backend returned status {resp.status}"
-                    return
-
-                async for raw in resp.content:
-                    line = raw.decode("utf-8", errors="ignore").strip()
-                    if not line.startswith("data: "):
-                        continue
-                    data = line[6:]
-                    if data == "[DONE]":
-                        break
-                    try:
-                        obj = json.loads(data)
-                    except json.JSONDecodeError:
-                        continue
-
-                    if obj.get("error"):
-                        yield f"Error: {obj['error']}"
-                        break
-                    if obj.get("done") is True:
-                        break
-                    if "content" in obj and obj["content"]:
-                        yield obj["content"]
+        async with contextlib.aclosing(_turn_frames(payload)) as frames:
+            async for obj in frames:
+                if obj.get("error"):
+                    yield f"Error: {obj['error']}"
+                    break
+                if obj.get("cancelled") or obj.get("done") is True:
+                    break
+                if "content" in obj and obj["content"]:
+                    yield obj["content"]
     except aiohttp.ClientError as e:
+        backend.record_failure()
         yield f"Error: Network error connecting to backend - {str(e)}"
     except Exception as e:
         yield f"Error: {str(e)}"
@@ -286,6 +613,9 @@ async def stream_response(agent_id: str, input_data: Dict[str, Any]):
 
 @cl.on_chat_end
 async def end():
+    channel = cl.user_session.get("channel")
+    if channel is not None:
+        await channel.close()
     await cl.Message(
         content="👋 **Chat session ended. Thank you for using SEQ_SONIC!**",
         author="System",
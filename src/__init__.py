@@ -4,11 +4,8 @@
 __version__ = "1.0.0"
 __author__ = "SEQ_SONIC Team"
 
-from .Agents.LLM import get_llm
-from .Agents.sonic.graph import compiled_graph as sonic_graph
-from .Agents.smart_wso2_assistant.graph import compiled_graph as wso2_graph
-from .Agents.mw_migration.graph import compiled_graph as mw_migration_graph
-from .config.config import load_settings
+# Exports are imported on first access (importing `src` must not build every agent)
+from .lazy_imports import lazy_exports
 
 __all__ = [
     "get_llm",
@@ -16,4 +13,12 @@ __all__ = [
     "wso2_graph",
     "mw_migration_graph",
     "load_settings"
-]
\ No newline at end of file
+]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "get_llm": (".Agents.LLM", "get_llm"),
+    "sonic_graph": (".Agents.sonic.graph", "compiled_graph"),
+    "wso2_graph": (".Agents.smart_wso2_assistant.graph", "compiled_graph"),
+    "mw_migration_graph": (".Agents.mw_migration.graph", "compiled_graph"),
+    "load_settings": (".config.config", "load_settings"),
+})
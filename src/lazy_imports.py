@@ -0,0 +1,31 @@
+# src/lazy_imports.py
+# Deferred package exports (PEP 562 module __getattr__).
+#
+# Package __init__ files used to import their graph, nodes, tools and prompts
+# eagerly, so `import src` pulled in every agent, built LLM clients and compiled
+# every graph. With lazy_exports a name is imported on first attribute access and
+# then cached in the package namespace, so `from src.Agents.sonic import main_node`
+# keeps working while a bare package import stays cheap.
+import importlib
+import sys
+from typing import Callable, Dict, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, Tuple[str, str]]) -> Tuple[Callable, Callable]:
+    """
+    Return (__getattr__, __dir__) for `package`.
+    `exports` maps exported name -> (module path, relative to `package` if it starts with ".", attribute).
+    """
+    def __getattr__(name: str):
+        target = exports.get(name)
+        if target is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module_path, attribute = target
+        value = getattr(importlib.import_module(module_path, package), attribute)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# Unit tests run from the project root without installing the package: make `src` importable.
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
@@ -0,0 +1,198 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+
+from src.Agents import admission
+from src.Agents.admission import (
+    AdmissionController, PrioritySemaphore, TokenBucket, _retry_after, _retryable,
+)
+
+
+class _Response:
+    def __init__(self, status_code=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _ProviderError(Exception):
+    def __init__(self, status_code=None, headers=None):
+        super().__init__(f"status {status_code}")
+        self.response = _Response(status_code, headers)
+
+
+# ---- PrioritySemaphore --------------------------------------------------------
+
+def test_semaphore_hands_slots_out_by_priority():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(0)
+        order = []
+
+        async def waiter(priority):
+            await semaphore.acquire(priority)
+            order.append(priority)
+            semaphore.release()
+
+        tasks = [asyncio.create_task(waiter(p)) for p in (2, 0, 1, 0)]
+        await asyncio.sleep(0)
+        assert semaphore.waiting == 4
+        semaphore.release()
+        await asyncio.gather(*tasks)
+        return order, semaphore.active
+
+    order, active = asyncio.run(scenario())
+    assert order == [0, 0, 1, 2]
+    assert active == 0
+
+
+def test_semaphore_skips_cancelled_waiter():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(0)
+        first = asyncio.create_task(semaphore.acquire(0))
+        second = asyncio.create_task(semaphore.acquire(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        semaphore.release()
+        await second
+        return semaphore.active, semaphore.waiting
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_semaphore_passes_on_slot_handed_to_cancelled_waiter():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(0)
+        first = asyncio.create_task(semaphore.acquire(0))
+        second = asyncio.create_task(semaphore.acquire(1))
+        await asyncio.sleep(0)
+        semaphore.release()  # hands the slot to `first` ...
+        first.cancel()       # ... which is cancelled before it runs
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        active = semaphore.active
+        semaphore.release()
+        return results, active, semaphore.active
+
+    results, active, after = asyncio.run(scenario())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1] is None
+    assert active == 1
+    assert after == 0
+
+
+# ---- TokenBucket --------------------------------------------------------------
+
+def test_bucket_reconciles_with_reported_usage():
+    bucket = TokenBucket(60)
+    asyncio.run(bucket.take(40))
+    bucket.adjust(50)  # the call used 50 tokens more than estimated
+    assert bucket.tokens == pytest.approx(-30, abs=1)
+    bucket.adjust(-1000)  # refunds never exceed one minute of tokens
+    assert bucket.tokens == bucket.capacity
+
+
+def test_bucket_waits_for_refill_after_overdraw():
+    bucket = TokenBucket(6000)  # 100 tokens/s
+    asyncio.run(bucket.take(6000))
+    bucket.adjust(5)
+
+    async def timed_take():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.take(10)
+        return loop.time() - started
+
+    assert asyncio.run(timed_take()) >= 0.1
+
+
+def test_bucket_pause_delays_takers():
+    bucket = TokenBucket(6000)
+    bucket.pause(0.1)
+
+    async def timed_take():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.take(1)
+        return loop.time() - started
+
+    assert asyncio.run(timed_take()) >= 0.09
+
+
+# ---- Retry classification -----------------------------------------------------
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 502, 503, 504])
+def test_transient_statuses_are_retried(status):
+    assert _retryable(_ProviderError(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 422])
+def test_client_errors_are_not_retried(status):
+    assert not _retryable(_ProviderError(status))
+
+
+def test_status_code_attribute_and_connection_errors():
+    error = Exception("rate limited")
+    error.status_code = 429
+    assert _retryable(error)
+    for name in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"):
+        assert _retryable(type(name, (Exception,), {})())
+    assert not _retryable(ValueError("bad request body"))
+
+
+def test_retry_after_headers():
+    assert _retry_after(_ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert _retry_after(_ProviderError(429, {"retry-after": "2"})) == 2.0
+    assert _retry_after(_ProviderError(429, {"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})) is None
+    assert _retry_after(_ProviderError(429)) is None
+    assert _retry_after(ValueError()) is None
+
+
+# ---- AdmissionController ------------------------------------------------------
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(admission.random, "uniform", lambda low, high: 0.0)
+
+
+def test_call_retries_transient_errors(no_jitter):
+    controller = AdmissionController(enabled=True, max_retries=3)
+    attempts = []
+
+    async def run():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _ProviderError(429, {"retry-after": "0"})
+        return "ok"
+
+    assert asyncio.run(controller.call("model", 10, run)) == "ok"
+    stats = controller.stats()["model"]
+    assert (stats["calls"], stats["retries"], stats["rate_limited"], stats["failed"]) == (3, 2, 2, 0)
+    assert stats["in_flight"] == 0
+
+
+def test_call_does_not_retry_client_errors(no_jitter):
+    controller = AdmissionController(enabled=True, max_retries=3)
+    attempts = []
+
+    async def run():
+        attempts.append(1)
+        raise _ProviderError(400)
+
+    with pytest.raises(_ProviderError):
+        asyncio.run(controller.call("model", 10, run))
+    assert len(attempts) == 1
+    assert controller.stats()["model"]["failed"] == 1
+
+
+def test_call_reconciles_bucket(monkeypatch):
+    monkeypatch.setitem(admission.LLM_MODEL_LIMITS, "metered", {"tpm": 6000})
+    controller = AdmissionController(enabled=True)
+
+    async def run():
+        return "answer"
+
+    asyncio.run(controller.call("metered", 100, run, used=lambda result: 300))
+    assert controller.stats()["metered"]["tpm_available"] == pytest.approx(5700, abs=5)
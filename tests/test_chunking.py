@@ -0,0 +1,95 @@
+# tests/test_chunking.py
+from src.Agents.sources.chunking import chunk_java, chunk_xml
+
+JAVA = """package com.acme.orders;
+
+import java.util.List;
+
+public class OrderService {
+    private final List<String> orders;
+
+    /** Creates an order. */
+    @Transactional
+    public String create(String id) {
+        Runnable r = new Runnable() {
+            public void run() {
+                orders.add(id);
+            }
+        };
+        r.run();
+        return id;
+    }
+
+    public void cancel(String id) throws IllegalStateException {
+        if (id == null) {
+            throw new IllegalStateException();
+        }
+        orders.remove(id);
+    }
+
+    static class Audit {
+        void log(String message) {
+            System.out.println(message);
+        }
+    }
+}
+"""
+
+XML = """<?xml version="1.0"?>
+<api name="OrderAPI" context="/orders">
+    <resource methods="GET" uri-template="/{id}">
+        <inSequence>
+            <log level="full"/>
+            <send/>
+        </inSequence>
+    </resource>
+    <resource methods="POST" uri-template="/">
+        <inSequence>
+            <call/>
+            <respond/>
+        </inSequence>
+    </resource>
+</api>
+"""
+
+
+def _spans(chunks):
+    return [(c.start_line, c.end_line, c.symbol) for c in chunks]
+
+
+def test_java_chunks_per_method_with_owner():
+    spans = _spans(chunk_java("OrderService.java", JAVA))
+    assert (8, 18, "OrderService.create") in spans      # javadoc and annotation included
+    assert (20, 25, "OrderService.cancel") in spans     # `throws` clause, `if` block not a method
+    assert (28, 30, "Audit.log") in spans               # nested type is the owner
+    assert spans[0] == (1, 7, "OrderService (declarations)")
+
+
+def test_java_anonymous_class_stays_in_outer_method():
+    symbols = [c.symbol for c in chunk_java("OrderService.java", JAVA)]
+    assert not any(symbol.endswith(".run") for symbol in symbols)
+
+
+def test_java_large_method_is_split_with_line_offsets():
+    body = "\n".join(f"        step{i}();" for i in range(60))
+    text = f"class Big {{\n    void run() {{\n{body}\n    }}\n}}\n"
+    chunks = [c for c in chunk_java("Big.java", text, max_lines=20) if c.symbol.startswith("Big.run")]
+    assert len(chunks) > 1
+    assert chunks[0].start_line == 2
+    assert chunks[-1].end_line == 63
+    assert all(c.text == "\n".join(text.splitlines()[c.start_line - 1:c.end_line]) for c in chunks)
+
+
+def test_xml_small_document_is_one_chunk():
+    assert _spans(chunk_xml("order.xml", XML)) == [(2, 15, "<api OrderAPI>")]
+
+
+def test_xml_large_element_is_split_into_children():
+    assert _spans(chunk_xml("order.xml", XML, max_lines=6)) == [
+        (3, 8, "<api OrderAPI> > <resource /{id}>"),
+        (9, 14, "<api OrderAPI> > <resource />"),
+    ]
+
+
+def test_malformed_xml_falls_back_to_line_windows():
+    assert _spans(chunk_xml("bad.xml", "<api>\n<resource>\n</api>\n")) == [(1, 3, "lines 1-3")]
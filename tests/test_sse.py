@@ -0,0 +1,195 @@
+# tests/test_sse.py
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from src.Backend import sse
+from src.Backend.sse import EventStream, FrameStore, coalesce, find_stream
+
+
+async def _events(items):
+    for item in items:
+        yield item
+
+
+async def _collect(events, **kwargs):
+    return [event async for event in coalesce(events, **kwargs)]
+
+
+def test_tokens_are_merged_within_the_window():
+    events = _events([("token", "Hel"), ("token", "lo"), ("token", "!")])
+    assert asyncio.run(_collect(events, window=1.0)) == [("token", "Hello!")]
+
+
+def test_other_events_flush_pending_text_in_order():
+    events = _events([("token", "a"), ("token", "b"), ("node", "tools"), ("token", "c"), ("final", "abc")])
+    assert asyncio.run(_collect(events, window=1.0)) == [
+        ("token", "ab"), ("node", "tools"), ("token", "c"), ("final", "abc"),
+    ]
+
+
+def test_max_bytes_flushes_early():
+    events = _events([("token", "abc"), ("token", "def"), ("token", "g")])
+    assert asyncio.run(_collect(events, window=1.0, max_bytes=6)) == [("token", "abcdef"), ("token", "g")]
+
+
+def test_window_flushes_slow_streams():
+    async def scenario():
+        flushed = asyncio.Event()
+
+        async def events():
+            yield "token", "a"
+            await flushed.wait()  # nothing else arrives: only the window can flush "a"
+            yield "token", "b"
+
+        received = []
+        async for event in coalesce(events(), window=0.01):
+            received.append(event)
+            flushed.set()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 10)) == [("token", "a"), ("token", "b")]
+
+
+def test_error_is_raised_after_pending_text():
+    async def failing():
+        yield "token", "partial"
+        raise RuntimeError("model failed")
+
+    async def scenario():
+        received = []
+        with pytest.raises(RuntimeError):
+            async for event in coalesce(failing(), window=1.0):
+                received.append(event)
+        return received
+
+    assert asyncio.run(scenario()) == [("token", "partial")]
+
+
+# ---- Shared replay --------------------------------------------------------------
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return list(self.docs)
+
+
+class FakeFrames:
+    """The subset of an async Mongo collection FrameStore uses."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def create_index(self, *args, **kwargs):
+        return "index"
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for doc in docs:
+            if doc["_id"] in self.docs:
+                errors.append({"code": 11000})
+            else:
+                self.docs[doc["_id"]] = dict(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def find(self, query):
+        docs = [
+            dict(doc) for doc in self.docs.values()
+            if doc["stream_id"] == query["stream_id"] and doc["seq"] > query["seq"]["$gt"]
+        ]
+        return _Cursor(docs)
+
+
+class FakeFrameStore(FrameStore):
+    def __init__(self, collection):
+        super().__init__(enabled=True)
+        self.collection = collection
+
+    async def _collection(self):
+        return self.collection
+
+
+@pytest.fixture
+def fast_replay(monkeypatch):
+    monkeypatch.setattr(sse, "REPLAY_FLUSH_INTERVAL", 0.0)
+    monkeypatch.setattr(sse, "REPLAY_POLL_INTERVAL", 0.0)
+
+
+async def _drain():
+    while sse._background:
+        await asyncio.gather(*list(sse._background))
+
+
+def test_other_worker_replays_stored_frames_after_last_event_id(fast_replay):
+    store = FakeFrameStore(FakeFrames())
+
+    async def scenario():
+        stream = EventStream(store=store)
+        first = await stream.send({"content": "a", "done": False})
+        await stream.send({"content": "b", "done": False})
+        await stream.close()
+        await _drain()
+        remote = await find_stream(stream.stream_id, store=store)  # not in this worker's registry
+        last_event_id = first.split("\n")[0][len("id: "):]
+        return stream.frames, [frame async for frame in remote.replay(last_event_id)]
+
+    frames, replayed = asyncio.run(scenario())
+    assert replayed == [frame for _, frame in frames[1:]]
+    assert replayed[-1].endswith("data: [DONE]\n\n")
+
+
+def test_other_worker_follows_a_running_stream(fast_replay):
+    store = FakeFrameStore(FakeFrames())
+
+    async def scenario():
+        stream = EventStream(store=store)
+        await stream.send({"content": "a", "done": False})
+        await _drain()
+        remote = await find_stream(stream.stream_id, store=store)
+        received = []
+
+        async def follow():
+            async for frame in remote.replay():
+                received.append(frame)
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.01)
+        await stream.send({"content": "b", "done": False})
+        await stream.close()
+        await asyncio.wait_for(follower, 1)
+        return stream.frames, received
+
+    frames, received = asyncio.run(scenario())
+    assert received == [frame for _, frame in frames]
+
+
+def test_unknown_stream_is_not_found():
+    store = FakeFrameStore(FakeFrames())
+    assert asyncio.run(find_stream("missing", store=store)) is None
+
+
+def test_stored_frames_are_written_once(fast_replay):
+    collection = FakeFrames()
+    store = FakeFrameStore(collection)
+
+    async def scenario():
+        stream = EventStream(store=store)
+        for text in "abc":
+            await stream.send({"content": text, "done": False})
+        await stream.close()
+        await _drain()
+        await store.append(stream.stream_id, [(0, stream.frames[0][1], False)])  # duplicates are skipped
+
+    asyncio.run(scenario())
+    assert sorted(doc["seq"] for doc in collection.docs.values()) == [0, 1, 2, 3]
+    assert [doc["last"] for doc in sorted(collection.docs.values(), key=lambda doc: doc["seq"])] == [
+        False, False, False, True,
+    ]
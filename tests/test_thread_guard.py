@@ -0,0 +1,238 @@
+# tests/test_thread_guard.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from src.Backend.thread_guard import ThreadBusy, ThreadGuard
+
+
+class FakeLeases:
+    """The subset of an async Mongo collection ThreadGuard uses, kept in a dict."""
+
+    def __init__(self):
+        self.docs = {}
+
+    @staticmethod
+    def _matches(doc, query):
+        for key, expected in query.items():
+            if key == "$or":
+                if not any(FakeLeases._matches(doc, branch) for branch in expected):
+                    return False
+            elif isinstance(expected, dict):
+                value = doc.get(key)
+                if value is None:
+                    return False
+                if "$lte" in expected and not value <= expected["$lte"]:
+                    return False
+                if "$gt" in expected and not value > expected["$gt"]:
+                    return False
+            elif doc.get(key) != expected:
+                return False
+        return True
+
+    async def create_index(self, *args, **kwargs):
+        return "expires_at_1"
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None and self._matches(doc, query) else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self._matches(doc, query):
+            doc.update(update["$set"])
+            return dict(doc)
+        if doc is None and upsert:
+            self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+            return None
+        if upsert:
+            raise DuplicateKeyError("E11000 duplicate key")
+        return None
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self._matches(doc, query):
+            doc.update(update["$set"])
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self._matches(doc, query):
+            del self.docs[query["_id"]]
+
+
+class FakeGuard(ThreadGuard):
+    def __init__(self, leases, **kwargs):
+        kwargs.setdefault("ttl_seconds", 30)
+        kwargs.setdefault("renew_seconds", 0.01)
+        kwargs.setdefault("queue_timeout", 0.2)
+        super().__init__(use_mongo=True, **kwargs)
+        self.leases = leases
+
+    async def _collection(self):
+        return self.leases
+
+
+def _foreign_lease(leases, thread_id, expires_in):
+    leases.docs[thread_id] = {
+        "_id": thread_id,
+        "owner": "other-host:1:abc",
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        "cancel_requested": False,
+    }
+
+
+def test_lease_is_acquired_and_released():
+    leases = FakeLeases()
+    guard = FakeGuard(leases)
+
+    async def scenario():
+        async with guard.hold("t1") as lease:
+            assert lease.distributed
+            assert leases.docs["t1"]["owner"] == lease.owner
+            assert await guard.busy("t1")
+        return await guard.busy("t1")
+
+    assert asyncio.run(scenario()) is False
+    assert leases.docs == {}
+    assert guard._locks == {}
+
+
+def test_lease_is_renewed_while_the_turn_runs():
+    leases = FakeLeases()
+    guard = FakeGuard(leases, ttl_seconds=5)
+
+    async def scenario():
+        async with guard.hold("t1"):
+            first = leases.docs["t1"]["expires_at"]
+            await asyncio.sleep(0.05)
+            return first, leases.docs["t1"]["expires_at"]
+
+    first, renewed = asyncio.run(scenario())
+    assert renewed > first
+
+
+def test_cancel_request_from_another_worker_sets_stop():
+    leases = FakeLeases()
+    guard = FakeGuard(leases)
+
+    async def scenario():
+        async with guard.hold("t1") as lease:
+            leases.docs["t1"]["cancel_requested"] = True
+            await asyncio.wait_for(lease.stop.wait(), 1)
+            return lease.stop.is_set()
+
+    assert asyncio.run(scenario())
+
+
+def test_lost_lease_stops_the_turn():
+    leases = FakeLeases()
+    guard = FakeGuard(leases)
+
+    async def scenario():
+        async with guard.hold("t1") as lease:
+            _foreign_lease(leases, "t1", 30)  # expired and taken over meanwhile
+            await asyncio.wait_for(lease.stop.wait(), 1)
+            return lease.stop.is_set()
+
+    assert asyncio.run(scenario())
+    assert leases.docs["t1"]["owner"] == "other-host:1:abc"  # not released on the new owner's behalf
+
+
+def test_expired_lease_is_stolen():
+    leases = FakeLeases()
+    guard = FakeGuard(leases)
+    _foreign_lease(leases, "t1", -1)
+
+    async def scenario():
+        async with guard.hold("t1") as lease:
+            return lease.distributed, leases.docs["t1"]["owner"] == lease.owner
+
+    assert asyncio.run(scenario()) == (True, True)
+
+
+def test_live_foreign_lease_rejects():
+    leases = FakeLeases()
+    guard = FakeGuard(leases, policy="reject")
+    _foreign_lease(leases, "t1", 30)
+
+    async def scenario():
+        async with guard.hold("t1"):
+            pass
+
+    with pytest.raises(ThreadBusy):
+        asyncio.run(scenario())
+    assert guard._locks == {}
+
+
+def test_cancel_policy_asks_the_other_worker_to_stop():
+    leases = FakeLeases()
+    guard = FakeGuard(leases, policy="cancel")
+    _foreign_lease(leases, "t1", 30)
+
+    async def scenario():
+        async with guard.hold("t1"):
+            pass
+
+    with pytest.raises(ThreadBusy):
+        asyncio.run(scenario())  # the other worker never lets go within queue_timeout
+    assert leases.docs["t1"]["cancel_requested"] is True
+
+
+def test_queued_turn_acquires_once_the_foreign_lease_is_released():
+    leases = FakeLeases()
+    guard = FakeGuard(leases, queue_timeout=2)
+    _foreign_lease(leases, "t1", 30)
+
+    async def scenario():
+        async def release_later():
+            await asyncio.sleep(0.05)
+            del leases.docs["t1"]
+
+        releaser = asyncio.create_task(release_later())
+        async with guard.hold("t1") as lease:
+            owner = leases.docs["t1"]["owner"] == lease.owner
+        await releaser
+        return owner
+
+    assert asyncio.run(scenario())
+
+
+def test_release_callbacks_run_before_the_next_turn():
+    guard = ThreadGuard(use_mongo=False, policy="queue")
+    order = []
+
+    async def scenario():
+        async def repair():
+            order.append("repair started")
+            await asyncio.sleep(0.05)
+            order.append("repair done")
+
+        async def first():
+            async with guard.hold("t1") as lease:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    lease.on_release(repair)
+                    raise
+
+        async def second():
+            async with guard.hold("t1"):
+                order.append("next turn")
+
+        running = asyncio.create_task(first())
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(second())
+        await asyncio.sleep(0.01)
+        running.cancel()
+        await asyncio.sleep(0.01)
+        running.cancel()  # cancelled again while the repair runs
+        await asyncio.gather(running, return_exceptions=True)
+        order.append("cancelled turn ended")
+        await queued
+
+    asyncio.run(scenario())
+    assert order.index("repair done") < order.index("cancelled turn ended")
+    assert order.index("repair done") < order.index("next turn")
+    assert guard._locks == {}